@@ -0,0 +1,48 @@
+"""
+Command-line entry point: `python -m cloudtail_backend <command>`.
+
+  serve   production server (pre-fork workers, torch thread planning)
+  export  stream the memories collection to NDJSON (optionally gzipped / resumed)
+  indexes create the memories indexes and explain the routes' query shapes
+  canonicalize  rewrite legacy emotion labels to the canonical four (one-off migration)
+"""
+from __future__ import annotations
+
+import argparse
+import sys
+
+
+def main(argv=None) -> None:
+    ap = argparse.ArgumentParser(prog="python -m cloudtail_backend")
+    sub = ap.add_subparsers(dest="command", metavar="command")
+    sub.required = True
+
+    from . import serve
+    p = sub.add_parser("serve", help="run the API with planned workers / torch threads")
+    serve.add_arguments(p)
+    p.set_defaults(func=serve.run)
+
+    from .tools import export_memories
+    p = sub.add_parser("export", help="export memories to NDJSON", description=export_memories.__doc__,
+                       formatter_class=argparse.RawDescriptionHelpFormatter)
+    export_memories.add_arguments(p)
+    p.set_defaults(func=export_memories.run)
+
+    from .tools import check_indexes
+    p = sub.add_parser("indexes", help="ensure/explain memories indexes", description=check_indexes.__doc__,
+                       formatter_class=argparse.RawDescriptionHelpFormatter)
+    check_indexes.add_arguments(p)
+    p.set_defaults(func=check_indexes.run)
+
+    from .tools import canonicalize_emotions
+    p = sub.add_parser("canonicalize", help="canonicalize stored emotion labels", description=canonicalize_emotions.__doc__,
+                       formatter_class=argparse.RawDescriptionHelpFormatter)
+    canonicalize_emotions.add_arguments(p)
+    p.set_defaults(func=canonicalize_emotions.run)
+
+    args = ap.parse_args(argv)
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
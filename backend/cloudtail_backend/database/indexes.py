@@ -0,0 +1,132 @@
+from __future__ import annotations
+
+import logging
+import os
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from pymongo.errors import DuplicateKeyError, OperationFailure
+
+from cloudtail_backend.database.memory_export import EXPORT_SORT, export_filter
+from cloudtail_backend.database.memory_queries import LIST_SORT, memory_filter, planet_status_pipeline
+
+logger = logging.getLogger(__name__)
+
+# Startup index creation (FULL profile); set to 0 where the app user lacks createIndex rights
+ENSURE_ON_STARTUP = os.getenv("CLOUDTAIL_ENSURE_INDEXES", "1") != "0"
+
+# name → (keys, options). create_index is idempotent for an identical spec.
+MEMORY_INDEXES: Dict[str, Tuple[List[Tuple[str, int]], Dict[str, Any]]] = {
+    # update_memory / delete_memory: {"id": ...}
+    "id_unique": ([("id", 1)], {"unique": True}),
+    # planet status ({"timestamp": {"$gte": ...}} newest first), GET /memories/ keyset pages
+    # (sort timestamp, id desc) and export (same index walked backwards)
+    "timestamp_id": ([("timestamp", -1), ("id", -1)], {}),
+}
+
+
+async def _duplicate_ids(collection, limit: int = 5) -> List[Dict[str, Any]]:
+    pipeline = [
+        {"$group": {"_id": "$id", "count": {"$sum": 1}}},
+        {"$match": {"count": {"$gt": 1}}},
+        {"$limit": limit},
+    ]
+    return [{"id": d["_id"], "count": d["count"]} async for d in collection.aggregate(pipeline)]
+
+
+async def ensure_indexes(collection) -> Dict[str, Any]:
+    """
+    Create MEMORY_INDEXES if missing. Never raises: each index reports "ok" or an error
+    (e.g. duplicate ids blocking the unique index, or an existing index with other options).
+    """
+    report: Dict[str, Any] = {}
+    for name, (keys, options) in MEMORY_INDEXES.items():
+        try:
+            await collection.create_index(keys, name=name, **options)
+            report[name] = {"status": "ok"}
+        except DuplicateKeyError as e:
+            dups = await _duplicate_ids(collection)
+            report[name] = {"status": "error", "error": "duplicate keys", "examples": dups}
+            logger.error("Index %s not created, duplicate ids in memories (e.g. %s): %s", name, dups, e)
+        except OperationFailure as e:
+            report[name] = {"status": "error", "error": str(e), "code": e.code}
+            logger.error("Index %s not created: %s", name, e)
+    return report
+
+
+# ---------- Query-shape diagnostics ----------
+
+def route_query_shapes(now: Optional[datetime] = None) -> Dict[str, Dict[str, Any]]:
+    """
+    The find() shapes the routes issue, with representative values:
+    name → {"filter", "sort", "limit"}, or {"pipeline"} for aggregations.
+    """
+    now = now or datetime.utcnow()
+    day_ago = now - timedelta(hours=24)
+    return {
+        "memories.update_or_delete_by_id": {"filter": {"id": "explain-probe"}, "sort": None, "limit": 1},
+        "memories.list_first_page": {"filter": {}, "sort": LIST_SORT, "limit": 101},
+        "memories.list_next_page": {"filter": memory_filter(after=(now, "explain-probe")), "sort": LIST_SORT, "limit": 101},
+        "memories.list_by_emotion": {"filter": memory_filter(emotion="nostalgia"), "sort": LIST_SORT, "limit": 101},
+        "memories.list_date_range": {"filter": memory_filter(since=day_ago, until=now), "sort": LIST_SORT, "limit": 101},
+        "memories.export_resume": {"filter": export_filter((day_ago, "explain-probe")), "sort": EXPORT_SORT, "limit": 0},
+        "planet.status_aggregate": {"pipeline": planet_status_pipeline(day_ago)},
+        "planet.window_seed": {"filter": {"timestamp": {"$gte": day_ago}}, "sort": None, "limit": 0},
+    }
+
+
+def _plan_stages(plan: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Flatten an explain plan tree into its stages (stage name + index name when present)."""
+    out = [{"stage": plan.get("stage"), "index": plan.get("indexName")}]
+    for key in ("inputStage", "queryPlan"):
+        if isinstance(plan.get(key), dict):
+            out += _plan_stages(plan[key])
+    for child in plan.get("inputStages", []) or []:
+        out += _plan_stages(child)
+    return out
+
+
+def summarize_explain(explain: Dict[str, Any]) -> Dict[str, Any]:
+    if "queryPlanner" not in explain and explain.get("stages"):
+        # aggregate explain: the query part sits in the leading $cursor stage
+        explain = explain["stages"][0].get("$cursor", {})
+    planner = explain.get("queryPlanner", {})
+    stages = _plan_stages(planner.get("winningPlan", {}))
+    names = [s["stage"] for s in stages]
+    stats = explain.get("executionStats", {})
+    return {
+        "stages": names,
+        "indexes": sorted({s["index"] for s in stages if s["index"]}),
+        "collscan": "COLLSCAN" in names,
+        "in_memory_sort": "SORT" in names,  # blocking sort: no index provides the order
+        "docs_examined": stats.get("totalDocsExamined"),
+        "keys_examined": stats.get("totalKeysExamined"),
+    }
+
+
+async def explain_route_queries(collection, verbosity: str = "queryPlanner") -> Dict[str, Any]:
+    """
+    Run `explain` on every route query shape and flag collection scans / in-memory sorts.
+    `verbosity="executionStats"` also reports docs/keys examined (executes the queries).
+    """
+    db = collection.database
+    shapes = route_query_shapes()
+    results: Dict[str, Any] = {}
+    for name, shape in shapes.items():
+        if "pipeline" in shape:
+            cmd: Dict[str, Any] = {"aggregate": collection.name, "pipeline": shape["pipeline"], "cursor": {}}
+        else:
+            cmd = {"find": collection.name, "filter": shape["filter"]}
+            if shape["sort"]:
+                cmd["sort"] = dict(shape["sort"])
+            if shape["limit"]:
+                cmd["limit"] = shape["limit"]
+        try:
+            explain = await db.command({"explain": cmd, "verbosity": verbosity})
+            results[name] = summarize_explain(explain)
+        except Exception as e:
+            results[name] = {"error": str(e)}
+    flagged = sorted(n for n, r in results.items() if r.get("collscan") or r.get("in_memory_sort"))
+    for n in flagged:
+        logger.warning("Query shape %s is not index-backed: %s", n, results[n].get("stages"))
+    return {"ok": not flagged and not any("error" in r for r in results.values()), "flagged": flagged, "queries": results}
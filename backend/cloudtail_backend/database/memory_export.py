@@ -0,0 +1,106 @@
+from __future__ import annotations
+
+import gzip
+import json
+import os
+import zlib
+from datetime import datetime
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, Optional, Tuple
+
+from cloudtail_backend.database.memory_queries import after_filter
+
+# Oldest first, so a (timestamp, id) checkpoint resumes an interrupted export exactly
+EXPORT_SORT = [("timestamp", 1), ("id", 1)]
+EXPORT_BATCH_SIZE = int(os.getenv("CLOUDTAIL_EXPORT_BATCH_SIZE", "1000"))
+# Flush the response roughly every this many bytes (rows are small; one chunk per row is wasteful)
+EXPORT_CHUNK_BYTES = 64 * 1024
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+
+def export_line(doc: Dict[str, Any]) -> bytes:
+    """One stored document as an NDJSON line (raw fields, `_id` dropped)."""
+    doc.pop("_id", None)
+    return json.dumps(doc, ensure_ascii=False, separators=(",", ":"), default=_json_default).encode("utf-8") + b"\n"
+
+
+def export_filter(after: Optional[Tuple[datetime, str]] = None) -> Dict[str, Any]:
+    return after_filter(after[0], after[1], descending=False) if after is not None else {}
+
+
+async def iter_export(
+    collection,
+    after: Optional[Tuple[datetime, str]] = None,
+    batch_size: int = EXPORT_BATCH_SIZE,
+) -> AsyncIterator[bytes]:
+    """
+    NDJSON chunks for every memory after `after`, oldest first. The Motor cursor fetches
+    `batch_size` documents per round-trip and rows are yielded as they arrive, so memory
+    stays bounded by one batch whatever the collection size.
+    """
+    cursor = collection.find(export_filter(after)).sort(EXPORT_SORT).batch_size(batch_size)
+    buf = bytearray()
+    async for doc in cursor:
+        buf += export_line(doc)
+        if len(buf) >= EXPORT_CHUNK_BYTES:
+            yield bytes(buf)
+            buf.clear()
+    if buf:
+        yield bytes(buf)
+
+
+async def gzip_chunks(chunks: AsyncIterator[bytes], level: int = 6) -> AsyncIterator[bytes]:
+    """Compress a chunk stream on the fly into one gzip member."""
+    z = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    async for chunk in chunks:
+        out = z.compress(chunk)
+        if out:
+            yield out
+    yield z.flush()
+
+
+def truncate_partial_row(path: Path) -> None:
+    """Cut a plain export back to its last complete row (an interrupted write may leave half a line)."""
+    with open(path, "rb+") as f:
+        end = f.seek(0, os.SEEK_END)
+        pos = end
+        while pos > 0:
+            step = min(64 * 1024, pos)
+            f.seek(pos - step)
+            block = f.read(step)
+            nl = block.rfind(b"\n")
+            if nl >= 0:
+                pos = pos - step + nl + 1
+                break
+            pos -= step
+        if pos != end:
+            f.truncate(pos)
+
+
+def last_checkpoint(path: Path) -> Optional[Tuple[datetime, str]]:
+    """
+    (timestamp, id) of the last complete row in an existing export file (plain or .gz),
+    read as a stream. Raises ValueError for a .gz file cut off mid-member, which
+    cannot be appended to safely.
+    """
+    path = Path(path)
+    if not path.exists() or path.stat().st_size == 0:
+        return None
+    opener = gzip.open if path.suffix == ".gz" else open
+    last: Optional[bytes] = None
+    try:
+        with opener(path, "rb") as f:
+            for line in f:
+                if line.endswith(b"\n"):
+                    last = line
+    except (EOFError, OSError, zlib.error) as e:
+        raise ValueError(f"{path} is damaged ({e}); export to a new file with an explicit checkpoint") from e
+    if last is None:
+        return None
+    row = json.loads(last)
+    return datetime.fromisoformat(row["timestamp"]), str(row["id"])
@@ -0,0 +1,174 @@
+from __future__ import annotations
+
+import base64
+import json
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from cloudtail_backend.models.memory import ALIASES, CANON, MemoryEntry
+
+# Query shapes shared by the memories routes (and the indexes backing them).
+# Listing is newest-first on (timestamp, id): `id` breaks ties between equal timestamps,
+# so the order is total and a keyset cursor never skips or repeats a document.
+LIST_SORT: List[Tuple[str, int]] = [("timestamp", -1), ("id", -1)]
+
+MEMORY_FIELDS = tuple(MemoryEntry.__fields__.keys())
+CURSOR_FIELDS = ("timestamp", "id")
+# What planet status reads from a memory (utils.emotion.get_final_emotion + privacy)
+STATUS_FIELDS = ("detected_emotion", "manual_override", "is_private")
+
+
+# ---------- Continuation tokens ----------
+
+def encode_cursor(timestamp: datetime, memory_id: str) -> str:
+    """Opaque, URL-safe token for the position just after (timestamp, id)."""
+    raw = json.dumps({"t": timestamp.isoformat(), "i": memory_id}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(token: str) -> Tuple[datetime, str]:
+    """Inverse of encode_cursor; raises ValueError on anything malformed."""
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        return datetime.fromisoformat(data["t"]), str(data["i"])
+    except Exception as e:
+        raise ValueError(f"invalid cursor: {token!r}") from e
+
+
+def after_filter(timestamp: datetime, memory_id: str, descending: bool = True) -> Dict[str, Any]:
+    """Documents strictly after (timestamp, id) in LIST_SORT order (or its reverse)."""
+    op = "$lt" if descending else "$gt"
+    return {"$or": [
+        {"timestamp": {op: timestamp}},
+        {"timestamp": timestamp, "id": {op: memory_id}},
+    ]}
+
+
+# ---------- Filters ----------
+
+def emotion_labels(emotion: str) -> List[str]:
+    """
+    `emotion` plus its lowercase aliases. Writes store canonical labels; older documents
+    with other casing or unknown labels are only matched after
+    `python -m cloudtail_backend canonicalize` (tools/canonicalize_emotions.py).
+    """
+    emotion = emotion.lower()
+    return [emotion] + sorted(alias for alias, canon in ALIASES.items() if canon == emotion)
+
+
+def canonical_emotion(label: str) -> Optional[str]:
+    """Canonical emotion for `label`, or None if it is neither canonical nor a known alias."""
+    label = (label or "").strip().lower()
+    if label in CANON:
+        return label
+    return ALIASES.get(label)
+
+
+def emotion_filter(emotion: str) -> Dict[str, Any]:
+    """Final emotion == `emotion`: manual_override wins, else detected_emotion (utils.emotion.get_final_emotion)."""
+    labels = emotion_labels(emotion)
+    return {"$or": [
+        {"manual_override": {"$in": labels}},
+        {"manual_override": {"$in": [None, ""]}, "detected_emotion": {"$in": labels}},
+    ]}
+
+
+def memory_filter(
+    emotion: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    is_private: Optional[bool] = None,
+    after: Optional[Tuple[datetime, str]] = None,
+    descending: bool = True,
+) -> Dict[str, Any]:
+    """
+    Compose the find() filter: `since` inclusive, `until` exclusive, `is_private=False`
+    also matches documents without the field. `after` is a decoded cursor position.
+    """
+    clauses: List[Dict[str, Any]] = []
+    if since is not None or until is not None:
+        ts: Dict[str, Any] = {}
+        if since is not None:
+            ts["$gte"] = since
+        if until is not None:
+            ts["$lt"] = until
+        clauses.append({"timestamp": ts})
+    if is_private is not None:
+        clauses.append({"is_private": True} if is_private else {"is_private": {"$ne": True}})
+    if emotion is not None:
+        clauses.append(emotion_filter(emotion))
+    if after is not None:
+        clauses.append(after_filter(after[0], after[1], descending))
+    if not clauses:
+        return {}
+    return clauses[0] if len(clauses) == 1 else {"$and": clauses}
+
+
+def planet_status_pipeline(since: datetime, history_len: int = 12) -> List[Dict[str, Any]]:
+    """
+    Planet status in one aggregation: public memories since `since`, counted per
+    (detected_emotion, manual_override) pair, plus the emotion fields of the newest
+    `history_len`. $match + $sort walk the timestamp_id index, so the history branch
+    takes the first documents of an ordered stream instead of sorting in memory.
+    Returns one document: {"counts": [{"_id": {"detected", "override"}, "n"}], "history": [...]}.
+    """
+    return [
+        {"$match": {"timestamp": {"$gte": since}, "is_private": {"$ne": True}}},
+        {"$sort": dict(LIST_SORT)},
+        {"$facet": {
+            "counts": [
+                {"$group": {
+                    "_id": {"detected": "$detected_emotion", "override": "$manual_override"},
+                    "n": {"$sum": 1},
+                }},
+            ],
+            "history": [
+                {"$limit": history_len},
+                {"$project": {"_id": 0, "detected_emotion": 1, "manual_override": 1}},
+            ],
+        }},
+    ]
+
+
+def projection(fields: Optional[Iterable[str]]) -> Dict[str, int]:
+    """
+    Mongo projection for the requested MemoryEntry fields (None = whole document).
+    The cursor fields are always included; `_id` never is. Raises ValueError on unknown names.
+    """
+    if fields is None:
+        return {"_id": 0}
+    wanted = [f for f in fields if f]
+    unknown = [f for f in wanted if f not in MEMORY_FIELDS]
+    if unknown:
+        raise ValueError(f"unknown fields: {', '.join(unknown)}")
+    proj = {f: 1 for f in wanted}
+    proj.update({f: 1 for f in CURSOR_FIELDS})
+    proj["_id"] = 0
+    return proj
+
+
+def parse_fields(fields: Optional[str]) -> Optional[List[str]]:
+    """'id,timestamp,detected_emotion' → list; None/blank → None (all fields)."""
+    if fields is None or not fields.strip():
+        return None
+    return [f.strip() for f in fields.split(",") if f.strip()]
+
+
+_FIELD_DEFAULTS = {"manual_override": None, "keywords": None, "is_private": False}
+
+
+def shape_doc(doc: Dict[str, Any], full: bool = True) -> Dict[str, Any]:
+    """
+    Raw Mongo document → MemoryEntry-shaped dict without building the model:
+    emotions canonicalized like the MemoryEntry validators, defaults filled for whole documents.
+    """
+    doc.pop("_id", None)
+    if full:
+        for k, v in _FIELD_DEFAULTS.items():
+            doc.setdefault(k, v)
+    if "detected_emotion" in doc:
+        doc["detected_emotion"] = canonical_emotion(doc["detected_emotion"]) or "gratitude"
+    if doc.get("manual_override") is not None:
+        doc["manual_override"] = canonical_emotion(doc["manual_override"]) or "gratitude"
+    return doc
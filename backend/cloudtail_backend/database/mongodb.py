@@ -1,15 +1,20 @@
 from __future__ import annotations
 
 import os
-from functools import lru_cache
-from typing import Optional
+import time
+import asyncio
+import threading
+from typing import Any, Dict, Optional
 
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import monitoring
 from pymongo.errors import ConfigurationError
 
+from cloudtail_backend.utils.circuit_breaker import OPEN, CircuitBreaker, get_breaker
+
 # NOTE:
-# Do NOT resolve DB/collections at import time. Read env & connect lazily,
-# and raise clear errors if envs are missing.
+# Do NOT resolve DB/collections at import time. Read env & connect lazily (or in the
+# startup hook, main.py), and raise clear errors if envs are missing.
 
 def _get_env(name: str, default: Optional[str] = None) -> Optional[str]:
     v = os.getenv(name, default)
@@ -18,17 +23,178 @@ def _get_env(name: str, default: Optional[str] = None) -> Optional[str]:
         return None
     return v
 
-@lru_cache
-def _client() -> AsyncIOMotorClient:
+def _int_env(name: str, default: int) -> int:
+    v = _get_env(name)
+    return int(v) if v is not None else default
+
+# Pool / connection settings (pymongo defaults: maxPoolSize=100, minPoolSize=0)
+MAX_POOL_SIZE = _int_env("CLOUDTAIL_MONGO_MAX_POOL", 100)
+MIN_POOL_SIZE = _int_env("CLOUDTAIL_MONGO_MIN_POOL", 2)
+MAX_IDLE_MS = _int_env("CLOUDTAIL_MONGO_MAX_IDLE_MS", 300000)
+SERVER_SELECTION_MS = _int_env("CLOUDTAIL_MONGO_SERVER_SELECTION_MS", 3000)
+# e.g. "zstd,snappy,zlib" (zstd/snappy need their python packages); empty = no compression
+COMPRESSORS = _get_env("CLOUDTAIL_MONGO_COMPRESSORS")
+# /healthz pings Mongo at most this often; hits in between report the last result
+HEALTH_PING_S = float(_get_env("CLOUDTAIL_HEALTH_PING_S") or 5)
+
+
+class PoolStats(monitoring.ConnectionPoolListener):
+    """Connection pool counters from pymongo's monitoring events (all servers of the client)."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.open = 0
+        self.checked_out = 0
+        self.max_checked_out = 0
+        self.created = 0
+        self.closed = 0
+        self.checkouts = 0
+        self.checkout_failures = 0
+        self.cleared = 0
+
+    def pool_created(self, event): pass
+    def pool_ready(self, event): pass
+    def pool_closed(self, event): pass
+    def connection_check_out_started(self, event): pass
+    def connection_ready(self, event): pass
+
+    def pool_cleared(self, event):
+        with self._lock:
+            self.cleared += 1
+
+    def connection_created(self, event):
+        with self._lock:
+            self.created += 1
+            self.open += 1
+
+    def connection_closed(self, event):
+        with self._lock:
+            self.closed += 1
+            self.open = max(0, self.open - 1)
+
+    def connection_check_out_failed(self, event):
+        with self._lock:
+            self.checkout_failures += 1
+
+    def connection_checked_out(self, event):
+        with self._lock:
+            self.checkouts += 1
+            self.checked_out += 1
+            self.max_checked_out = max(self.max_checked_out, self.checked_out)
+
+    def connection_checked_in(self, event):
+        with self._lock:
+            self.checked_out = max(0, self.checked_out - 1)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "max_pool_size": MAX_POOL_SIZE,
+                "min_pool_size": MIN_POOL_SIZE,
+                "open": self.open,
+                "in_use": self.checked_out,
+                "utilization": round(self.checked_out / MAX_POOL_SIZE, 3) if MAX_POOL_SIZE else None,
+                "max_in_use": self.max_checked_out,
+                "created": self.created,
+                "closed": self.closed,
+                "checkouts": self.checkouts,
+                "checkout_failures": self.checkout_failures,
+                "cleared": self.cleared,
+            }
+
+
+_mongo: Optional[AsyncIOMotorClient] = None
+_mongo_lock = threading.Lock()
+_pool_stats = PoolStats()
+_last_ping: Dict[str, Any] = {}
+_last_ping_at = 0.0                                   # monotonic
+_health_ping: "Optional[asyncio.Future[Dict[str, Any]]]" = None
+
+
+def _new_client() -> AsyncIOMotorClient:
     uri = _get_env("CLOUDTAIL_MONGO_URI")
     if not uri:
         raise RuntimeError("CLOUDTAIL_MONGO_URI is not set")
-    try:
+    options: Dict[str, Any] = {
         # short timeout so failures fail fast in demo
-        return AsyncIOMotorClient(uri, serverSelectionTimeoutMS=3000)
+        "serverSelectionTimeoutMS": SERVER_SELECTION_MS,
+        "maxPoolSize": MAX_POOL_SIZE,
+        "minPoolSize": MIN_POOL_SIZE,
+        "maxIdleTimeMS": MAX_IDLE_MS,
+        "event_listeners": [_pool_stats],
+    }
+    if COMPRESSORS:
+        options["compressors"] = COMPRESSORS
+    try:
+        return AsyncIOMotorClient(uri, **options)
     except ConfigurationError as e:
         raise RuntimeError(f"Mongo URI invalid: {e}") from e
 
+
+def _client() -> AsyncIOMotorClient:
+    """The process-wide client: opened by start_mongo() at startup, or on first use (CLI tools)."""
+    global _mongo
+    if _mongo is None:
+        with _mongo_lock:
+            if _mongo is None:
+                _mongo = _new_client()
+    return _mongo
+
+
+async def ping_mongo(timeout_s: Optional[float] = None) -> Dict[str, Any]:
+    """Round-trip a `ping`; returns {"ok", "ms"} or {"ok": False, "error"} (never raises)."""
+    started = time.perf_counter()
+    try:
+        ping = _client().admin.command("ping")
+        await (asyncio.wait_for(ping, timeout_s) if timeout_s else ping)
+        result: Dict[str, Any] = {"ok": True, "ms": round((time.perf_counter() - started) * 1000.0, 2)}
+    except Exception as e:
+        result = {"ok": False, "error": str(e) or type(e).__name__}
+    global _last_ping_at
+    _last_ping.clear()
+    _last_ping.update(result, at=time.time())
+    _last_ping_at = time.monotonic()
+    return result
+
+
+async def start_mongo() -> Dict[str, Any]:
+    """
+    Open the client and ping it, so the pool is connected (and kept at minPoolSize)
+    before the first request. Returns the ping result.
+    """
+    _client()
+    return await ping_mongo()
+
+
+def close_mongo() -> None:
+    global _mongo
+    with _mongo_lock:
+        client, _mongo = _mongo, None
+    if client is not None:
+        client.close()
+
+
+async def mongo_health(timeout_s: float = 1.0) -> Dict[str, Any]:
+    """
+    /healthz detail: ping latency and pool utilization (no client is opened just for this).
+    Reports the last ping result; a new ping is started in the background at most once per
+    HEALTH_PING_S, and not while the storage breaker is open, so the probe itself never
+    waits on Mongo (only the very first call, with nothing to report yet, awaits one).
+    """
+    global _health_ping
+    if _mongo is None:
+        return {"client_open": False}
+    if not _last_ping:
+        ping = await ping_mongo(timeout_s)
+    else:
+        stale = time.monotonic() - _last_ping_at >= HEALTH_PING_S
+        idle = _health_ping is None or _health_ping.done()
+        if stale and idle and storage_breaker().state != OPEN:
+            _health_ping = asyncio.ensure_future(ping_mongo(timeout_s))
+        ping = {**_last_ping, "cached": True}
+    return {"client_open": True, "ping": ping, "pool": _pool_stats.snapshot()}
+
+
 def get_db_name() -> str:
     db = _get_env("CLOUDTAIL_MONGO_DB")
     if not db or not isinstance(db, str):
@@ -38,5 +204,28 @@ def get_db_name() -> str:
 def get_db():
     return _client()[get_db_name()]
 
+# "mongo" (default) or "sqlite": an embedded file database (database/sqlite_store.py)
+STORAGE = (os.getenv("CLOUDTAIL_STORAGE", "mongo") or "mongo").strip().lower()
+
+
 def get_memory_collection():
+    if STORAGE == "sqlite":
+        from cloudtail_backend.database.sqlite_store import get_sqlite_collection
+
+        return get_sqlite_collection()
     return get_db()["memories"]
+
+
+def storage_breaker() -> CircuitBreaker:
+    """Breaker shared by the hot read paths (planet status, window resync, memory list)."""
+    return get_breaker("storage")
+
+
+async def storage_health() -> Dict[str, Any]:
+    b = storage_breaker().stats()
+    breaker = {"state": b["state"], "trips": b["trips"]}
+    if STORAGE == "sqlite":
+        from cloudtail_backend.database.sqlite_store import SQLITE_PATH
+
+        return {"backend": "sqlite", "path": str(SQLITE_PATH), "breaker": breaker}
+    return {"backend": "mongo", **(await mongo_health()), "breaker": breaker}
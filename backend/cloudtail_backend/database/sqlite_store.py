@@ -0,0 +1,637 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+from pymongo.results import DeleteResult, InsertManyResult, InsertOneResult
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+SQLITE_PATH = Path(os.getenv("CLOUDTAIL_SQLITE_PATH", str(BASE_DIR / "storage" / "cloudtail.db")))
+SQLITE_THREADS = int(os.getenv("CLOUDTAIL_SQLITE_THREADS", "4"))
+# "NORMAL" is durable across crashes of the process in WAL mode; "FULL" also survives power loss
+SQLITE_SYNCHRONOUS = os.getenv("CLOUDTAIL_SQLITE_SYNCHRONOUS", "NORMAL").upper()
+
+# Queryable fields live in columns (indexed like the Mongo collection); the whole
+# document is kept as JSON in `doc`, timestamp excluded (it is the `ts` column).
+_COLUMNS = {
+    "id": "id",
+    "timestamp": "ts",
+    "detected_emotion": "detected_emotion",
+    "manual_override": "manual_override",
+    "is_private": "is_private",
+}
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS memories (
+    id               TEXT NOT NULL,
+    ts               INTEGER NOT NULL,     -- ms since epoch, UTC (BSON date precision)
+    detected_emotion TEXT,
+    manual_override  TEXT,
+    is_private       INTEGER NOT NULL DEFAULT 0,
+    doc              TEXT NOT NULL
+);
+CREATE UNIQUE INDEX IF NOT EXISTS id_unique ON memories (id);
+CREATE INDEX IF NOT EXISTS timestamp_id ON memories (ts DESC, id DESC);
+"""
+# Same names and keys as database.indexes.MEMORY_INDEXES
+_BUILTIN_INDEXES = {
+    "id_unique": {"key": [("id", 1)], "unique": True},
+    "timestamp_id": {"key": [("timestamp", -1), ("id", -1)]},
+}
+
+_SQL_OPS = {"$lt": "<", "$lte": "<=", "$gt": ">", "$gte": ">="}
+
+
+# ---------- Values ----------
+
+def _to_ms(value: datetime) -> int:
+    """Naive datetimes are UTC, as stored by the routes (datetime.utcnow())."""
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    delta = value - datetime(1970, 1, 1)
+    return (delta.days * 86400 + delta.seconds) * 1000 + delta.microseconds // 1000
+
+
+def _from_ms(ms: int) -> datetime:
+    return datetime(1970, 1, 1) + timedelta(milliseconds=ms)
+
+
+def _column_value(field: str, value: Any) -> Any:
+    if field == "timestamp" and isinstance(value, datetime):
+        return _to_ms(value)
+    if field == "is_private" and isinstance(value, bool):
+        return int(value)
+    return value
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+
+def _row_values(doc: Dict[str, Any]) -> Tuple[Any, ...]:
+    if "id" not in doc or not isinstance(doc.get("timestamp"), datetime):
+        raise ValueError("memories need an `id` and a datetime `timestamp`")
+    body = {k: v for k, v in doc.items() if k not in ("_id", "timestamp")}
+    return (
+        str(doc["id"]),
+        _to_ms(doc["timestamp"]),
+        doc.get("detected_emotion"),
+        doc.get("manual_override"),
+        1 if doc.get("is_private") is True else 0,
+        json.dumps(body, ensure_ascii=False, separators=(",", ":"), default=_json_default),
+    )
+
+
+def _doc_from_row(ts: int, body: str) -> Dict[str, Any]:
+    doc = json.loads(body)
+    doc["timestamp"] = _from_ms(ts)
+    return doc
+
+
+# ---------- Filters (the subset database/memory_queries.py builds) ----------
+
+def compile_filter(flt: Optional[Dict[str, Any]]) -> Tuple[str, List[Any]]:
+    """
+    Mongo filter → SQL WHERE clause + parameters. Supports $and / $or, equality,
+    $eq $ne $lt $lte $gt $gte $in $nin on the column fields; raises ValueError otherwise.
+    """
+    params: List[Any] = []
+    sql = _compile(flt or {}, params)
+    return sql or "1", params
+
+
+def _compile(flt: Dict[str, Any], params: List[Any]) -> str:
+    clauses: List[str] = []
+    for key, cond in flt.items():
+        if key in ("$and", "$or"):
+            parts = [_compile(sub, params) or "1" for sub in cond]
+            joiner = " AND " if key == "$and" else " OR "
+            clauses.append("(" + joiner.join(f"({p})" for p in parts) + ")" if parts else ("1" if key == "$and" else "0"))
+        elif key in _COLUMNS:
+            clauses.append(_compile_field(key, cond, params))
+        else:
+            raise ValueError(f"sqlite storage cannot filter on {key!r}")
+    return " AND ".join(clauses)
+
+
+def _compile_field(field: str, cond: Any, params: List[Any]) -> str:
+    col = _COLUMNS[field]
+    if not (isinstance(cond, dict) and cond and all(k.startswith("$") for k in cond)):
+        cond = {"$eq": cond}
+    parts: List[str] = []
+    for op, value in cond.items():
+        if op == "$eq":
+            parts.append(_eq(field, col, value, params))
+        elif op == "$ne":
+            if value is None:
+                parts.append(f"{col} IS NOT NULL")
+            else:
+                parts.append(f"({col} IS NULL OR {col} != ?)")
+                params.append(_column_value(field, value))
+        elif op in ("$in", "$nin"):
+            values = list(value)
+            ors: List[str] = []
+            if None in values:
+                ors.append(f"{col} IS NULL")
+            present = [_column_value(field, v) for v in values if v is not None]
+            if present:
+                ors.append(f"{col} IN ({','.join('?' * len(present))})")
+                params.extend(present)
+            match = "(" + " OR ".join(ors) + ")" if ors else "0"
+            # NOT over a NULL column is NULL in SQL; Mongo's $nin matches missing values unless None is listed
+            parts.append(match if op == "$in" else f"NOT {match}" if None in values else f"({col} IS NULL OR NOT {match})")
+        elif op in _SQL_OPS:
+            parts.append(f"{col} {_SQL_OPS[op]} ?")
+            params.append(_column_value(field, value))
+        else:
+            raise ValueError(f"sqlite storage does not support {op} (field {field!r})")
+    return " AND ".join(parts)
+
+
+def _eq(field: str, col: str, value: Any, params: List[Any]) -> str:
+    if value is None:
+        return f"{col} IS NULL"
+    params.append(_column_value(field, value))
+    return f"{col} = ?"
+
+
+def _order_by(sort: Optional[Sequence[Tuple[str, int]]]) -> str:
+    if not sort:
+        return ""
+    terms = []
+    for field, direction in sort:
+        if field not in _COLUMNS:
+            raise ValueError(f"sqlite storage cannot sort on {field!r}")
+        terms.append(f"{_COLUMNS[field]} {'DESC' if direction < 0 else 'ASC'}")
+    return " ORDER BY " + ", ".join(terms)
+
+
+def _apply_projection(doc: Dict[str, Any], proj: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    if not proj:
+        return doc
+    included = [k for k, v in proj.items() if v and k != "_id"]
+    if included:
+        return {k: doc[k] for k in included if k in doc}
+    excluded = {k for k, v in proj.items() if not v}
+    return {k: v for k, v in doc.items() if k not in excluded}
+
+
+# ---------- Aggregation stages evaluated in Python ----------
+
+_MISSING = object()
+
+
+def _get(doc: Dict[str, Any], path: str, default: Any = None) -> Any:
+    value: Any = doc
+    for part in path.split("."):
+        if not isinstance(value, dict) or part not in value:
+            return default
+        value = value[part]
+    return value
+
+
+def _matches(doc: Dict[str, Any], flt: Dict[str, Any]) -> bool:
+    for key, cond in flt.items():
+        if key == "$and":
+            if not all(_matches(doc, sub) for sub in cond):
+                return False
+            continue
+        if key == "$or":
+            if not any(_matches(doc, sub) for sub in cond):
+                return False
+            continue
+        value = _get(doc, key)
+        if not (isinstance(cond, dict) and cond and all(k.startswith("$") for k in cond)):
+            cond = {"$eq": cond}
+        for op, arg in cond.items():
+            if op == "$eq" and value != arg:
+                return False
+            if op == "$ne" and value == arg:
+                return False
+            if op == "$in" and value not in arg:
+                return False
+            if op == "$nin" and value in arg:
+                return False
+            if op in _SQL_OPS:
+                if value is None or arg is None:
+                    return False
+                if not {"$lt": value < arg, "$lte": value <= arg, "$gt": value > arg, "$gte": value >= arg}[op]:
+                    return False
+    return True
+
+
+def _expr(doc: Dict[str, Any], expr: Any) -> Any:
+    if isinstance(expr, str) and expr.startswith("$"):
+        return _get(doc, expr[1:])
+    if isinstance(expr, dict):
+        out = {}
+        for k, sub in expr.items():
+            if isinstance(sub, str) and sub.startswith("$") and _get(doc, sub[1:], _MISSING) is _MISSING:
+                continue  # Mongo leaves missing fields out of a composite group key
+            out[k] = _expr(doc, sub)
+        return out
+    return expr
+
+
+def _freeze(value: Any) -> Any:
+    if isinstance(value, dict):
+        return tuple(sorted((k, _freeze(v)) for k, v in value.items()))
+    if isinstance(value, list):
+        return tuple(_freeze(v) for v in value)
+    return value
+
+
+def _run_stages(docs: List[Dict[str, Any]], stages: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    for stage in stages:
+        (op, arg), = stage.items()
+        if op == "$match":
+            docs = [d for d in docs if _matches(d, arg)]
+        elif op == "$sort":
+            for field, direction in reversed(list(arg.items())):
+                docs.sort(key=lambda d: (_get(d, field) is not None, _get(d, field)), reverse=direction < 0)
+        elif op == "$limit":
+            docs = docs[:arg]
+        elif op == "$skip":
+            docs = docs[arg:]
+        elif op == "$project":
+            docs = [_apply_projection(d, arg) for d in docs]
+        elif op == "$group":
+            groups: Dict[Any, Dict[str, Any]] = {}
+            for d in docs:
+                key = _expr(d, arg["_id"])
+                out = groups.setdefault(_freeze(key), {"_id": key})
+                for name, acc in arg.items():
+                    if name == "_id":
+                        continue
+                    (acc_op, acc_arg), = acc.items()
+                    if acc_op != "$sum":
+                        raise ValueError(f"sqlite storage does not support {acc_op} in $group")
+                    out[name] = out.get(name, 0) + (_expr(d, acc_arg) or 0)
+            docs = list(groups.values())
+        elif op == "$facet":
+            docs = [{name: _run_stages(list(docs), sub) for name, sub in arg.items()}]
+        else:
+            raise ValueError(f"sqlite storage does not support aggregation stage {op}")
+    return docs
+
+
+# ---------- Motor-shaped API ----------
+
+class _ListCursor:
+    """Results already in memory (aggregations), with Motor's to_list / async iteration."""
+
+    def __init__(self, docs: "asyncio.Future[List[Dict[str, Any]]]") -> None:
+        self._docs = docs
+
+    async def to_list(self, length: Optional[int] = None) -> List[Dict[str, Any]]:
+        docs = await self._docs
+        return docs if length is None else docs[:length]
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for doc in await self._docs:
+            yield doc
+
+
+class SQLiteCursor:
+    """find() cursor: chainable sort/limit/skip/batch_size, then to_list() or `async for`."""
+
+    def __init__(self, collection: "SQLiteCollection", flt: Optional[Dict[str, Any]], proj: Optional[Dict[str, Any]]) -> None:
+        self._collection = collection
+        self._filter = flt
+        self._projection = proj
+        self._sort: Optional[List[Tuple[str, int]]] = None
+        self._limit = 0
+        self._skip = 0
+        self._batch_size = 1000
+
+    def sort(self, key: Any, direction: Optional[int] = None) -> "SQLiteCursor":
+        self._sort = [(key, direction if direction is not None else 1)] if isinstance(key, str) else list(key)
+        return self
+
+    def limit(self, n: int) -> "SQLiteCursor":
+        self._limit = int(n)
+        return self
+
+    def skip(self, n: int) -> "SQLiteCursor":
+        self._skip = int(n)
+        return self
+
+    def batch_size(self, n: int) -> "SQLiteCursor":
+        self._batch_size = max(1, int(n))
+        return self
+
+    def sql(self, limit: Optional[int] = None) -> Tuple[str, List[Any]]:
+        where, params = compile_filter(self._filter)
+        sql = f"SELECT ts, doc FROM memories WHERE {where}{_order_by(self._sort)}"
+        limits = [n for n in (self._limit, limit) if n]
+        if limits or self._skip:
+            sql += " LIMIT ? OFFSET ?"
+            params += [min(limits) if limits else -1, self._skip]
+        return sql, params
+
+    async def to_list(self, length: Optional[int] = None) -> List[Dict[str, Any]]:
+        sql, params = self.sql(limit=length)
+        rows = await self._collection._run(lambda conn: conn.execute(sql, params).fetchall())
+        return [_apply_projection(_doc_from_row(ts, body), self._projection) for ts, body in rows]
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        """Stream `batch_size` rows per thread hop from a connection held for the whole walk."""
+        sql, params = self.sql()
+        store = self._collection
+        conn = await store._run_raw(store._open_connection)
+        try:
+            cur = await store._run_raw(lambda: conn.execute(sql, params))
+            while True:
+                rows = await store._run_raw(lambda: cur.fetchmany(self._batch_size))
+                if not rows:
+                    break
+                for ts, body in rows:
+                    yield _apply_projection(_doc_from_row(ts, body), self._projection)
+        finally:
+            await store._run_raw(conn.close)
+
+
+class _SQLiteDatabase:
+    """`collection.database` stand-in: name and the `explain` command used by database/indexes.py."""
+
+    def __init__(self, collection: "SQLiteCollection") -> None:
+        self._collection = collection
+        self.name = str(collection.path)
+
+    async def command(self, cmd: Dict[str, Any]) -> Dict[str, Any]:
+        if "explain" not in cmd:
+            raise ValueError(f"sqlite storage does not support command {next(iter(cmd), None)!r}")
+        return await self._collection.explain(cmd["explain"], cmd.get("verbosity", "queryPlanner"))
+
+
+class SQLiteCollection:
+    """
+    The `memories` collection in a local SQLite file (WAL journal), shaped like the Motor
+    collection the routes use: insert_one / insert_many, find().sort().limit(),
+    find_one_and_update ($set), delete_one, count_documents, aggregate (leading
+    $match/$sort/$limit run in SQL, later stages in Python), create_index / index_information.
+    Calls run on a small thread pool, one connection per thread.
+    """
+
+    name = "memories"
+
+    def __init__(self, path: Path = SQLITE_PATH, threads: int = SQLITE_THREADS) -> None:
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._executor = ThreadPoolExecutor(max_workers=max(1, threads), thread_name_prefix="cloudtail-sqlite")
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        self._connections_lock = threading.Lock()
+        self.database = _SQLiteDatabase(self)
+        with closing(self._open_connection()) as conn:  # schema only; not a pooled connection
+            conn.executescript(_SCHEMA)
+        logger.info("SQLite storage ready: %s", self.path)
+
+    # ---------- Threads / connections ----------
+    def _open_connection(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False, timeout=5.0)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(f"PRAGMA synchronous={SQLITE_SYNCHRONOUS}")
+        return conn
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = self._open_connection()
+            with self._connections_lock:
+                self._connections.append(conn)
+        return conn
+
+    async def _run_raw(self, fn: Callable[[], Any]) -> Any:
+        return await asyncio.get_running_loop().run_in_executor(self._executor, fn)
+
+    async def _run(self, fn: Callable[[sqlite3.Connection], Any]) -> Any:
+        return await self._run_raw(lambda: fn(self._conn()))
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=True)
+        with self._connections_lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections.clear()
+
+    # ---------- Writes ----------
+    async def insert_one(self, doc: Dict[str, Any]) -> InsertOneResult:
+        values = _row_values(doc)
+
+        def _insert(conn: sqlite3.Connection) -> None:
+            try:
+                conn.execute("INSERT INTO memories (id, ts, detected_emotion, manual_override, is_private, doc) VALUES (?,?,?,?,?,?)", values)
+            except sqlite3.IntegrityError as e:
+                raise DuplicateKeyError(f"E11000 duplicate key error: id {values[0]!r} ({e})", 11000)
+
+        await self._run(_insert)
+        return InsertOneResult(values[0], True)
+
+    async def insert_many(self, docs: List[Dict[str, Any]], ordered: bool = True) -> InsertManyResult:
+        rows = [_row_values(d) for d in docs]
+
+        def _insert(conn: sqlite3.Connection) -> Tuple[List[Any], List[Dict[str, Any]]]:
+            inserted: List[Any] = []
+            errors: List[Dict[str, Any]] = []
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                for i, values in enumerate(rows):
+                    try:
+                        conn.execute("INSERT INTO memories (id, ts, detected_emotion, manual_override, is_private, doc) VALUES (?,?,?,?,?,?)", values)
+                        inserted.append(values[0])
+                    except sqlite3.IntegrityError as e:
+                        errors.append({"index": i, "code": 11000, "errmsg": f"E11000 duplicate key error: id {values[0]!r} ({e})"})
+                        if ordered:
+                            break
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            return inserted, errors
+
+        inserted, errors = await self._run(_insert)
+        if errors:
+            raise BulkWriteError({"writeErrors": errors, "nInserted": len(inserted)})
+        return InsertManyResult(inserted, True)
+
+    async def find_one_and_update(self, flt: Dict[str, Any], update: Dict[str, Any], return_document: bool = False, **_: Any) -> Optional[Dict[str, Any]]:
+        unsupported = set(update) - {"$set"}
+        if unsupported:
+            raise ValueError(f"sqlite storage only supports $set updates (got {sorted(unsupported)})")
+        changes = dict(update.get("$set", {}))
+        where, params = compile_filter(flt)
+
+        def _update(conn: sqlite3.Connection) -> Optional[Dict[str, Any]]:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute(f"SELECT rowid, ts, doc FROM memories WHERE {where} LIMIT 1", params).fetchone()
+                if row is None:
+                    conn.execute("COMMIT")
+                    return None
+                rowid, ts, body = row
+                before = _doc_from_row(ts, body)
+                after = {**before, **changes}
+                values = _row_values(after)
+                conn.execute(
+                    "UPDATE memories SET id=?, ts=?, detected_emotion=?, manual_override=?, is_private=?, doc=? WHERE rowid=?",
+                    (*values, rowid),
+                )
+                conn.execute("COMMIT")
+            except sqlite3.IntegrityError as e:
+                conn.execute("ROLLBACK")
+                raise DuplicateKeyError(f"E11000 duplicate key error ({e})", 11000)
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            return after if return_document else before
+
+        return await self._run(_update)
+
+    async def delete_one(self, flt: Dict[str, Any]) -> DeleteResult:
+        where, params = compile_filter(flt)
+
+        def _delete(conn: sqlite3.Connection) -> int:
+            return conn.execute(
+                f"DELETE FROM memories WHERE rowid = (SELECT rowid FROM memories WHERE {where} LIMIT 1)", params
+            ).rowcount
+
+        n = await self._run(_delete)
+        return DeleteResult({"n": n, "ok": 1.0}, True)
+
+    # ---------- Reads ----------
+    def find(self, flt: Optional[Dict[str, Any]] = None, projection: Optional[Dict[str, Any]] = None) -> SQLiteCursor:
+        return SQLiteCursor(self, flt, projection)
+
+    async def find_one(self, flt: Optional[Dict[str, Any]] = None, projection: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+        docs = await self.find(flt, projection).limit(1).to_list(1)
+        return docs[0] if docs else None
+
+    async def count_documents(self, flt: Optional[Dict[str, Any]] = None) -> int:
+        where, params = compile_filter(flt)
+        return await self._run(lambda conn: conn.execute(f"SELECT COUNT(*) FROM memories WHERE {where}", params).fetchone()[0])
+
+    async def estimated_document_count(self) -> int:
+        return await self.count_documents({})
+
+    def _pushdown(self, pipeline: List[Dict[str, Any]]) -> Tuple[SQLiteCursor, List[Dict[str, Any]]]:
+        """Split a pipeline into a SQL cursor (leading $match / $sort / $limit) and the stages left."""
+        cursor = self.find({})
+        clauses: List[Dict[str, Any]] = []
+        rest = list(pipeline)
+        while rest:
+            (op, arg), = rest[0].items()
+            if op == "$match" and cursor._sort is None and not cursor._limit:
+                try:
+                    compile_filter(arg)
+                except ValueError:
+                    break
+                clauses.append(arg)
+            elif op == "$sort" and cursor._sort is None and not cursor._limit and all(f in _COLUMNS for f in arg):
+                cursor.sort(list(arg.items()))
+            elif op == "$limit" and not cursor._limit:
+                cursor.limit(arg)
+            else:
+                break
+            rest.pop(0)
+        if clauses:
+            cursor._filter = clauses[0] if len(clauses) == 1 else {"$and": clauses}
+        return cursor, rest
+
+    def aggregate(self, pipeline: List[Dict[str, Any]]) -> _ListCursor:
+        """Leading $match / $sort / $limit become the SQL query; the rest runs over the rows in Python."""
+        cursor, rest = self._pushdown(pipeline)
+
+        async def _results() -> List[Dict[str, Any]]:
+            return _run_stages(await cursor.to_list(), rest)
+
+        return _ListCursor(asyncio.ensure_future(_results()))
+
+    # ---------- Indexes ----------
+    async def create_index(self, keys: Sequence[Tuple[str, int]], name: Optional[str] = None, unique: bool = False, **_: Any) -> str:
+        keys = list(keys)
+        name = name or "_".join(f"{f}_{d}" for f, d in keys)
+        if name in _BUILTIN_INDEXES:
+            return name  # created with the schema
+        for field, _direction in keys:
+            if field not in _COLUMNS:
+                raise ValueError(f"sqlite storage cannot index {field!r}")
+        cols = ", ".join(f"{_COLUMNS[f]} {'DESC' if d < 0 else 'ASC'}" for f, d in keys)
+
+        def _create(conn: sqlite3.Connection) -> None:
+            try:
+                conn.execute(f"CREATE {'UNIQUE ' if unique else ''}INDEX IF NOT EXISTS {name} ON memories ({cols})")
+            except sqlite3.IntegrityError as e:
+                raise DuplicateKeyError(f"E11000 duplicate key error building {name} ({e})", 11000)
+
+        await self._run(_create)
+        return name
+
+    async def index_information(self) -> Dict[str, Dict[str, Any]]:
+        rows = await self._run(lambda conn: conn.execute("SELECT name, sql FROM sqlite_master WHERE type='index' AND tbl_name='memories'").fetchall())
+        info: Dict[str, Dict[str, Any]] = {}
+        for name, sql in rows:
+            info[name] = dict(_BUILTIN_INDEXES.get(name) or {"key": sql})
+        return info
+
+    async def explain(self, cmd: Dict[str, Any], verbosity: str = "queryPlanner") -> Dict[str, Any]:
+        """
+        Mongo-shaped explain for a find / aggregate command, from EXPLAIN QUERY PLAN:
+        SCAN → COLLSCAN, SEARCH … USING INDEX → IXSCAN, TEMP B-TREE FOR ORDER BY → SORT.
+        """
+        if "aggregate" in cmd:
+            sql_cursor, _ = self._pushdown(cmd["pipeline"])
+        else:
+            sql_cursor = self.find(cmd.get("filter")).limit(cmd.get("limit", 0))
+            if cmd.get("sort"):
+                sql_cursor.sort(list(cmd["sort"].items()))
+        sql, params = sql_cursor.sql()
+        plan = await self._run(lambda conn: conn.execute("EXPLAIN QUERY PLAN " + sql, params).fetchall())
+        details = [row[-1] for row in plan]
+        inputs = []
+        for d in details:
+            if d.startswith("SCAN") and "USING" not in d:
+                inputs.append({"stage": "COLLSCAN"})
+            elif " INDEX " in d:
+                index = d.split(" INDEX ", 1)[1].split(" ", 1)[0]
+                inputs.append({"stage": "IXSCAN", "indexName": index})
+        winning: Dict[str, Any] = {"stage": "FETCH", "inputStages": inputs}
+        if any("TEMP B-TREE FOR ORDER BY" in d for d in details):
+            winning = {"stage": "SORT", "inputStage": winning}
+        out: Dict[str, Any] = {"queryPlanner": {"winningPlan": winning, "sqlite": {"sql": sql, "plan": details}}}
+        if verbosity == "executionStats":
+            rows = await sql_cursor.to_list()
+            out["executionStats"] = {"nReturned": len(rows)}
+        return out
+
+
+_collection: Optional[SQLiteCollection] = None
+_collection_lock = threading.Lock()
+
+
+def get_sqlite_collection() -> SQLiteCollection:
+    global _collection
+    if _collection is None:
+        with _collection_lock:
+            if _collection is None:
+                _collection = SQLiteCollection()
+    return _collection
@@ -0,0 +1,168 @@
+from __future__ import annotations
+import os, logging, threading, time
+from collections import Counter, deque
+from concurrent.futures import Future
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from ..models.memory import EmotionEssence
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_BATCH_SIZE = int(os.getenv("CLOUDTAIL_BATCH_MAX_SIZE", "16"))
+DEFAULT_MAX_WAIT_MS = float(os.getenv("CLOUDTAIL_BATCH_MAX_WAIT_MS", "5"))
+
+_Pending = Tuple[str, Future, float]  # (text, future, enqueued_at)
+
+
+class MicroBatcher:
+    """
+    Groups concurrent extract_emotion calls into one engine.extract_batch call.
+
+    A single worker thread owns the model: it takes the oldest pending text, waits
+    until max_wait_ms after that text was queued (or until max_batch_size texts are
+    pending), then runs them as one forward pass and resolves each caller's future.
+    """
+
+    def __init__(
+        self,
+        engine: Any,
+        max_batch_size: int = DEFAULT_MAX_BATCH_SIZE,
+        max_wait_ms: float = DEFAULT_MAX_WAIT_MS,
+    ) -> None:
+        self.engine = engine
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait_s = max(0.0, float(max_wait_ms)) / 1000.0
+
+        self._queue: Deque[_Pending] = deque()
+        self._cond = threading.Condition()
+        self._closed = False
+
+        # stats (guarded by _cond)
+        self._batches = 0
+        self._items = 0
+        self._errors = 0
+        self._batch_sizes: Counter = Counter()
+        self._max_queue_depth = 0
+        self._queue_wait_s = 0.0
+
+        self._thread = threading.Thread(target=self._run, name="cloudtail-batcher", daemon=True)
+        self._thread.start()
+
+    # ---------- Callers ----------
+    def submit(self, text: str) -> "Future[EmotionEssence]":
+        """Queue one text; the returned future resolves to its EmotionEssence."""
+        fut: Future = Future()
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("batcher_closed")
+            self._queue.append((text, fut, time.perf_counter()))
+            self._max_queue_depth = max(self._max_queue_depth, len(self._queue))
+            self._cond.notify()
+        return fut
+
+    def extract_emotion(self, text: str, timeout: Optional[float] = None) -> EmotionEssence:
+        """Blocking drop-in for engine.extract_emotion (for sync routes in the threadpool)."""
+        return self.submit(text).result(timeout)
+
+    def close(self) -> None:
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join(timeout=5)
+
+    # ---------- Worker ----------
+    def _next_batch(self) -> List[_Pending]:
+        with self._cond:
+            while not self._queue and not self._closed:
+                self._cond.wait()
+            if not self._queue:
+                return []
+            deadline = self._queue[0][2] + self.max_wait_s
+            while len(self._queue) < self.max_batch_size and not self._closed:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            n = min(len(self._queue), self.max_batch_size)
+            return [self._queue.popleft() for _ in range(n)]
+
+    def _run(self) -> None:
+        while True:
+            batch = self._next_batch()
+            if not batch:
+                return  # closed and drained
+            # drop callers that gave up while queued
+            batch = [p for p in batch if p[1].set_running_or_notify_cancel()]
+            if not batch:
+                continue
+
+            started = time.perf_counter()
+            try:
+                results = self.engine.extract_batch([p[0] for p in batch], batch_size=len(batch))
+            except Exception as e:
+                logger.exception("Micro-batch of %d failed: %s", len(batch), e)
+                for _, fut, _ in batch:
+                    fut.set_exception(e)
+                with self._cond:
+                    self._errors += 1
+                continue
+
+            for (_, fut, _), essence in zip(batch, results):
+                fut.set_result(essence)
+
+            with self._cond:
+                self._batches += 1
+                self._items += len(batch)
+                self._batch_sizes[len(batch)] += 1
+                self._queue_wait_s += sum(started - p[2] for p in batch)
+
+    # ---------- Diagnostics ----------
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            return {
+                "active": not self._closed,
+                "max_batch_size": self.max_batch_size,
+                "max_wait_ms": round(self.max_wait_s * 1000.0, 3),
+                "queue_depth": len(self._queue),
+                "max_queue_depth": self._max_queue_depth,
+                "batches": self._batches,
+                "items": self._items,
+                "errors": self._errors,
+                "avg_batch_size": round(self._items / self._batches, 3) if self._batches else 0.0,
+                "avg_queue_wait_ms": round(1000.0 * self._queue_wait_s / self._items, 3) if self._items else 0.0,
+                "batch_size_histogram": {str(k): v for k, v in sorted(self._batch_sizes.items())},
+            }
+
+
+# ---------- Process-wide instance ----------
+_batcher: Optional[MicroBatcher] = None
+_batcher_lock = threading.Lock()
+
+
+def get_batcher(engine: Any) -> MicroBatcher:
+    """Return the shared batcher for `engine`, (re)creating it if the engine changed."""
+    global _batcher
+    with _batcher_lock:
+        if _batcher is None or _batcher.engine is not engine:
+            if _batcher is not None:
+                _batcher.close()
+            _batcher = MicroBatcher(engine)
+            logger.info(
+                "Micro-batcher ready: max_batch_size=%d, max_wait_ms=%.1f",
+                _batcher.max_batch_size, _batcher.max_wait_s * 1000.0,
+            )
+        return _batcher
+
+
+def current_batcher() -> Optional[MicroBatcher]:
+    """The shared batcher if one has been started (diagnostics only; never creates one)."""
+    return _batcher
+
+
+def shutdown_batcher() -> None:
+    """Close and drop the shared batcher; the next get_batcher() starts a fresh one."""
+    global _batcher
+    with _batcher_lock:
+        batcher, _batcher = _batcher, None
+    if batcher is not None:
+        batcher.close()
@@ -0,0 +1,89 @@
+from __future__ import annotations
+import threading
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, Mapping, Optional
+
+from .keyword_matcher import KeywordMatcher
+
+# Deterministic port of legacy/emotion_extractor.py: same keyword lists with the
+# random.uniform jitter removed, folded onto the canonical four ("peace" → gratitude).
+# No keyword hit means "not confident" here (the legacy scorer fell back to "peace").
+CASCADE_KEYWORDS: Dict[str, list] = {
+    "sadness": ["loss", "cry", "empty", "lonely", "miss", "grief"],
+    "guilt": ["sorry", "regret", "should", "blame", "fault"],
+    "gratitude": ["thank", "grateful", "appreciate", "blessing", "calm", "quiet", "still", "accept", "release"],
+    "nostalgia": ["remember", "childhood", "once", "old", "used to"],
+}
+
+DEFAULT_MIN_MARGIN = 2
+
+
+@dataclass(frozen=True)
+class KeywordVerdict:
+    label: Optional[str]   # top canonical emotion, None if nothing matched
+    hits: int              # keyword occurrences for `label`
+    margin: int            # hits(top) - hits(runner-up)
+    confident: bool        # margin >= min_margin: answer without the transformer
+
+    @property
+    def value(self) -> float:
+        """Legacy intensity formula without jitter: 0.2 + 0.1 per hit, capped at 1.0."""
+        return min(1.0, 0.2 + 0.1 * self.hits)
+
+
+class KeywordTier:
+    """Stage 1 of the cascade: microsecond keyword scorer with a margin gate."""
+
+    def __init__(self, keywords: Mapping[str, Iterable[str]] = CASCADE_KEYWORDS, min_margin: int = DEFAULT_MIN_MARGIN) -> None:
+        self.rules = list(keywords.keys())
+        self.matcher = KeywordMatcher(keywords)
+        self.min_margin = max(1, int(min_margin))
+
+    @classmethod
+    def from_config(cls, config: Mapping[str, Any]) -> "KeywordTier":
+        return cls(config.get("keywords") or CASCADE_KEYWORDS, config.get("min_margin", DEFAULT_MIN_MARGIN))
+
+    def classify(self, text: str) -> KeywordVerdict:
+        counts = self.matcher.count(text)
+        if not counts:
+            return KeywordVerdict(None, 0, 0, False)
+        ranked = sorted(counts.values(), reverse=True)
+        top = ranked[0]
+        margin = top - (ranked[1] if len(ranked) > 1 else 0)
+        # ties on the top count resolve to the first rule in config order (deterministic)
+        label = next(lbl for lbl in self.rules if counts.get(lbl) == top)
+        return KeywordVerdict(label, top, margin, margin >= self.min_margin)
+
+
+class CascadeStats:
+    """Traffic split between tiers and keyword/transformer agreement (thread-safe)."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.keyword_answered = 0
+        self.transformer_answered = 0
+        self.compared = 0
+        self.agreed = 0
+
+    def record(self, answered_by_keywords: bool, keyword_label: Optional[str] = None, model_label: Optional[str] = None) -> None:
+        with self._lock:
+            if answered_by_keywords:
+                self.keyword_answered += 1
+            else:
+                self.transformer_answered += 1
+            if keyword_label is not None and model_label is not None:
+                self.compared += 1
+                self.agreed += keyword_label == model_label
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self.keyword_answered + self.transformer_answered
+            return {
+                "total": total,
+                "keyword_answered": self.keyword_answered,
+                "transformer_answered": self.transformer_answered,
+                "keyword_fraction": round(self.keyword_answered / total, 4) if total else 0.0,
+                "compared": self.compared,
+                "agreed": self.agreed,
+                "agreement_rate": round(self.agreed / self.compared, 4) if self.compared else None,
+            }
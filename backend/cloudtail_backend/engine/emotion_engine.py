@@ -1,24 +1,85 @@
 import os
 os.environ["TRANSFORMERS_NO_TF"] = "1"  # Disable TensorFlow to avoid Keras 3 issues
 import json
+import itertools
 import logging
-from typing import List
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
 from ..models.memory import EmotionEssence
-from .emotion_model import EmotionModelWrapper
+from .emotion_model import EmotionModelWrapper, DEFAULT_BACKEND, DEFAULT_BATCH_SIZE
+from .keyword_matcher import KeywordMatcher
+from .cascade import CascadeStats, KeywordTier, KeywordVerdict
+from .inference_cache import InferenceCache, config_fingerprint, get_inference_cache, make_key, normalize_text
+from .timing import span
 
 # Configure logger
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
+class RuleSnapshot:
+    """
+    Compiled, read-only view of the engine's mapping config: label mapping, element table,
+    bonus rules (as a keyword automaton), cascade tier, and their fingerprint for cache keys.
+    A reload builds a new snapshot and swaps it in whole; snapshots are never mutated.
+    """
+
+    def __init__(self, label_mapping: dict, element_table: dict, bonus_rules: dict, cascade_config: dict, version: int = 1):
+        self.label_mapping = dict(label_mapping)
+        self.element_table = dict(element_table)
+        self.bonus_rules = dict(bonus_rules)
+        self.cascade_config = dict(cascade_config)
+        self.keyword_matcher = KeywordMatcher.from_bonus_rules(self.bonus_rules)
+        self.keyword_tier = KeywordTier.from_config(self.cascade_config) if self.cascade_config.get("enabled") else None
+        self.shadow_every = int(self.cascade_config.get("shadow_every", 0) or 0)
+        self.fingerprint = config_fingerprint(self.label_mapping, self.element_table, self.bonus_rules, self.cascade_config)
+        self.version = version
+        self.loaded_at = time.time()
+
+    def map_to_internal_type(self, label: str) -> str:
+        if label not in self.label_mapping:
+            logger.warning(f"Unmapped label [{label}], defaulting to 'gratitude'")
+        return self.label_mapping.get(label, "gratitude")
+
+    def get_element(self, emotion_type: str) -> str:
+        return self.element_table.get(emotion_type, "LightDust")
+
+    def calculate_value(self, text: str, emotion_type: str, confidence: float) -> float:
+        """
+        Estimate symbolic strength (0.0–1.0) of the detected emotion.
+        """
+        bonus = 0.0
+
+        rule = self.bonus_rules.get(emotion_type)
+        if rule is not None:
+            fired = self.keyword_matcher.find_all(text).get(emotion_type)
+            if fired:
+                bonus += rule["bonus"]
+                logger.debug("Bonus [%s] +%s via %s", emotion_type, rule["bonus"], fired)
+
+        return min(1.0, 0.2 + confidence + bonus)
+
+    def describe(self) -> dict:
+        return {"version": self.version, "fingerprint": self.fingerprint, "loaded_at": self.loaded_at}
+
+
 class EmotionAlchemyEngine:
     """
     Symbolic emotion engine that maps raw model labels
     into Cloudtail's canonical four categories and elements.
     """
 
-    def __init__(self, model_name: str = "bhadresh-savani/distilbert-base-uncased-emotion"):
-        self.model = EmotionModelWrapper(model_name)
+    def __init__(
+        self,
+        model_name: str = "bhadresh-savani/distilbert-base-uncased-emotion",
+        cache: Optional[InferenceCache] = None,
+        backend: str = DEFAULT_BACKEND,
+        model: Optional[EmotionModelWrapper] = None,
+    ):
+        # `model` lets several engines (different mappings) share one loaded model
+        self.model = model if model is not None else EmotionModelWrapper(model_name, backend=backend)
+        self.cache = cache if cache is not None else get_inference_cache()
 
         # Map raw model labels → canonical four types
         self.label_mapping = {
@@ -59,43 +120,195 @@ class EmotionAlchemyEngine:
             "guilt": {"keywords": ["sorry"], "bonus": 0.1},
             "nostalgia": {"keywords": ["sunset", "home", "beach", "smell"], "bonus": 0.1},
         }
+        # Tiered mode (off by default): {"enabled": bool, "min_margin": int, "shadow_every": int, "keywords": {...}}
+        self.cascade_config: dict = {}
+        self.cascade_stats = CascadeStats()
+        self._shadow_counter = itertools.count(1)
+
+        self.parity: Optional[dict] = None  # set by from_dict when parity_check is enabled
+        self._reload_lock = threading.Lock()
+        self.rules: RuleSnapshot = RuleSnapshot(self.label_mapping, self.element_table, self.bonus_rules, self.cascade_config)
+
+    def refresh_config(self) -> None:
+        """
+        Compile label_mapping / element_table / bonus_rules / cascade_config into a new
+        RuleSnapshot and swap it in. The swap is one attribute assignment: calls already
+        running keep the snapshot they started with, new calls see the new one.
+        """
+        with self._reload_lock:
+            self.rules = RuleSnapshot(
+                self.label_mapping, self.element_table, self.bonus_rules, self.cascade_config,
+                version=self.rules.version + 1,
+            )
+
+    def apply_config(self, config: dict) -> bool:
+        """
+        Hot-reload the mapping part of `config` (model weights are untouched).
+        Keys missing from `config` keep their current values. Returns False if nothing changed.
+        Raises ValueError (old snapshot stays active) when a section has the wrong shape.
+        """
+        sections = {
+            "label_mapping": config.get("label_mapping", self.label_mapping),
+            "element_table": config.get("element_table", self.element_table),
+            "bonus_rules": config.get("bonus_rules", self.bonus_rules),
+            "cascade_config": config.get("cascade", self.cascade_config),
+        }
+        for name, value in sections.items():
+            if not isinstance(value, dict):
+                raise ValueError(f"{name} must be an object, got {type(value).__name__}")
+        with self._reload_lock:
+            candidate = RuleSnapshot(
+                sections["label_mapping"], sections["element_table"], sections["bonus_rules"],
+                sections["cascade_config"], version=self.rules.version + 1,
+            )
+            if candidate.fingerprint == self.rules.fingerprint:
+                return False
+            self.label_mapping = candidate.label_mapping
+            self.element_table = candidate.element_table
+            self.bonus_rules = candidate.bonus_rules
+            self.cascade_config = candidate.cascade_config
+            self.rules = candidate
+        return True
+
+    # Compiled views of the active snapshot (read-only)
+    @property
+    def keyword_matcher(self) -> KeywordMatcher:
+        return self.rules.keyword_matcher
+
+    @property
+    def keyword_tier(self) -> Optional[KeywordTier]:
+        return self.rules.keyword_tier
+
+    @property
+    def config_fingerprint(self) -> str:
+        return self.rules.fingerprint
+
+    def _normalize(self, text: str) -> str:
+        return normalize_text(text, lowercase=self.model.lowercases_input)
+
+    def _cache_key(self, rules: RuleSnapshot, normalized: str) -> str:
+        return make_key(f"{self.model.model_name}@{self.model.backend}", rules.fingerprint, normalized)
 
     def extract_emotion(self, text: str) -> EmotionEssence:
         """
         Analyze one text and return its structured emotional essence.
+        Identical (normalized) texts are served from the shared inference cache.
+        """
+        with span("engine.extract"):
+            rules = self.rules  # one snapshot for the whole call, even if a reload lands meanwhile
+            with span("engine.normalize"):
+                normalized = self._normalize(text)
+            return self.cache.get_or_compute(self._cache_key(rules, normalized), lambda: self._extract_uncached(rules, normalized))
+
+    def _extract_uncached(self, rules: RuleSnapshot, text: str) -> EmotionEssence:
+        with span("engine.cascade"):
+            verdict = rules.keyword_tier.classify(text) if rules.keyword_tier is not None else None
+        use_keywords, run_model = self._cascade_route(rules, verdict)
+
+        essence: Optional[EmotionEssence] = None
+        if run_model:
+            try:
+                raw_label, confidence = self.model.predict(text)
+            except Exception as e:
+                logger.error(f"Emotion model failed on input: {text[:30]}... \n{e}")
+                essence = self._error_essence()
+            else:
+                with span("engine.mapping"):
+                    essence = self._build_essence(rules, text, raw_label, confidence)
+                with span("engine.log"):
+                    logger.info("Extracted [%s] → [%s], confidence=%.3f", raw_label, essence.type, confidence)
+
+        if verdict is not None:
+            self._record_cascade(verdict, use_keywords, essence)
+        return self._keyword_essence(rules, verdict) if use_keywords else essence  # type: ignore[return-value]
+
+    def extract_batch(self, texts: List[str], batch_size: int = DEFAULT_BATCH_SIZE) -> List[EmotionEssence]:
+        """
+        Process a batch of texts into emotional essences.
+        Inference runs as padded tensor batches; results keep input order.
         """
-        try:
-            raw_label, confidence = self.model.predict(text)
-        except Exception as e:
-            logger.error(f"Emotion model failed on input: {text[:30]}... \n{e}")
-            return EmotionEssence(type="error", element="Unknown", effect_tags=[], value=0.0)
+        logger.info("Processing batch of %d entries.", len(texts))
+        if not texts:
+            return []
+        with span("engine.extract_batch"):
+            rules = self.rules
+            with span("engine.normalize"):
+                normalized = [self._normalize(t) for t in texts]
+            return self.cache.get_many_or_compute(
+                [self._cache_key(rules, n) for n in normalized],
+                lambda idx: self._extract_batch_uncached(rules, [normalized[i] for i in idx], batch_size),
+            )
+
+    def _extract_batch_uncached(self, rules: RuleSnapshot, texts: List[str], batch_size: int) -> List[EmotionEssence]:
+        with span("engine.cascade"):
+            verdicts: List[Optional[KeywordVerdict]] = (
+                [rules.keyword_tier.classify(t) for t in texts] if rules.keyword_tier is not None else [None] * len(texts)
+            )
+        routes = [self._cascade_route(rules, v) for v in verdicts]
+        model_idx = [i for i, (_, run_model) in enumerate(routes) if run_model]
+
+        model_out: Dict[int, EmotionEssence] = {}
+        if model_idx:
+            model_texts = [texts[i] for i in model_idx]
+            try:
+                predictions = self.model.predict_batch(model_texts, batch_size=batch_size)
+                with span("engine.mapping"):
+                    model_out = dict(zip(model_idx, self._postprocess_batch(rules, model_texts, predictions)))
+            except Exception as e:
+                logger.error(f"Emotion model failed on batch of {len(model_texts)} inputs: {e}")
+                model_out = {i: self._error_essence() for i in model_idx}
+
+        results: List[EmotionEssence] = []
+        for i, (verdict, (use_keywords, _)) in enumerate(zip(verdicts, routes)):
+            if verdict is not None:
+                self._record_cascade(verdict, use_keywords, model_out.get(i))
+            results.append(self._keyword_essence(rules, verdict) if use_keywords else model_out[i])  # type: ignore[arg-type]
+        return results
+
+    # ---------- Cascade (keyword tier → transformer) ----------
+    def _cascade_route(self, rules: RuleSnapshot, verdict: Optional[KeywordVerdict]) -> Tuple[bool, bool]:
+        """(answer from keywords, run the transformer). Confident verdicts still run it every `shadow_every`-th time."""
+        if verdict is None or not verdict.confident:
+            return False, True
+        every = rules.shadow_every
+        return True, every > 0 and next(self._shadow_counter) % every == 0
 
-        emotion_type = self.map_to_internal_type(raw_label)
-        value = self.calculate_value(text, emotion_type, confidence)
+    def _record_cascade(self, verdict: KeywordVerdict, use_keywords: bool, model_essence: Optional[EmotionEssence]) -> None:
+        model_label = model_essence.type if model_essence is not None and model_essence.type != "error" else None
+        self.cascade_stats.record(use_keywords, verdict.label if model_label else None, model_label)
 
-        logger.info(f"Extracted [{raw_label}] → [{emotion_type}], confidence={confidence:.3f}")
+    def _keyword_essence(self, rules: RuleSnapshot, verdict: KeywordVerdict) -> EmotionEssence:
+        return self._make_essence(rules, verdict.label or "gratitude", verdict.value)
 
+    def _postprocess_batch(self, rules: RuleSnapshot, texts: List[str], predictions: List[Tuple[str, float]]) -> List[EmotionEssence]:
+        """Label mapping, bonus and element lookup over a whole batch (one lookup per distinct label)."""
+        internal = {label: rules.map_to_internal_type(label) for label in {lbl for lbl, _ in predictions}}
+        return [
+            self._make_essence(rules, internal[label], rules.calculate_value(text, internal[label], confidence))
+            for text, (label, confidence) in zip(texts, predictions)
+        ]
+
+    def _build_essence(self, rules: RuleSnapshot, text: str, raw_label: str, confidence: float) -> EmotionEssence:
+        emotion_type = rules.map_to_internal_type(raw_label)
+        return self._make_essence(rules, emotion_type, rules.calculate_value(text, emotion_type, confidence))
+
+    def _make_essence(self, rules: RuleSnapshot, emotion_type: str, value: float) -> EmotionEssence:
         return EmotionEssence(
             type=emotion_type,
-            element=self.get_element(emotion_type),
+            element=rules.get_element(emotion_type),
             effect_tags=self.tag_emotion(emotion_type),
             value=round(value, 3),
         )
 
-    def extract_batch(self, texts: List[str]) -> List[EmotionEssence]:
-        """
-        Process a batch of texts into emotional essences.
-        """
-        logger.info(f"Processing batch of {len(texts)} entries.")
-        return [self.extract_emotion(t) for t in texts]
+    @staticmethod
+    def _error_essence() -> EmotionEssence:
+        return EmotionEssence(type="error", element="Unknown", effect_tags=[], value=0.0)
 
     def map_to_internal_type(self, label: str) -> str:
-        if label not in self.label_mapping:
-            logger.warning(f"Unmapped label [{label}], defaulting to 'gratitude'")
-        return self.label_mapping.get(label, "gratitude")
+        return self.rules.map_to_internal_type(label)
 
     def get_element(self, emotion_type: str) -> str:
-        return self.element_table.get(emotion_type, "LightDust")
+        return self.rules.get_element(emotion_type)
 
     def tag_emotion(self, emotion_type: str) -> List[str]:
         if emotion_type in ["sadness", "nostalgia"]:
@@ -106,25 +319,31 @@ class EmotionAlchemyEngine:
         """
         Estimate symbolic strength (0.0–1.0) of the detected emotion.
         """
-        text = text.lower()
-        bonus = 0.0
+        return self.rules.calculate_value(text, emotion_type, confidence)
 
-        if emotion_type in self.bonus_rules:
-            rule = self.bonus_rules[emotion_type]
-            if any(kw in text for kw in rule["keywords"]):
-                bonus += rule["bonus"]
-
-        return min(1.0, 0.2 + confidence + bonus)
+    def matched_keywords(self, text: str) -> Dict[str, List[str]]:
+        """Bonus rule → keywords found in `text` (one automaton pass over the text)."""
+        return self.rules.keyword_matcher.find_all(text)
 
     @classmethod
-    def from_dict(cls, config: dict):
+    def from_dict(cls, config: dict, model: Optional[EmotionModelWrapper] = None):
         """
         Allow future config-driven engine initialization.
         """
-        engine = cls(config.get("model_name", "bhadresh-savani/distilbert-base-uncased-emotion"))
-        engine.label_mapping = config.get("label_mapping", engine.label_mapping)
-        engine.element_table = config.get("element_table", engine.element_table)
-        engine.bonus_rules = config.get("bonus_rules", engine.bonus_rules)
+        engine = cls(
+            config.get("model_name", "bhadresh-savani/distilbert-base-uncased-emotion"),
+            backend=config.get("backend", DEFAULT_BACKEND),
+            model=model,
+        )
+        engine.apply_config(config)
+
+        # Optional startup parity check of a non-reference backend against fp32
+        if config.get("parity_check") and engine.model.available:
+            report = engine.model.parity_report()
+            engine.parity = {k: v for k, v in report.items() if k != "rows"}
+            log = logger.info if report["ok"] else logger.warning
+            log("Backend parity (%s vs fp32): agreement=%.3f, max_delta=%.4f, ms/text=%s",
+                report["backend"], report["label_agreement"], report["max_score_delta"], report["ms_per_text"])
         return engine
 
 
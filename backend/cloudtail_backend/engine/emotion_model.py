@@ -1,39 +1,218 @@
 from __future__ import annotations
-import os, logging
-from typing import Tuple
-from transformers import pipeline
+import os, inspect, logging, re, time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+import torch
+from transformers import AutoConfig, AutoModelForSequenceClassification, AutoTokenizer
+
+from .timing import observe_size, span
 
 logger = logging.getLogger(__name__)
 os.environ.setdefault("TRANSFORMERS_NO_TF", "1")  # disable TF globally
 
 DEFAULT_MODEL = "bhadresh-savani/distilbert-base-uncased-emotion"
+DEFAULT_BATCH_SIZE = 16
+
+# fp32: eager PyTorch (reference) | int8: torch dynamic quantization of Linear layers
+# onnx: exported graph on ONNX Runtime (optional dependency: onnxruntime)
+BACKENDS = ("fp32", "int8", "onnx")
+DEFAULT_BACKEND = "fp32"
+
+ONNX_DIR = Path(os.getenv("CLOUDTAIL_ONNX_DIR", str(Path.home() / ".cache" / "cloudtail" / "onnx")))
+
+# Probe set for backend parity (Reproducibility probes + safe demo inputs)
+PARITY_PROBES = [
+    "I long for you every day", "I yearn for you so much", "My heart aches and I am crying today",
+    "Grief hits me hard tonight", "I accept your passing and feel at peace", "I am more at peace with your memory now",
+    "Thank you for all the gentle years", "I am deeply grateful for your companionship", "missyou!!!",
+    "我还是很难过，但在慢慢接受", "I miss you every night", "Thank you for the evenings", "It still hurts sometimes",
+    "I’m calmer now, thank you", "Crying again when I saw the photo", "It feels lighter these days",
+    "miss u by the window", "I still remember the sunset", "谢谢你陪我到最后", "I'm sorry I couldn't do more.",
+]
+
 
 class EmotionModelWrapper:
-    def __init__(self, model_name: str = DEFAULT_MODEL) -> None:
+    def __init__(self, model_name: str = DEFAULT_MODEL, backend: str = DEFAULT_BACKEND) -> None:
         self.model_name = model_name
+        self.backend = (backend or DEFAULT_BACKEND).lower()
+        self._tokenizer: Any = None
+        self._model: Optional[torch.nn.Module] = None
+        self._session: Any = None  # onnxruntime.InferenceSession
+        self._id2label: Dict[int, str] = {}
         try:
-            self._clf = pipeline(
-                "text-classification",
-                model=self.model_name,
-                top_k=1,
-                framework="pt",   # force PyTorch
-                device=-1         # CPU
-            )
-            logger.info("Emotion pipeline ready: %s", self.model_name)
+            if self.backend not in BACKENDS:
+                raise ValueError(f"unknown backend '{backend}', expected one of {BACKENDS}")
+            self._tokenizer = AutoTokenizer.from_pretrained(self.model_name)
+            # predict_batch pads pre-tokenized features on purpose (tokenize once, sort by length)
+            self._tokenizer.deprecation_warnings["Asking-to-pad-a-fast-tokenizer"] = True
+            self._id2label = {int(k): str(v) for k, v in AutoConfig.from_pretrained(self.model_name).id2label.items()}
+            if self.backend == "onnx":
+                self._session = self._load_onnx()
+            else:
+                model = AutoModelForSequenceClassification.from_pretrained(self.model_name).eval()
+                if self.backend == "int8":
+                    model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+                self._model = model
+            logger.info("Emotion model ready: %s (backend=%s)", self.model_name, self.backend)
         except Exception as e:
-            self._clf = None
-            logger.exception("Failed to init emotion pipeline: %s", e)
+            self._tokenizer = self._model = self._session = None
+            logger.exception("Failed to init emotion model (%s): %s", self.backend, e)
+
+    @property
+    def available(self) -> bool:
+        return self._tokenizer is not None and (self._model is not None or self._session is not None)
+
+    @property
+    def lowercases_input(self) -> bool:
+        """True when the tokenizer lowercases (uncased models), so callers may fold case too."""
+        return bool(getattr(self._tokenizer, "do_lower_case", False))
+
+    def memory_bytes(self) -> Optional[int]:
+        """Weight footprint: torch parameters + buffers, or the ONNX graph file size."""
+        if self._model is not None:
+            tensors = list(self._model.parameters()) + list(self._model.buffers())
+            total = sum(t.numel() * t.element_size() for t in tensors)
+            # dynamic int8 keeps Linear weights in packed params, not in parameters()
+            for m in self._model.modules():
+                packed = getattr(m, "_packed_params", None)
+                if packed is not None and hasattr(packed, "_weight_bias"):
+                    w, b = packed._weight_bias()
+                    total += w.numel() * w.element_size() + (b.numel() * b.element_size() if b is not None else 0)
+            return total
+        if self._session is not None:
+            path = self._onnx_path()
+            return path.stat().st_size if path.exists() else None
+        return None
+
+    # ---------- ONNX backend ----------
+    def _onnx_path(self) -> Path:
+        slug = re.sub(r"[^A-Za-z0-9_.-]+", "__", self.model_name.strip("/\\"))
+        return ONNX_DIR / slug / "model.onnx"
+
+    def _load_onnx(self) -> Any:
+        try:
+            import onnxruntime as ort
+        except ImportError as e:
+            raise RuntimeError("backend 'onnx' requires onnxruntime (pip install onnxruntime)") from e
+
+        path = self._onnx_path()
+        if not path.exists():
+            self._export_onnx(path)
+        opts = ort.SessionOptions()
+        opts.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        return ort.InferenceSession(str(path), sess_options=opts, providers=["CPUExecutionProvider"])
+
+    def _export_onnx(self, path: Path) -> None:
+        """One-time export; the torch weights are dropped afterwards."""
+        logger.info("Exporting %s to ONNX: %s", self.model_name, path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        model = AutoModelForSequenceClassification.from_pretrained(self.model_name).eval()
+        sample = self._tokenizer(["export sample"], return_tensors="pt")
+        names = list(sample.keys())
+        dynamic = {n: {0: "batch", 1: "sequence"} for n in names}
+        dynamic["logits"] = {0: "batch"}
+        kwargs: Dict[str, Any] = {}
+        if "dynamo" in inspect.signature(torch.onnx.export).parameters:
+            kwargs["dynamo"] = False  # TorchScript exporter: stable dynamic axes, no onnxscript needed
+        tmp = path.with_suffix(".onnx.tmp")
+        with torch.inference_mode():
+            torch.onnx.export(
+                model, (dict(sample),), str(tmp),
+                input_names=names, output_names=["logits"], dynamic_axes=dynamic,
+                opset_version=14, **kwargs,
+            )
+        os.replace(tmp, path)
+
+    # ---------- Inference ----------
+    def _logits(self, batch: Dict[str, torch.Tensor]) -> torch.Tensor:
+        if self._session is not None:
+            feeds = {i.name: batch[i.name].numpy() for i in self._session.get_inputs()}
+            return torch.from_numpy(self._session.run(["logits"], feeds)[0])
+        return self._model(**batch).logits  # type: ignore[misc]
 
     def predict(self, text: str) -> Tuple[str, float]:
         """
         Returns (label_lowercase, confidence_0_1). Raises RuntimeError if unavailable.
         """
-        if self._clf is None:
+        return self.predict_batch([text], batch_size=1)[0]
+
+    def predict_batch(self, texts: Sequence[str], batch_size: int = DEFAULT_BATCH_SIZE) -> List[Tuple[str, float]]:
+        """
+        Batched predict(): returns one (label_lowercase, confidence_0_1) per text, in input order.
+        Texts are tokenized once and grouped by token length so each padded batch stays tight.
+        """
+        if not self.available:
             raise RuntimeError("classifier_not_available")
+        if not texts:
+            return []
+
+        tokenizer = self._tokenizer
+        with span("model.tokenize"):
+            encoded = tokenizer(list(texts), truncation=True)
+        keys = list(encoded.keys())
+        lengths = [len(ids) for ids in encoded["input_ids"]]
+        order = sorted(range(len(texts)), key=lengths.__getitem__)
+
+        batch_size = max(1, batch_size)
+        results: List[Optional[Tuple[str, float]]] = [None] * len(texts)
+        with torch.inference_mode():
+            for start in range(0, len(order), batch_size):
+                idx = order[start:start + batch_size]
+                with span("model.pad"):
+                    features = [{k: encoded[k][i] for k in keys} for i in idx]
+                    batch = tokenizer.pad(features, return_tensors="pt")
+                observe_size("model.batch_size", len(idx))
+                observe_size("model.tokens", sum(lengths[i] for i in idx))
+                observe_size("model.padded_tokens", int(batch["input_ids"].numel()))
+                with span("model.forward"):
+                    logits = self._logits(batch)
+                with span("model.postprocess"):
+                    scores, label_ids = logits.softmax(dim=-1).max(dim=-1)
+                    for i, label_id, score in zip(idx, label_ids.tolist(), scores.tolist()):
+                        results[i] = (self._id2label[label_id].lower(), float(score))
+        return results  # type: ignore[return-value]
+
+    # ---------- Parity ----------
+    def parity_report(
+        self,
+        probes: Sequence[str] = PARITY_PROBES,
+        reference: Optional["EmotionModelWrapper"] = None,
+        score_tolerance: float = 0.05,
+    ) -> Dict[str, Any]:
+        """
+        Compare this backend's top labels/scores against the fp32 reference on a probe set.
+        `ok` is True when every top label agrees and no score differs by more than `score_tolerance`.
+        """
+        if reference is None:
+            reference = self if self.backend == "fp32" else EmotionModelWrapper(self.model_name, backend="fp32")
+
+        timings: Dict[str, float] = {}
+        outputs: Dict[str, List[Tuple[str, float]]] = {}
+        for name, wrapper in (("fp32", reference), (self.backend, self)):
+            wrapper.predict(probes[0])  # warm-up
+            t0 = time.perf_counter()
+            outputs[name] = [wrapper.predict(p) for p in probes]
+            timings[name] = (time.perf_counter() - t0) * 1000.0 / len(probes)
 
-        out = self._clf(text)
-        # HF returns either [ {label,score} ] or [ [ {label,score} ] ]
-        top = out[0][0] if isinstance(out[0], list) else out[0]
-        label = str(top["label"]).lower()
-        score = float(top["score"])
-        return label, score
+        rows = []
+        for text, (ref_label, ref_score), (label, score) in zip(probes, outputs["fp32"], outputs[self.backend]):
+            rows.append({
+                "text": text,
+                "fp32": [ref_label, round(ref_score, 4)],
+                self.backend: [label, round(score, 4)],
+                "label_match": label == ref_label,
+                "score_delta": round(abs(score - ref_score), 4),
+            })
+        agreement = sum(r["label_match"] for r in rows) / len(rows)
+        max_delta = max(r["score_delta"] for r in rows)
+        return {
+            "model": self.model_name,
+            "backend": self.backend,
+            "probes": len(rows),
+            "label_agreement": round(agreement, 4),
+            "max_score_delta": max_delta,
+            "mean_score_delta": round(sum(r["score_delta"] for r in rows) / len(rows), 4),
+            "ms_per_text": {k: round(v, 2) for k, v in timings.items()},
+            "ok": agreement == 1.0 and max_delta <= score_tolerance,
+            "rows": rows,
+        }
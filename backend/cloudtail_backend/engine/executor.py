@@ -0,0 +1,100 @@
+from __future__ import annotations
+import os, asyncio, functools, logging, threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+PROFILE = os.getenv("CLOUDTAIL_PROFILE", "presentation").lower()
+
+# Per-profile defaults; CLOUDTAIL_INFERENCE_WORKERS / CLOUDTAIL_INFERENCE_MAX_PENDING override.
+# Threads (not processes): torch releases the GIL during the forward pass and the
+# loaded model can be shared without pickling it into every worker.
+_PROFILE_WORKERS = {"full": 2, "presentation": 1}
+
+
+class InferenceBusy(RuntimeError):
+    """Raised when the inference queue is full (callers map this to HTTP 503)."""
+
+
+class InferenceExecutor:
+    """
+    Bounded thread pool that runs blocking model calls for async routes,
+    so the event loop keeps serving /healthz, Mongo reads, etc. meanwhile.
+    """
+
+    def __init__(self, max_workers: int, max_pending: int) -> None:
+        self.max_workers = max(1, int(max_workers))
+        self.max_pending = max(self.max_workers, int(max_pending))
+        self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="cloudtail-infer")
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._completed = 0
+        self._rejected = 0
+
+    async def run(self, fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self._rejected += 1
+            raise InferenceBusy("inference_queue_full")
+        with self._lock:
+            self._pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._pool, functools.partial(fn, *args, **kwargs))
+        finally:
+            with self._lock:
+                self._pending -= 1
+                self._completed += 1
+            self._slots.release()
+
+    def shutdown(self) -> None:
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "profile": PROFILE,
+                "max_workers": self.max_workers,
+                "max_pending": self.max_pending,
+                "pending": self._pending,
+                "completed": self._completed,
+                "rejected": self._rejected,
+            }
+
+
+_executor: Optional[InferenceExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def get_inference_executor() -> InferenceExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            workers = int(os.getenv("CLOUDTAIL_INFERENCE_WORKERS", str(_PROFILE_WORKERS.get(PROFILE, 1))))
+            pending = int(os.getenv("CLOUDTAIL_INFERENCE_MAX_PENDING", str(workers * 32)))
+            _executor = InferenceExecutor(workers, pending)
+            logger.info("Inference executor ready: workers=%d, max_pending=%d", _executor.max_workers, _executor.max_pending)
+        return _executor
+
+
+def current_executor() -> Optional[InferenceExecutor]:
+    """The shared executor if one has been started (diagnostics only; never creates one)."""
+    return _executor
+
+
+def shutdown_inference_executor() -> None:
+    """Stop and drop the shared executor; the next get_inference_executor() starts a fresh one."""
+    global _executor
+    with _executor_lock:
+        executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown()
+
+
+async def run_inference(fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """Await a blocking engine call on the shared inference executor."""
+    return await get_inference_executor().run(fn, *args, **kwargs)
@@ -0,0 +1,210 @@
+from __future__ import annotations
+import os, hashlib, json, logging, re, threading, time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Generic, List, Optional, Sequence, Tuple, TypeVar
+
+logger = logging.getLogger(__name__)
+
+V = TypeVar("V")
+
+DEFAULT_MAX_ENTRIES = int(os.getenv("CLOUDTAIL_CACHE_MAX_ENTRIES", "4096"))  # 0 disables caching
+DEFAULT_TTL_SECONDS = float(os.getenv("CLOUDTAIL_CACHE_TTL_S", "3600"))
+
+_WS = re.compile(r"\s+")
+
+
+def normalize_text(text: str, lowercase: bool = False) -> str:
+    """Whitespace-collapsed (and optionally lowercased) text used as the cache key body."""
+    t = _WS.sub(" ", text or "").strip()
+    return t.lower() if lowercase else t
+
+
+def config_fingerprint(*parts: Any) -> str:
+    """Stable short hash of JSON-able config parts (label_mapping, bonus_rules, ...)."""
+    blob = json.dumps(parts, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha1(blob.encode("utf-8")).hexdigest()[:16]
+
+
+def make_key(model_name: str, fingerprint: str, normalized_text: str) -> str:
+    return f"{model_name}\x1f{fingerprint}\x1f{normalized_text}"
+
+
+class InferenceCache(Generic[V]):
+    """
+    Bounded LRU + TTL cache with single-flight deduplication.
+
+    Concurrent lookups of a key that is being computed wait on that one
+    computation instead of starting another forward pass.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        ttl_seconds: float = DEFAULT_TTL_SECONDS,
+        should_cache: Callable[[V], bool] = lambda v: True,
+    ) -> None:
+        self.max_entries = max(0, int(max_entries))
+        self.ttl_seconds = float(ttl_seconds)
+        self._should_cache = should_cache
+        self._data: "OrderedDict[str, Tuple[float, V]]" = OrderedDict()
+        self._inflight: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+
+        self._hits = 0
+        self._misses = 0
+        self._inflight_waits = 0
+        self._evictions = 0
+        self._expirations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    # ---------- Internals (call with _lock held) ----------
+    def _lookup(self, key: str, now: float) -> Tuple[bool, Optional[V]]:
+        entry = self._data.get(key)
+        if entry is None:
+            return False, None
+        expires_at, value = entry
+        if expires_at < now:
+            del self._data[key]
+            self._expirations += 1
+            return False, None
+        self._data.move_to_end(key)
+        return True, value
+
+    def _store(self, key: str, value: V, now: float) -> None:
+        if not self._should_cache(value):
+            return
+        self._data[key] = (now + self.ttl_seconds, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_entries:
+            self._data.popitem(last=False)
+            self._evictions += 1
+
+    def _finish(self, key: str, fut: Future, value: V) -> None:
+        with self._lock:
+            self._inflight.pop(key, None)
+            self._store(key, value, time.monotonic())
+        fut.set_result(value)
+
+    def _fail(self, key: str, fut: Future, exc: BaseException) -> None:
+        with self._lock:
+            self._inflight.pop(key, None)
+        fut.set_exception(exc)
+
+    # ---------- API ----------
+    def get_or_compute(self, key: str, compute: Callable[[], V]) -> V:
+        if not self.enabled:
+            return compute()
+        with self._lock:
+            hit, value = self._lookup(key, time.monotonic())
+            if hit:
+                self._hits += 1
+                return value  # type: ignore[return-value]
+            fut = self._inflight.get(key)
+            owner = fut is None
+            if owner:
+                fut = self._inflight[key] = Future()
+                self._misses += 1
+            else:
+                self._inflight_waits += 1
+        if not owner:
+            return fut.result()
+
+        try:
+            value = compute()
+        except BaseException as e:
+            self._fail(key, fut, e)
+            raise
+        self._finish(key, fut, value)
+        return value
+
+    def get_many_or_compute(self, keys: Sequence[str], compute_many: Callable[[List[int]], List[V]]) -> List[V]:
+        """
+        Batch variant: `compute_many(indices)` is called once with the positions of
+        keys that are neither cached nor already in flight, and must return their values in order.
+        """
+        if not self.enabled:
+            return compute_many(list(range(len(keys))))
+
+        results: List[Any] = [None] * len(keys)
+        owned: List[Tuple[int, str, Future]] = []
+        waiting: List[Tuple[int, Future]] = []
+        with self._lock:
+            now = time.monotonic()
+            for i, key in enumerate(keys):
+                hit, value = self._lookup(key, now)
+                if hit:
+                    self._hits += 1
+                    results[i] = value
+                    continue
+                fut = self._inflight.get(key)
+                if fut is not None:  # in flight elsewhere, or a duplicate within this batch
+                    self._inflight_waits += 1
+                    waiting.append((i, fut))
+                    continue
+                fut = self._inflight[key] = Future()
+                self._misses += 1
+                owned.append((i, key, fut))
+
+        if owned:
+            try:
+                values = list(compute_many([i for i, _, _ in owned]))
+                if len(values) != len(owned):
+                    raise RuntimeError(f"compute_many returned {len(values)} values for {len(owned)} keys")
+                for (i, key, fut), value in zip(owned, values):
+                    results[i] = value
+                    self._finish(key, fut, value)
+            except BaseException as e:
+                # Never leave an owned key in flight: its waiters would block forever
+                for _, key, fut in owned:
+                    if not fut.done():
+                        self._fail(key, fut, e)
+                raise
+
+        for i, fut in waiting:
+            results[i] = fut.result()
+        return results
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self._hits + self._misses + self._inflight_waits
+            return {
+                "enabled": self.enabled,
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "size": len(self._data),
+                "inflight": len(self._inflight),
+                "hits": self._hits,
+                "misses": self._misses,
+                "inflight_waits": self._inflight_waits,
+                "evictions": self._evictions,
+                "expirations": self._expirations,
+                "hit_ratio": round((self._hits + self._inflight_waits) / lookups, 4) if lookups else 0.0,
+            }
+
+
+# ---------- Process-wide instance ----------
+# Keys carry model name + config fingerprint, so every engine can share one cache.
+_cache: Optional[InferenceCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_inference_cache() -> InferenceCache:
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = InferenceCache(should_cache=lambda ess: getattr(ess, "type", None) != "error")
+            logger.info("Inference cache ready: max_entries=%d, ttl=%.0fs", _cache.max_entries, _cache.ttl_seconds)
+        return _cache
+
+
+def current_cache() -> Optional[InferenceCache]:
+    """The shared cache if one has been created (diagnostics only; never creates one)."""
+    return _cache
@@ -0,0 +1,82 @@
+from __future__ import annotations
+from collections import deque
+from typing import Dict, Iterable, List, Mapping, Tuple
+
+
+class KeywordMatcher:
+    """
+    Aho-Corasick automaton over rule keywords (case-insensitive substring match).
+
+    Compiled once into a DFA (failure links folded into each state's transition
+    table), so one pass over the text costs one dict lookup per character no
+    matter how many keywords the rules hold. Works for English and CJK phrases alike.
+    """
+
+    def __init__(self, rules: Mapping[str, Iterable[str]]) -> None:
+        goto: List[Dict[str, int]] = [{}]
+        out: List[List[Tuple[str, str]]] = [[]]
+        self.keyword_count = 0
+
+        # 1) trie of lowercased keywords
+        for rule, keywords in rules.items():
+            for kw in keywords:
+                kw = str(kw).lower()
+                if not kw:
+                    continue
+                state = 0
+                for ch in kw:
+                    nxt = goto[state].get(ch)
+                    if nxt is None:
+                        nxt = len(goto)
+                        goto[state][ch] = nxt
+                        goto.append({})
+                        out.append([])
+                    state = nxt
+                if (rule, kw) not in out[state]:
+                    out[state].append((rule, kw))
+                    self.keyword_count += 1
+
+        # 2) BFS: failure links, merged outputs, full transition table per state
+        fail = [0] * len(goto)
+        delta: List[Dict[str, int]] = [dict() for _ in goto]
+        delta[0] = dict(goto[0])
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            delta[state] = {**delta[fail[state]], **goto[state]}
+            out[state] = out[state] + [m for m in out[fail[state]] if m not in out[state]]
+            for ch, nxt in goto[state].items():
+                fail[nxt] = delta[fail[state]].get(ch, 0) if state else 0
+                queue.append(nxt)
+
+        self._delta = delta
+        self._out = [tuple(o) for o in out]
+
+    @classmethod
+    def from_bonus_rules(cls, bonus_rules: Mapping[str, Mapping]) -> "KeywordMatcher":
+        """Compile `{rule: {"keywords": [...], "bonus": x}}` (emotion_engine_config.json shape)."""
+        return cls({name: rule.get("keywords", []) for name, rule in bonus_rules.items()})
+
+    def _scan(self, text: str):
+        delta, out = self._delta, self._out
+        state = 0
+        for ch in text.lower():
+            state = delta[state].get(ch, 0)
+            if out[state]:
+                yield from out[state]
+
+    def find_all(self, text: str) -> Dict[str, List[str]]:
+        """Rule → distinct keywords that fired, in order of first occurrence."""
+        hits: Dict[str, List[str]] = {}
+        for rule, kw in self._scan(text):
+            seen = hits.setdefault(rule, [])
+            if kw not in seen:
+                seen.append(kw)
+        return hits
+
+    def count(self, text: str) -> Dict[str, int]:
+        """Rule → total keyword occurrences (overlapping matches counted)."""
+        counts: Dict[str, int] = {}
+        for rule, _ in self._scan(text):
+            counts[rule] = counts.get(rule, 0) + 1
+        return counts
@@ -0,0 +1,206 @@
+from __future__ import annotations
+
+import os
+import json
+import asyncio
+import logging
+import secrets
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional, Set, Tuple
+
+from cloudtail_backend.engine.planet_window import get_planet_window
+
+logger = logging.getLogger(__name__)
+
+# Events buffered per subscriber; a subscriber that falls this far behind gets one full state instead
+QUEUE_MAX = int(os.getenv("CLOUDTAIL_PLANET_STREAM_QUEUE", "16"))
+# Deltas kept for Last-Event-ID resume
+REPLAY_MAX = int(os.getenv("CLOUDTAIL_PLANET_STREAM_REPLAY", "64"))
+HEARTBEAT_S = float(os.getenv("CLOUDTAIL_PLANET_STREAM_HEARTBEAT_S", "15"))
+# Re-check the state this often without a write (window expiry, resync in another worker)
+POLL_S = float(os.getenv("CLOUDTAIL_PLANET_STREAM_POLL_S", "5"))
+MAX_SUBSCRIBERS = int(os.getenv("CLOUDTAIL_PLANET_STREAM_MAX", "1000"))
+
+# () -> (etag, state dict) or None when the state cannot be read right now
+StateSource = Callable[[], Awaitable[Optional[Tuple[str, Dict[str, Any]]]]]
+
+# (event name, event id, data)
+Event = Tuple[str, str, Dict[str, Any]]
+
+
+class HubFull(RuntimeError):
+    pass
+
+
+class _Subscriber:
+    __slots__ = ("queue", "lagged")
+
+    def __init__(self) -> None:
+        self.queue: "asyncio.Queue[Event]" = asyncio.Queue(maxsize=max(1, QUEUE_MAX))
+        self.lagged = 0
+
+
+class PlanetHub:
+    """
+    In-process fan-out of planet status changes to streaming clients.
+
+    One pump task re-reads the status when the planet window reports a write (or every
+    POLL_S) and, if the state changed, publishes a delta (changed fields only) to each
+    subscriber's bounded queue. Event ids are "<epoch>-<seq>": `epoch` is per process,
+    so a Last-Event-ID from another worker or a previous run falls back to a full state.
+    """
+
+    def __init__(self, source: StateSource) -> None:
+        self.source = source
+        self.epoch = secrets.token_hex(4)
+        self.seq = 0
+        self.etag: Optional[str] = None
+        self.state: Optional[Dict[str, Any]] = None
+        self._replay: Deque[Tuple[int, Dict[str, Any]]] = deque(maxlen=max(1, REPLAY_MAX))
+        self._subscribers: Set[_Subscriber] = set()
+        self._wake: Optional[asyncio.Event] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._task: Optional["asyncio.Task[None]"] = None
+        self.published = 0
+        self.resets = 0
+
+    # ---------- Pump ----------
+    def start(self) -> None:
+        """Start the pump on the running loop (idempotent)."""
+        if self._task is not None and not self._task.done():
+            return
+        self._loop = asyncio.get_running_loop()
+        self._wake = asyncio.Event()
+        self._task = self._loop.create_task(self._pump(), name="cloudtail-planet-hub")
+
+    def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def notify(self) -> None:
+        """State may have changed (safe from any thread; no-op before start)."""
+        loop, wake = self._loop, self._wake
+        if loop is None or wake is None or loop.is_closed():
+            return
+        try:
+            if asyncio.get_running_loop() is loop:
+                wake.set()
+                return
+        except RuntimeError:
+            pass
+        loop.call_soon_threadsafe(wake.set)
+
+    async def refresh(self) -> None:
+        """Read the state once and publish it if it changed."""
+        current = await self.source()
+        if current is None:
+            return
+        etag, state = current
+        if etag == self.etag:
+            return
+        prev, self.etag, self.state = self.state, etag, state
+        self.seq += 1
+        self.published += 1
+        if prev is None:
+            # First successful read: clients that subscribed while the status was
+            # unreadable got nothing from catch_up, so they get the full state now
+            event: Event = ("state", self.event_id(), dict(state))
+        else:
+            delta = {k: v for k, v in state.items() if prev.get(k) != v}
+            self._replay.append((self.seq, delta))
+            event = ("delta", self.event_id(), delta)
+        for sub in list(self._subscribers):
+            self._offer(sub, event)
+
+    async def _pump(self) -> None:
+        assert self._wake is not None
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=POLL_S)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            try:
+                await self.refresh()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("Planet hub refresh failed: %s", e)
+
+    def _offer(self, sub: _Subscriber, event: Event) -> None:
+        try:
+            sub.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # Slow reader: drop what it has not read and let it catch up with one full state
+            while not sub.queue.empty():
+                sub.queue.get_nowait()
+            sub.lagged += 1
+            self.resets += 1
+            sub.queue.put_nowait(("state", self.event_id(), dict(self.state or {})))
+
+    # ---------- Subscribers ----------
+    def event_id(self) -> str:
+        return f"{self.epoch}-{self.seq}"
+
+    def subscribe(self) -> _Subscriber:
+        if len(self._subscribers) >= MAX_SUBSCRIBERS:
+            raise HubFull(f"at most {MAX_SUBSCRIBERS} planet stream subscribers")
+        sub = _Subscriber()
+        self._subscribers.add(sub)
+        return sub
+
+    def unsubscribe(self, sub: _Subscriber) -> None:
+        self._subscribers.discard(sub)
+
+    def catch_up(self, last_event_id: Optional[str]) -> list:
+        """
+        Events a (re)connecting client needs: the deltas after `last_event_id` when they
+        are still buffered, nothing if it is current, else one full state.
+        """
+        if self.state is None:
+            return []  # status not readable yet; the first successful refresh sends a full state
+        if last_event_id:
+            epoch, _, seq = last_event_id.partition("-")
+            if epoch == self.epoch and seq.isdigit():
+                n = int(seq)
+                if n == self.seq:
+                    return []
+                if self._replay and n >= self._replay[0][0] - 1 and n < self.seq:
+                    return [("delta", f"{self.epoch}-{s}", d) for s, d in self._replay if s > n]
+        return [("state", self.event_id(), dict(self.state or {}))]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "subscribers": len(self._subscribers),
+            "event_id": self.event_id(),
+            "published": self.published,
+            "lag_resets": self.resets,
+            "replay_buffer": len(self._replay),
+            "pump_running": self._task is not None and not self._task.done(),
+        }
+
+
+def format_event(event: Event) -> bytes:
+    """One Server-Sent Events frame."""
+    name, event_id, data = event
+    payload = json.dumps(data, separators=(",", ":"))
+    return f"id: {event_id}\nevent: {name}\ndata: {payload}\n\n".encode("utf-8")
+
+
+HEARTBEAT_FRAME = b": ping\n\n"
+
+_hub: Optional[PlanetHub] = None
+
+
+def get_planet_hub(source: StateSource) -> PlanetHub:
+    global _hub
+    if _hub is None:
+        _hub = PlanetHub(source)
+        get_planet_window().add_listener(_hub.notify)
+    return _hub
+
+
+def current_planet_hub() -> Optional[PlanetHub]:
+    """The hub if created (diagnostics; never creates one)."""
+    return _hub
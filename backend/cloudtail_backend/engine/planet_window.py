@@ -0,0 +1,320 @@
+from __future__ import annotations
+import os, heapq, logging, threading, time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from cloudtail_backend.database.memory_queries import STATUS_FIELDS
+from cloudtail_backend.database.mongodb import storage_breaker
+from cloudtail_backend.utils.emotion import get_final_emotion
+
+logger = logging.getLogger(__name__)
+
+WINDOW_HOURS = float(os.getenv("CLOUDTAIL_PLANET_WINDOW_H", "24"))
+BUCKET_SECONDS = int(os.getenv("CLOUDTAIL_PLANET_BUCKET_S", "60"))
+HISTORY_LEN = 12
+# Full reseed from Mongo; also picks up writes made by other worker processes
+RESYNC_SECONDS = float(os.getenv("CLOUDTAIL_PLANET_RESYNC_S", "60"))
+
+# Only the fields the window needs (seeding never pulls `content`)
+WINDOW_PROJECTION = {"_id": 0, "id": 1, "timestamp": 1, **{f: 1 for f in STATUS_FIELDS}}
+
+
+def _epoch(ts: datetime) -> float:
+    """
+    Stored timestamps are naive UTC (datetime.utcnow()) with BSON's millisecond precision;
+    truncate the same way so equal-ms writes tie-break on id exactly as Mongo sorts them.
+    """
+    ts = ts.replace(microsecond=ts.microsecond // 1000 * 1000)
+    if ts.tzinfo is None:
+        ts = ts.replace(tzinfo=timezone.utc)
+    return ts.timestamp()
+
+
+def status_entry(doc: Dict[str, Any]) -> Optional[Tuple[str, float, str]]:
+    """
+    (id, epoch seconds, emotion) for a memory document, or None if it does not count toward
+    planet status. Same reading as the aggregation path: private memories are left out,
+    the emotion is get_final_emotion (manual_override, else detected_emotion).
+    """
+    mid, ts = doc.get("id"), doc.get("timestamp")
+    if mid is None or not isinstance(ts, datetime) or doc.get("is_private") is True:
+        return None
+    return str(mid), _epoch(ts), get_final_emotion(doc)
+
+
+@dataclass
+class WindowSnapshot:
+    counts: Dict[str, int]        # canonical emotion → memories in the window
+    history: List[str]            # newest first, at most HISTORY_LEN
+    total: int
+    version: int                  # bumps on every change that can alter the status
+    newest: Optional[float]       # epoch of the newest entry in the window
+
+
+class _Bucket:
+    __slots__ = ("counts", "ids")
+
+    def __init__(self) -> None:
+        self.counts: Dict[str, int] = {}
+        self.ids: Set[str] = set()
+
+
+class PlanetWindow:
+    """
+    Rolling per-emotion counters over the last WINDOW_HOURS, in BUCKET_SECONDS buckets,
+    plus the newest HISTORY_LEN emotions, kept current by the memories write routes.
+    Reads cost O(expired buckets) + O(1); the id index lets updates/deletes adjust counts.
+    """
+
+    def __init__(self, window_s: float = WINDOW_HOURS * 3600, bucket_s: int = BUCKET_SECONDS, history_len: int = HISTORY_LEN) -> None:
+        self.window_s = window_s
+        self.bucket_s = max(1, bucket_s)
+        self.history_len = history_len
+        self._lock = threading.Lock()
+        self._buckets: Dict[int, _Bucket] = {}
+        self._starts: List[int] = []                         # min-heap of bucket starts
+        self._totals: Dict[str, int] = {}
+        self._index: Dict[str, Tuple[float, str]] = {}       # id → (epoch, emotion)
+        self._history: List[Tuple[float, str, str]] = []     # newest first: (epoch, id, emotion)
+        self._history_dirty = False
+        self.version = 0
+        self.ready = False                                   # seeded from Mongo at least once
+        self.seeded_at: Optional[float] = None
+        self.last_drift: Optional[int] = None
+        # Writes that land while a resync reads Mongo; replayed onto the fresh state
+        self._journal: Optional[List[Tuple[str, Any]]] = None
+        self._listeners: List[Callable[[], None]] = []
+
+    # ---------- Mutations (caller: memories routes) ----------
+    def add(self, doc: Dict[str, Any], now: Optional[float] = None) -> None:
+        with self._lock:
+            self._expire(now if now is not None else time.time())
+            self._upsert_locked(doc, now)
+            self.version += 1
+        self._notify()
+
+    def add_many(self, docs: Iterable[Dict[str, Any]], now: Optional[float] = None) -> None:
+        now = now if now is not None else time.time()
+        with self._lock:
+            self._expire(now)
+            for doc in docs:
+                self._upsert_locked(doc, now)
+            self.version += 1
+        self._notify()
+
+    def update(self, doc: Dict[str, Any]) -> None:
+        """Document after an update (re-reads its emotion; drops it if it became private)."""
+        self.add(doc)
+
+    def remove(self, memory_id: str) -> None:
+        with self._lock:
+            self._log("remove", memory_id)
+            removed = self._remove_locked(memory_id)
+            if removed:
+                self.version += 1
+        if removed:
+            self._notify()
+
+    def begin_resync(self) -> None:
+        """Call before reading the window from Mongo; writes from here on survive reset()."""
+        with self._lock:
+            self._journal = []
+
+    def abort_resync(self) -> None:
+        with self._lock:
+            self._journal = None
+
+    def reset(self, docs: Iterable[Dict[str, Any]], now: Optional[float] = None) -> int:
+        """
+        Replace the whole state with `docs` (a fresh read of the window from Mongo), then
+        replay writes journaled since begin_resync(). Returns how many ids differed from
+        the previous state (drift; 0 when consistent).
+        """
+        now = now if now is not None else time.time()
+        fresh = PlanetWindow(self.window_s, self.bucket_s, self.history_len)
+        for doc in docs:
+            entry = status_entry(doc)
+            if entry is not None:
+                fresh._add_locked(*entry, now=now)
+        with self._lock:
+            for op, arg in self._journal or ():
+                if op == "add":
+                    fresh._upsert_locked(arg, now)
+                else:
+                    fresh._remove_locked(arg)
+            self._journal = None
+            self._expire(now)
+            drift = len(set(self._index.items()) ^ set(fresh._index.items())) if self.ready else None
+            self._buckets, self._starts, self._totals = fresh._buckets, fresh._starts, fresh._totals
+            self._index, self._history, self._history_dirty = fresh._index, fresh._history, fresh._history_dirty
+            self.version += 1
+            self.ready = True
+            self.seeded_at = time.time()
+            self.last_drift = drift
+        self._notify()
+        return drift or 0
+
+    def add_listener(self, fn: Callable[[], None]) -> None:
+        """Called (no arguments, outside the lock) after every write or resync."""
+        self._listeners.append(fn)
+
+    def _notify(self) -> None:
+        for fn in list(self._listeners):
+            try:
+                fn()
+            except Exception as e:
+                logger.warning("Planet window listener failed: %s", e)
+
+    # ---------- Reads ----------
+    def snapshot(self, now: Optional[float] = None) -> WindowSnapshot:
+        with self._lock:
+            self._expire(now if now is not None else time.time())
+            if self._history_dirty:
+                self._history = heapq.nlargest(
+                    self.history_len, ((ts, mid, emo) for mid, (ts, emo) in self._index.items())
+                )
+                self._history_dirty = False
+            return WindowSnapshot(
+                counts=dict(self._totals),
+                history=[emo for _, _, emo in self._history],
+                total=len(self._index),
+                version=self.version,
+                newest=self._history[0][0] if self._history else None,
+            )
+
+    def stats(self) -> Dict[str, Any]:
+        snap = self.snapshot()
+        return {
+            "ready": self.ready,
+            "seeded_at": self.seeded_at,
+            "last_drift": self.last_drift,
+            "window_hours": self.window_s / 3600,
+            "bucket_seconds": self.bucket_s,
+            "buckets": len(self._buckets),
+            "total": snap.total,
+            "counts": snap.counts,
+            "history": snap.history,
+            "version": snap.version,
+        }
+
+    def since(self, now: Optional[float] = None) -> datetime:
+        """Oldest timestamp the window covers (naive UTC, like stored timestamps)."""
+        cutoff = self._cutoff(now if now is not None else time.time())
+        return datetime.fromtimestamp(cutoff, timezone.utc).replace(tzinfo=None)
+
+    # ---------- Internals (lock held) ----------
+    def _log(self, op: str, arg: Any) -> None:
+        if self._journal is not None:
+            self._journal.append((op, arg))
+
+    def _upsert_locked(self, doc: Dict[str, Any], now: Optional[float]) -> None:
+        if doc.get("id") is None:
+            return
+        self._remove_locked(str(doc["id"]))
+        entry = status_entry(doc)
+        if entry is not None:
+            self._add_locked(*entry, now=now)
+        self._log("add", doc)
+
+    def _cutoff(self, now: float) -> int:
+        """Whole buckets expire, so the window starts at the bucket holding `now - window_s`."""
+        return int((now - self.window_s) // self.bucket_s) * self.bucket_s
+
+    def _add_locked(self, mid: str, ts: float, emotion: str, now: Optional[float] = None) -> None:
+        now = now if now is not None else time.time()
+        if ts < self._cutoff(now):
+            return  # older than the window (e.g. imported history)
+        start = int(ts // self.bucket_s) * self.bucket_s
+        bucket = self._buckets.get(start)
+        if bucket is None:
+            bucket = self._buckets[start] = _Bucket()
+            heapq.heappush(self._starts, start)
+        bucket.counts[emotion] = bucket.counts.get(emotion, 0) + 1
+        bucket.ids.add(mid)
+        self._totals[emotion] = self._totals.get(emotion, 0) + 1
+        self._index[mid] = (ts, emotion)
+        if not self._history_dirty:
+            item = (ts, mid, emotion)
+            if len(self._history) < self.history_len or item > self._history[-1]:
+                self._history.append(item)
+                self._history.sort(reverse=True)
+                del self._history[self.history_len:]
+
+    def _remove_locked(self, mid: str) -> bool:
+        old = self._index.pop(mid, None)
+        if old is None:
+            return False
+        ts, emotion = old
+        bucket = self._buckets.get(int(ts // self.bucket_s) * self.bucket_s)
+        if bucket is not None:
+            bucket.ids.discard(mid)
+            bucket.counts[emotion] -= 1
+        self._totals[emotion] -= 1
+        if not self._totals[emotion]:
+            del self._totals[emotion]
+        if any(h[1] == mid for h in self._history):
+            self._history_dirty = True  # refill from the index on next read
+        return True
+
+    def _expire(self, now: float) -> None:
+        cutoff = self._cutoff(now)
+        changed = False
+        while self._starts and self._starts[0] < cutoff:
+            start = heapq.heappop(self._starts)
+            bucket = self._buckets.pop(start)
+            for mid in bucket.ids:
+                old = self._index.pop(mid, None)
+                if old is not None:
+                    emo = old[1]
+                    self._totals[emo] -= 1
+                    if not self._totals[emo]:
+                        del self._totals[emo]
+            changed = changed or bool(bucket.ids)
+        if changed:
+            self._history_dirty = True
+            self.version += 1
+
+
+_window: Optional[PlanetWindow] = None
+_window_lock = threading.Lock()
+
+
+def get_planet_window() -> PlanetWindow:
+    global _window
+    if _window is None:
+        with _window_lock:
+            if _window is None:
+                _window = PlanetWindow()
+    return _window
+
+
+def current_planet_window() -> Optional[PlanetWindow]:
+    """The window if created (diagnostics; never creates one)."""
+    return _window
+
+
+async def load_window_docs(collection, since: datetime) -> List[Dict[str, Any]]:
+    """Emotion fields of every memory since `since` (projected: no content on the wire)."""
+    cursor = collection.find({"timestamp": {"$gte": since}}, WINDOW_PROJECTION).batch_size(1000)
+    return [d async for d in cursor]
+
+
+async def resync_planet_window(collection) -> int:
+    """
+    Reseed the window from Mongo; returns the drift against the in-process state.
+    Raises CircuitOpen without touching Mongo while the storage breaker is open.
+    """
+    window = get_planet_window()
+    now = time.time()
+    window.begin_resync()
+    try:
+        docs = await storage_breaker().call(lambda: load_window_docs(collection, window.since(now)))
+    except Exception:
+        window.abort_resync()
+        raise
+    drift = window.reset(docs, now=now)
+    if drift:
+        logger.warning("Planet window drifted from Mongo by %d entries; resynced", drift)
+    return drift
+
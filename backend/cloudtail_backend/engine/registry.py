@@ -0,0 +1,268 @@
+from __future__ import annotations
+import os, json, logging, threading, time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from .inference_cache import config_fingerprint
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+CONFIG_PATH = BASE_DIR / "storage" / "emotion_engine_config.json"
+
+# How often (seconds) requests may stat() the config file for hot reload; 0 disables polling
+CONFIG_POLL_S = float(os.getenv("CLOUDTAIL_CONFIG_POLL_S", "2"))
+
+
+def load_engine_config(path: Path = CONFIG_PATH, strict: bool = False) -> Dict[str, Any]:
+    """
+    Read the engine JSON config; a missing or unreadable file means defaults ({}).
+    With `strict`, unreadable or non-object JSON raises instead (used by hot reload,
+    where a half-saved file must not reset the rules to defaults).
+    """
+    if not path.exists():
+        return {}
+    try:
+        config = json.loads(path.read_text(encoding="utf-8"))
+        if not isinstance(config, dict):
+            raise ValueError("top-level JSON value must be an object")
+        return config
+    except Exception as e:
+        if strict:
+            raise
+        logger.warning("Engine config unreadable (%s), using defaults: %s", path, e)
+        return {}
+
+
+def _config_mtime(path: Path = CONFIG_PATH) -> Optional[float]:
+    try:
+        return path.stat().st_mtime
+    except OSError:
+        return None
+
+
+def _rss_bytes() -> Optional[int]:
+    """Resident set size of this process (psutil if installed, else /proc on Linux)."""
+    try:
+        import psutil  # optional
+        return int(psutil.Process().memory_info().rss)
+    except Exception:
+        pass
+    try:
+        with open("/proc/self/statm", "r") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except Exception:
+        return None
+
+
+@dataclass
+class EngineEntry:
+    key: str
+    model_key: Tuple[str, str]              # (model_name, backend)
+    engine: Any = None                      # EmotionAlchemyEngine
+    error: Optional[Exception] = None
+    load_seconds: float = 0.0
+    model_loaded: bool = False              # False when the weights were reused from another entry
+    rss_delta_bytes: Optional[int] = None
+    loaded_at: float = field(default_factory=time.time)
+
+    def describe(self) -> Dict[str, Any]:
+        model = getattr(self.engine, "model", None)
+        rules = getattr(self.engine, "rules", None)
+        return {
+            "key": self.key,
+            "model_name": self.model_key[0],
+            "backend": self.model_key[1],
+            "available": bool(model is not None and model.available),
+            "error": str(self.error) if self.error else None,
+            "load_seconds": round(self.load_seconds, 3),
+            "model_loaded_here": self.model_loaded,
+            "model_bytes": model.memory_bytes() if model is not None else None,
+            "rss_delta_bytes": self.rss_delta_bytes,
+            "loaded_at": self.loaded_at,
+            "rules": rules.describe() if rules is not None else None,
+        }
+
+
+class EngineRegistry:
+    """
+    Process-wide EmotionAlchemyEngine registry.
+
+    Engines are keyed by a fingerprint of their config; model weights are keyed by
+    (model_name, backend) and shared between engines, so each distinct model loads once.
+    Construction runs under a per-key lock: concurrent first requests wait for one build.
+    """
+
+    def __init__(self) -> None:
+        self._entries: Dict[str, EngineEntry] = {}
+        self._models: Dict[Tuple[str, str], Any] = {}
+        self._key_locks: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    def _key_lock(self, key: str) -> threading.Lock:
+        with self._lock:
+            return self._key_locks.setdefault(key, threading.Lock())
+
+    def get_entry(self, config: Dict[str, Any]) -> EngineEntry:
+        from .emotion_engine import EmotionAlchemyEngine
+        from .emotion_model import DEFAULT_BACKEND, DEFAULT_MODEL, EmotionModelWrapper
+
+        key = config_fingerprint(config)
+        entry = self._entries.get(key)
+        if entry is not None:
+            return entry
+
+        with self._key_lock(key):
+            entry = self._entries.get(key)  # built while we waited
+            if entry is not None:
+                return entry
+
+            model_key = (config.get("model_name", DEFAULT_MODEL), config.get("backend", DEFAULT_BACKEND))
+            entry = EngineEntry(key=key, model_key=model_key)
+            rss0, t0 = _rss_bytes(), time.perf_counter()
+            try:
+                with self._key_lock(f"model:{model_key}"):
+                    model = self._models.get(model_key)
+                    if model is None:
+                        model = EmotionModelWrapper(model_key[0], backend=model_key[1])
+                        self._models[model_key] = model
+                        entry.model_loaded = True
+                entry.engine = EmotionAlchemyEngine.from_dict(config, model=model)
+            except Exception as e:
+                logger.exception("Engine init failed: %s", e)
+                entry.error = e
+            entry.load_seconds = time.perf_counter() - t0
+            rss1 = _rss_bytes()
+            entry.rss_delta_bytes = rss1 - rss0 if rss0 is not None and rss1 is not None else None
+            logger.info("Engine [%s] ready in %.2fs (model %s@%s%s)", key, entry.load_seconds,
+                        model_key[0], model_key[1], "" if entry.model_loaded else ", shared")
+
+            with self._lock:
+                self._entries[key] = entry
+            return entry
+
+    def get(self, config: Dict[str, Any]) -> Optional[Any]:
+        return self.get_entry(config).engine
+
+    def entries(self) -> List[EngineEntry]:
+        with self._lock:
+            return list(self._entries.values())
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            entries = list(self._entries.values())
+            models = len(self._models)
+        return {"models_loaded": models, "engines": [e.describe() for e in entries]}
+
+
+_registry = EngineRegistry()
+_default_config: Optional[Dict[str, Any]] = None
+_default_entry: Optional[EngineEntry] = None
+_default_lock = threading.Lock()
+_default_mtime: Optional[float] = None
+_reload_lock = threading.Lock()
+_next_poll = 0.0
+_poll_thread: Optional[threading.Thread] = None
+_last_reload: Dict[str, Any] = {}
+
+
+def default_engine_config() -> Dict[str, Any]:
+    """storage/emotion_engine_config.json, read once per process (then hot-reloaded, see reload_default_engine)."""
+    global _default_config, _default_mtime
+    if _default_config is None:
+        with _default_lock:
+            if _default_config is None:
+                _default_mtime = _config_mtime()
+                _default_config = load_engine_config()
+    return _default_config
+
+
+def reload_default_engine(force: bool = False) -> Dict[str, Any]:
+    """
+    Re-read storage/emotion_engine_config.json and swap the default engine's mapping/rules
+    snapshot in place; model weights stay loaded. Without `force` this is a no-op while the
+    file's mtime is unchanged. A file that fails to parse or validate keeps the old snapshot.
+    `model_name` / `backend` changes are reported as needing a restart, not applied.
+    """
+    global _default_config, _default_mtime, _last_reload
+    with _reload_lock:
+        mtime = _config_mtime()
+        if not force and mtime == _default_mtime:
+            return {"reloaded": False, "reason": "unchanged"}
+        entry = get_engine_entry()
+        result: Dict[str, Any] = {"reloaded": False, "at": time.time(), "mtime": mtime}
+        try:
+            if entry.engine is None:
+                raise RuntimeError(f"engine not initialized: {entry.error}")
+            config = load_engine_config(strict=True)
+            from .emotion_model import DEFAULT_BACKEND, DEFAULT_MODEL
+            wanted = (config.get("model_name", DEFAULT_MODEL), config.get("backend", DEFAULT_BACKEND))
+            result["restart_required"] = wanted != entry.model_key
+            result["reloaded"] = entry.engine.apply_config(config)
+            _default_config = config
+            result["rules"] = entry.engine.rules.describe()
+        except Exception as e:
+            logger.warning("Engine config reload failed, keeping current rules: %s", e)
+            result["error"] = str(e)
+        _default_mtime = mtime  # don't retry a broken file on every poll; the next save changes mtime
+        if result["reloaded"]:
+            logger.info("Engine rules reloaded: version=%d fingerprint=%s",
+                        result["rules"]["version"], result["rules"]["fingerprint"])
+        if result.get("restart_required"):
+            logger.warning("model_name/backend changed in %s: restart to load the new model", CONFIG_PATH.name)
+        _last_reload = result
+        return result
+
+
+def _poll_default_config() -> None:
+    """
+    Hot-path check, at most once per CONFIG_POLL_S: the stat() and any reload run on a
+    background thread, so callers (event loop included) never wait on file I/O or a rules
+    rebuild; requests keep using the current snapshot until apply_config swaps it.
+    """
+    global _next_poll, _poll_thread
+    if CONFIG_POLL_S <= 0 or _default_entry is None:
+        return
+    now = time.monotonic()
+    if now < _next_poll:
+        return
+    _next_poll = now + CONFIG_POLL_S
+    if _poll_thread is not None and _poll_thread.is_alive():
+        return
+    _poll_thread = threading.Thread(target=_check_default_config, name="cloudtail-config-poll", daemon=True)
+    _poll_thread.start()
+
+
+def _check_default_config() -> None:
+    if _config_mtime() != _default_mtime and not _reload_lock.locked():
+        try:
+            reload_default_engine()
+        except Exception as e:
+            logger.warning("Engine config poll failed: %s", e)
+
+
+def reload_status() -> Dict[str, Any]:
+    """Last reload attempt (empty before the first one) and the polling interval."""
+    return {"poll_seconds": CONFIG_POLL_S, "config_path": str(CONFIG_PATH), "last": _last_reload}
+
+
+def get_registry() -> EngineRegistry:
+    return _registry
+
+
+def get_engine_entry(config: Optional[Dict[str, Any]] = None) -> EngineEntry:
+    """Entry for `config` (default: storage/emotion_engine_config.json), built on first use."""
+    global _default_entry
+    if config is not None:
+        return _registry.get_entry(config)
+    if _default_entry is None:
+        _default_entry = _registry.get_entry(default_engine_config())
+    else:
+        _poll_default_config()
+    return _default_entry
+
+
+def get_engine(config: Optional[Dict[str, Any]] = None) -> Optional[Any]:
+    """Shared EmotionAlchemyEngine for `config`, or None if it failed to initialize."""
+    return get_engine_entry(config).engine
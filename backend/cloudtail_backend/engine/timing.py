@@ -0,0 +1,147 @@
+from __future__ import annotations
+import os, bisect, contextlib, json, logging, threading, time
+from pathlib import Path
+from typing import Any, Dict, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+# Opt-in: with CLOUDTAIL_TIMINGS unset every span() is a shared no-op context manager
+ENABLED = os.getenv("CLOUDTAIL_TIMINGS", "0").strip().lower() in ("1", "true", "yes", "on")
+DUMP_PATH = Path(os.getenv(
+    "CLOUDTAIL_TIMINGS_FILE",
+    str(Path(__file__).resolve().parent.parent / "storage" / "timings.json"),
+))
+
+# Upper bucket bounds; the last bucket is open-ended
+LATENCY_BUCKETS_MS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500)
+SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024, 2048, 4096, 8192)
+
+
+class Histogram:
+    """Fixed-bucket histogram (not thread-safe on its own; StageTimings holds the lock)."""
+
+    def __init__(self, bounds: Sequence[float]) -> None:
+        self.bounds = tuple(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.min: Optional[float] = None
+        self.max: Optional[float] = None
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.total += value
+        self.min = value if self.min is None or value < self.min else self.min
+        self.max = value if self.max is None or value > self.max else self.max
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Upper bound of the bucket holding the q-th observation (max for the open bucket)."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for i, c in enumerate(self.counts):
+            seen += c
+            if seen >= rank and c:
+                return self.bounds[i] if i < len(self.bounds) else self.max
+        return self.max
+
+    def snapshot(self) -> Dict[str, Any]:
+        labels = [f"<={b:g}" for b in self.bounds] + [f">{self.bounds[-1]:g}"]
+        return {
+            "count": self.count,
+            "mean": round(self.total / self.count, 4) if self.count else None,
+            "min": self.min,
+            "max": self.max,
+            "p50": self.quantile(0.50),
+            "p95": self.quantile(0.95),
+            "p99": self.quantile(0.99),
+            "buckets": {lbl: c for lbl, c in zip(labels, self.counts) if c},
+        }
+
+
+class StageTimings:
+    """
+    Per-stage latency histograms (milliseconds) plus size histograms (batch size, token counts),
+    shared by EmotionModelWrapper and EmotionAlchemyEngine.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._stages: Dict[str, Histogram] = {}
+        self._sizes: Dict[str, Histogram] = {}
+        self.started_at = time.time()
+
+    def observe(self, stage: str, seconds: float) -> None:
+        with self._lock:
+            hist = self._stages.get(stage)
+            if hist is None:
+                hist = self._stages[stage] = Histogram(LATENCY_BUCKETS_MS)
+            hist.observe(seconds * 1000.0)
+
+    def observe_size(self, name: str, value: int) -> None:
+        with self._lock:
+            hist = self._sizes.get(name)
+            if hist is None:
+                hist = self._sizes[name] = Histogram(SIZE_BUCKETS)
+            hist.observe(value)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "enabled": True,
+                "since": self.started_at,
+                "stages_ms": {k: h.snapshot() for k, h in sorted(self._stages.items())},
+                "sizes": {k: h.snapshot() for k, h in sorted(self._sizes.items())},
+            }
+
+    def reset(self) -> None:
+        with self._lock:
+            self._stages.clear()
+            self._sizes.clear()
+            self.started_at = time.time()
+
+    def dump(self, path: Path = DUMP_PATH) -> Path:
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        data = {"dumped_at": time.time(), "pid": os.getpid(), **self.snapshot()}
+        tmp = path.with_suffix(path.suffix + ".tmp")
+        tmp.write_text(json.dumps(data, indent=2), encoding="utf-8")
+        os.replace(tmp, path)
+        logger.info("Stage timings written to %s", path)
+        return path
+
+
+class _Span:
+    __slots__ = ("_timings", "_stage", "_t0")
+
+    def __init__(self, timings: StageTimings, stage: str) -> None:
+        self._timings = timings
+        self._stage = stage
+
+    def __enter__(self) -> "_Span":
+        self._t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._timings.observe(self._stage, time.perf_counter() - self._t0)
+
+
+_timings: Optional[StageTimings] = StageTimings() if ENABLED else None
+_NOOP = contextlib.nullcontext()
+
+
+def current_timings() -> Optional[StageTimings]:
+    """The process-wide StageTimings, or None when CLOUDTAIL_TIMINGS is off."""
+    return _timings
+
+
+def span(stage: str):
+    """`with span("model.forward"):` records the block's duration; a no-op when timings are off."""
+    return _NOOP if _timings is None else _Span(_timings, stage)
+
+
+def observe_size(name: str, value: int) -> None:
+    if _timings is not None:
+        _timings.observe_size(name, value)
@@ -23,6 +23,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag"],
 )
 
 # ------------- Helper: robust import with fallback -------------
@@ -70,8 +71,14 @@ def __routes():
 
 
 @app.get("/healthz")
-def healthz():
-    return {"ok": True, "profile": PROFILE, "version": app.version}
+async def healthz():
+    """Liveness (always ok while the process serves) plus, in FULL, storage ping latency and pool use."""
+    out = {"ok": True, "profile": PROFILE, "version": app.version}
+    if PROFILE == "full":
+        from cloudtail_backend.database.mongodb import storage_health
+
+        out["storage"] = await storage_health()
+    return out
 
 
 @app.get("/version")
@@ -161,4 +168,108 @@ if PROFILE == "full":
     )
     _include_router_safe(mem_router, "/api", "memories")
 
+# Diagnostics: GET /__diag/*  (batching / engine stats)
+diag_router = _import_router(
+    "cloudtail_backend.routes.diagnostics_routes",
+    "cloudtail_backend.diagnostics_routes",
+)
+_include_router_safe(diag_router, "/__diag", "diag")
+
 print(">>> after include:", len(app.routes))
+
+
+# ------------- Shutdown: drain the background audit-log writer -------------
+@app.on_event("shutdown")
+def _flush_audit_logs():
+    from cloudtail_backend.utils.log_writer import shutdown_log_writer
+
+    shutdown_log_writer()
+
+
+@app.on_event("shutdown")
+def _stop_planet_stream():
+    from cloudtail_backend.engine.planet_hub import current_planet_hub
+
+    hub = current_planet_hub()
+    if hub is not None:
+        hub.stop()
+
+
+# ------------- Startup: Mongo client + pool warm-up (FULL) -------------
+if PROFILE == "full":
+    @app.on_event("startup")
+    async def _start_mongo():
+        from cloudtail_backend.database.mongodb import STORAGE, start_mongo
+
+        if STORAGE != "mongo":
+            return
+        try:
+            ping = await start_mongo()
+        except Exception as e:  # not configured: the API still starts
+            print(f"[warn] mongo client not started: {e}")
+            return
+        if ping["ok"]:
+            print(f"[ok] mongo connected: ping {ping['ms']} ms")
+        else:
+            print(f"[warn] mongo ping failed: {ping['error']}")
+
+
+# ------------- Startup: Mongo indexes (FULL) -------------
+if PROFILE == "full":
+    @app.on_event("startup")
+    async def _ensure_memory_indexes():
+        from cloudtail_backend.database.indexes import ENSURE_ON_STARTUP, ensure_indexes
+        from cloudtail_backend.database.mongodb import get_memory_collection
+
+        if not ENSURE_ON_STARTUP:
+            return
+        try:
+            report = await ensure_indexes(get_memory_collection())
+        except Exception as e:  # Mongo unreachable / not configured: the API still starts
+            print(f"[warn] index check skipped: {e}")
+            return
+        for name, r in report.items():
+            print(f"[{'ok' if r['status'] == 'ok' else 'warn'}] index {name}: {r.get('error', 'ready')}")
+
+
+# ------------- Startup: planet rolling window (FULL) -------------
+if PROFILE == "full":
+    _planet_resync_task = None
+
+    @app.on_event("startup")
+    async def _seed_planet_window():
+        import asyncio
+        from cloudtail_backend.database.mongodb import get_memory_collection
+        from cloudtail_backend.engine.planet_window import RESYNC_SECONDS, get_planet_window, resync_planet_window
+
+        global _planet_resync_task
+        try:
+            await resync_planet_window(get_memory_collection())
+            print(f"[ok] planet window seeded: {get_planet_window().stats()['total']} memories")
+        except Exception as e:  # status falls back to the Mongo recompute until a resync succeeds
+            print(f"[warn] planet window not seeded: {e}")
+
+        async def _resync_loop():
+            while True:
+                await asyncio.sleep(RESYNC_SECONDS)
+                try:
+                    await resync_planet_window(get_memory_collection())
+                except Exception as e:
+                    print(f"[warn] planet window resync failed: {e}")
+
+        if RESYNC_SECONDS > 0:
+            _planet_resync_task = asyncio.create_task(_resync_loop())
+
+    @app.on_event("shutdown")
+    async def _stop_planet_resync():
+        if _planet_resync_task is not None:
+            _planet_resync_task.cancel()
+
+
+# ------------- Shutdown: close the Mongo client last (FULL) -------------
+if PROFILE == "full":
+    @app.on_event("shutdown")
+    def _close_mongo():
+        from cloudtail_backend.database.mongodb import close_mongo
+
+        close_mongo()
@@ -0,0 +1,181 @@
+from __future__ import annotations
+
+import os
+
+from fastapi import APIRouter, HTTPException
+
+from cloudtail_backend.engine.batching import current_batcher
+from cloudtail_backend.engine.executor import current_executor
+from cloudtail_backend.engine.inference_cache import current_cache
+from cloudtail_backend.engine.planet_hub import current_planet_hub
+from cloudtail_backend.engine.planet_window import current_planet_window
+from cloudtail_backend.engine.registry import get_registry, reload_default_engine, reload_status
+from cloudtail_backend.engine.timing import current_timings
+from cloudtail_backend.utils.circuit_breaker import breaker_stats
+from cloudtail_backend.utils.log_writer import ASYNC_LOGS, current_log_writer
+
+router = APIRouter(tags=["diagnostics"])
+PROFILE = os.getenv("CLOUDTAIL_PROFILE", "presentation").lower()
+
+
+@router.get("/ping", name="loop_ping")
+async def loop_ping():
+    """Answered on the event loop with no I/O: its latency is event-loop delay (tools/bench_loop_latency.py)."""
+    return {"ok": True}
+
+
+@router.get("/batching", name="batching_stats")
+def batching_stats():
+    """Micro-batching scheduler behind POST /api/recommend: queue depth and batch-size stats."""
+    batcher = current_batcher()
+    if batcher is None:
+        return {"active": False}
+    return batcher.stats()
+
+
+@router.get("/inference", name="inference_executor_stats")
+def inference_executor_stats():
+    """Dedicated inference executor used by async routes: pool size and pending/rejected calls."""
+    executor = current_executor()
+    if executor is None:
+        return {"active": False}
+    return executor.stats()
+
+
+@router.get("/cache", name="inference_cache_stats")
+def inference_cache_stats():
+    """Content-addressed inference cache: size, hits/misses, single-flight waits and evictions."""
+    cache = current_cache()
+    if cache is None:
+        return {"active": False}
+    return cache.stats()
+
+
+@router.get("/engines", name="engine_registry_stats")
+def engine_registry_stats():
+    """Loaded engines/models: load time, memory footprint and active rules snapshot per registry entry."""
+    return {**get_registry().stats(), "reload": reload_status()}
+
+
+@router.post("/engine/reload", name="engine_reload")
+def engine_reload():
+    """
+    Re-read storage/emotion_engine_config.json now and swap in the recompiled mapping/rules
+    (model weights stay loaded). Applies to the worker process that serves this request.
+    """
+    return reload_default_engine(force=True)
+
+
+@router.get("/cascade", name="cascade_stats")
+def cascade_stats():
+    """Tiered classification: share of traffic answered by the keyword tier vs. DistilBERT, and their agreement."""
+    out = []
+    for entry in get_registry().entries():
+        engine = entry.engine
+        if engine is None:
+            continue
+        out.append({
+            "key": entry.key,
+            "enabled": engine.keyword_tier is not None,
+            "min_margin": getattr(engine.keyword_tier, "min_margin", None),
+            "shadow_every": int(engine.cascade_config.get("shadow_every", 0) or 0),
+            **engine.cascade_stats.snapshot(),
+        })
+    return {"engines": out}
+
+
+@router.get("/timings", name="stage_timings")
+def stage_timings():
+    """
+    Per-stage latency histograms of model inference and engine post-processing (opt-in: CLOUDTAIL_TIMINGS=1),
+    plus batch-size and token-count histograms.
+    """
+    timings = current_timings()
+    if timings is None:
+        return {"enabled": False}
+    return timings.snapshot()
+
+
+@router.post("/timings/dump", name="stage_timings_dump")
+def stage_timings_dump(reset: bool = False):
+    """Write the current histograms to CLOUDTAIL_TIMINGS_FILE (JSON); `reset=true` starts a new window."""
+    timings = current_timings()
+    if timings is None:
+        return {"enabled": False}
+    path = timings.dump()
+    if reset:
+        timings.reset()
+    return {"enabled": True, "path": str(path), "reset": reset}
+
+
+@router.get("/logs", name="log_writer_stats")
+def log_writer_stats():
+    """Background audit-log writer: queue depth, lines written / dropped, rotations."""
+    writer = current_log_writer()
+    if writer is None:
+        return {"active": False, "async": ASYNC_LOGS}
+    return {"active": True, "async": ASYNC_LOGS, **writer.stats()}
+
+
+@router.get("/breakers", name="circuit_breaker_stats")
+def circuit_breaker_stats():
+    """Circuit breakers around storage reads: state, consecutive failures, trips and fast-failed calls."""
+    return {"breakers": breaker_stats()}
+
+
+@router.get("/indexes", name="index_diagnostics")
+async def index_diagnostics(execution_stats: bool = False):
+    """
+    Indexes on `memories` plus `explain` of every route query shape; `flagged` lists shapes
+    answered by a collection scan or an in-memory sort (FULL only).
+    `execution_stats=true` also reports docs/keys examined (runs the queries).
+    """
+    if PROFILE != "full":
+        return {"active": False}
+    from cloudtail_backend.database.indexes import explain_route_queries
+    from cloudtail_backend.database.mongodb import get_memory_collection
+
+    try:
+        collection = get_memory_collection()
+        indexes = await collection.index_information()
+        report = await explain_route_queries(collection, "executionStats" if execution_stats else "queryPlanner")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail={"error": f"explain failed: {e}"})
+    return {"indexes": {name: info.get("key") for name, info in indexes.items()}, **report}
+
+
+@router.get("/planet_window", name="planet_window_stats")
+async def planet_window_stats(check: bool = False):
+    """
+    Rolling planet-status window: counts, history, version, drift at the last resync,
+    and the /planet/stream hub (subscribers, events published, lag resets).
+    `check=true` also compares it with the full Mongo recompute (FULL only).
+    """
+    window = current_planet_window()
+    if window is None:
+        return {"active": False}
+    hub = current_planet_hub()
+    out = {"active": True, **window.stats(), "stream": hub.stats() if hub is not None else None}
+    if check and PROFILE == "full":
+        from cloudtail_backend.routes.planet_routes import window_consistency
+
+        try:
+            out["consistency"] = await window_consistency()
+        except Exception as e:
+            raise HTTPException(status_code=500, detail={"error": f"recompute failed: {e}"})
+    return out
+
+
+@router.post("/planet_window/resync", name="planet_window_resync")
+async def planet_window_resync():
+    """Reseed the window from Mongo now; returns the drift it corrected (FULL only)."""
+    if PROFILE != "full":
+        return {"active": False}
+    from cloudtail_backend.database.mongodb import get_memory_collection
+    from cloudtail_backend.engine.planet_window import resync_planet_window
+
+    try:
+        drift = await resync_planet_window(get_memory_collection())
+    except Exception as e:
+        raise HTTPException(status_code=500, detail={"error": f"resync failed: {e}"})
+    return {"resynced": True, "drift": drift}
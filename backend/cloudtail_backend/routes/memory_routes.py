@@ -1,50 +1,55 @@
 from __future__ import annotations
 
 import os
-import json
 from uuid import uuid4
 from datetime import datetime
 from pathlib import Path
 from typing import List, Optional
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.concurrency import run_in_threadpool
 from fastapi.encoders import jsonable_encoder
-from pydantic import BaseModel
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic import BaseModel, validator
 from pymongo import ReturnDocument
+from pymongo.errors import BulkWriteError
 
 # Mongo + models + audit log
-from cloudtail_backend.database.mongodb import get_memory_collection
+from cloudtail_backend.database.mongodb import get_memory_collection, storage_breaker
+from cloudtail_backend.database.memory_export import EXPORT_BATCH_SIZE, gzip_chunks, iter_export
+from cloudtail_backend.database.memory_queries import (
+    LIST_SORT, canonical_emotion, decode_cursor, encode_cursor, memory_filter, parse_fields, projection, shape_doc,
+)
+from cloudtail_backend.engine.emotion_model import DEFAULT_BATCH_SIZE
+from cloudtail_backend.engine.executor import InferenceBusy, run_inference
+from cloudtail_backend.engine.planet_window import get_planet_window
+from cloudtail_backend.engine.registry import get_engine_entry
 from cloudtail_backend.models.memory import MemoryEntry, EmotionEssence
-from cloudtail_backend.utils.logging_utils import log_emotion_to_file
+from cloudtail_backend.utils.circuit_breaker import CircuitOpen
+from cloudtail_backend.utils.logging_utils import log_emotion_to_file, log_emotions_to_file
 
 router = APIRouter(tags=["memories"])
 PROFILE = os.getenv("CLOUDTAIL_PROFILE", "presentation").lower()
 
-# Engine lazy init (first use); cache init error for diagnostics
 BASE_DIR = Path(__file__).resolve().parent.parent
-CONFIG_PATH = BASE_DIR / "storage" / "emotion_engine_config.json"
-_engine = None
-_engine_error: Optional[Exception] = None
+AUDIT_LOG_PATH = Path(os.getenv("CLOUDTAIL_EMOTION_LOG", str(BASE_DIR / "storage" / "emotion_log.txt")))
+
+# POST /memories/bulk: max items per request, and items per inference/insert round
+BULK_MAX_ITEMS = int(os.getenv("CLOUDTAIL_MEMORIES_BULK_MAX", "10000"))
+BULK_CHUNK = int(os.getenv("CLOUDTAIL_MEMORIES_BULK_CHUNK", "512"))
+
+# GET /memories/ page size (the unpaginated version returned at most 1000)
+PAGE_DEFAULT = int(os.getenv("CLOUDTAIL_MEMORIES_PAGE_DEFAULT", "1000"))
+PAGE_MAX = int(os.getenv("CLOUDTAIL_MEMORIES_PAGE_MAX", "1000"))
 
 
 def _get_engine():
-    """Lazy-load EmotionAlchemyEngine with optional JSON config."""
-    global _engine, _engine_error
-    if _engine is not None or _engine_error is not None:
-        return _engine
-    try:
-        from cloudtail_backend.engine.emotion_engine import EmotionAlchemyEngine
-        config = {}
-        if CONFIG_PATH.exists():
-            try:
-                config = json.loads(CONFIG_PATH.read_text(encoding="utf-8"))
-            except Exception:
-                config = {}
-        _engine = EmotionAlchemyEngine.from_dict(config) if config else EmotionAlchemyEngine()
-    except Exception as e:
-        _engine_error = e
-        _engine = None
-    return _engine
+    """Shared EmotionAlchemyEngine from the process-wide registry (storage/emotion_engine_config.json)."""
+    return get_engine_entry().engine
+
+
+def _engine_error() -> Optional[Exception]:
+    return get_engine_entry().error
 
 
 # ---------- Schemas ----------
@@ -53,11 +58,21 @@ class MemoryRequest(BaseModel):
     content: str
 
 
+class MemoryBulkRequest(BaseModel):
+    contents: List[str]
+
+
 class MemoryUpdateRequest(BaseModel):
     manual_override: Optional[str] = None
     is_private: Optional[bool] = None
     keywords: Optional[List[str]] = None
 
+    @validator("manual_override", pre=True)
+    def _norm_override(cls, v: Optional[str]) -> Optional[str]:
+        # Stored canonical (like MemoryEntry), so ?emotion= filters see what get_final_emotion sees;
+        # "" is kept as "no override"
+        return (canonical_emotion(v) or "gratitude") if v else v
+
 
 # ---------- Endpoints ----------
 
@@ -77,19 +92,22 @@ async def upload_memory(request: MemoryRequest) -> MemoryEntry:
     if PROFILE != "full":
         raise HTTPException(status_code=503, detail={"error": "Memories API is available only in FULL profile."})
 
-    engine = _get_engine()
+    engine = await run_in_threadpool(_get_engine)  # first call may build the model
     if engine is None:
         raise HTTPException(
             status_code=503,
             detail={
                 "error": "Emotion engine unavailable",
                 "hint": "Install torch/transformers and resolve DLL/runtime issues.",
-                "engine_init_error": str(_engine_error) if _engine_error else None,
+                "engine_init_error": str(_engine_error()) if _engine_error() else None,
             },
         )
 
-    # infer emotion
-    essence: EmotionEssence = engine.extract_emotion(content)
+    # infer emotion off the event loop
+    try:
+        essence: EmotionEssence = await run_inference(engine.extract_emotion, content)
+    except InferenceBusy:
+        raise HTTPException(status_code=503, detail={"error": "Inference queue is full, retry shortly."})
 
     entry = MemoryEntry(
         id=str(uuid4()),
@@ -100,16 +118,17 @@ async def upload_memory(request: MemoryRequest) -> MemoryEntry:
 
     try:
         collection = get_memory_collection()
-        await collection.insert_one(entry.model_dump())
+        await collection.insert_one(entry.dict())
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"DB insert failed: {e}")
+    get_planet_window().add({"id": entry.id, "timestamp": entry.timestamp, "detected_emotion": entry.detected_emotion})
 
     try:
         log_emotion_to_file(
             text=content,
             label=essence.type,
             score=essence.value,
-            path=BASE_DIR,
+            path=AUDIT_LOG_PATH,
             element=essence.element,
         )
     except Exception:
@@ -118,24 +137,179 @@ async def upload_memory(request: MemoryRequest) -> MemoryEntry:
     return entry
 
 
-@router.get("/memories/", response_model=List[MemoryEntry], name="list_memories")
-async def get_memories() -> List[MemoryEntry]:
-    """List all memories (FULL only)."""
+@router.post("/memories/bulk", name="upload_memories_bulk")
+async def upload_memories_bulk(request: MemoryBulkRequest) -> dict:
+    """
+    Create many memories in one call (journal import):
+      1) classify non-blank contents in padded batches, chunk by chunk,
+      2) insert each chunk with one unordered insert_many,
+      3) append all audit lines with one file write.
+    Returns one result per input, in order: {"index", "id", "emotion"} or {"index", "error"}.
+    """
+    if PROFILE != "full":
+        raise HTTPException(status_code=503, detail={"error": "Memories API is available only in FULL profile."})
+    if not request.contents:
+        raise HTTPException(status_code=400, detail={"error": "contents must not be empty"})
+    if len(request.contents) > BULK_MAX_ITEMS:
+        raise HTTPException(status_code=413, detail={"error": f"at most {BULK_MAX_ITEMS} contents per request"})
+
+    engine = await run_in_threadpool(_get_engine)  # first call may build the model
+    if engine is None:
+        raise HTTPException(
+            status_code=503,
+            detail={
+                "error": "Emotion engine unavailable",
+                "hint": "Install torch/transformers and resolve DLL/runtime issues.",
+                "engine_init_error": str(_engine_error()) if _engine_error() else None,
+            },
+        )
+    try:
+        collection = get_memory_collection()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"DB insert failed: {e}")
+
+    results: List[dict] = [{"index": i} for i in range(len(request.contents))]
+    valid: List[int] = []
+    for i, raw in enumerate(request.contents):
+        if (raw or "").strip():
+            valid.append(i)
+        else:
+            results[i]["error"] = "Content cannot be empty."
+
+    audit: List[tuple] = []
+    for start in range(0, len(valid), BULK_CHUNK):
+        idx = valid[start:start + BULK_CHUNK]
+        texts = [request.contents[i].strip() for i in idx]
+        try:
+            essences: List[EmotionEssence] = await run_inference(engine.extract_batch, texts, DEFAULT_BATCH_SIZE)
+        except InferenceBusy:
+            for i in idx:
+                results[i]["error"] = "Inference queue is full, retry shortly."
+            continue
+
+        docs: List[dict] = []
+        pending: List[tuple] = []  # (input index, audit record), aligned with docs
+        now = datetime.utcnow()
+        for i, text, essence in zip(idx, texts, essences):
+            if essence.type == "error":
+                results[i]["error"] = "Emotion model failed on this content."
+                continue
+            entry = MemoryEntry(id=str(uuid4()), content=text, timestamp=now, detected_emotion=essence.type)
+            docs.append(entry.dict())
+            pending.append((i, (text, essence.type, essence.value, essence.element)))
+        if not docs:
+            continue
+
+        failed: dict = {}
+        try:
+            await collection.insert_many(docs, ordered=False)
+        except BulkWriteError as e:
+            # unordered: every other document of the chunk was still written
+            failed = {err["index"]: err.get("errmsg", "write error") for err in e.details.get("writeErrors", [])}
+        except Exception as e:
+            failed = {k: str(e) for k in range(len(docs))}
+
+        for k, (doc, (i, record)) in enumerate(zip(docs, pending)):
+            if k in failed:
+                results[i]["error"] = f"DB insert failed: {failed[k]}"
+            else:
+                results[i].update(id=doc["id"], emotion=doc["detected_emotion"])
+                audit.append(record)
+        get_planet_window().add_many(doc for k, doc in enumerate(docs) if k not in failed)
+
+    try:
+        log_emotions_to_file(audit, AUDIT_LOG_PATH)
+    except Exception:
+        pass  # logging must not break API
+
+    created = len(audit)
+    return {"count": len(results), "created": created, "failed": len(results) - created, "results": results}
+
+
+@router.get("/memories/", name="list_memories")
+async def get_memories(
+    limit: int = Query(PAGE_DEFAULT, ge=1, le=PAGE_MAX),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor value from the previous page"),
+    emotion: Optional[str] = Query(None, description="final emotion (manual_override, else detected)"),
+    since: Optional[datetime] = Query(None, description="timestamp >= since"),
+    until: Optional[datetime] = Query(None, description="timestamp < until"),
+    is_private: Optional[bool] = None,
+    fields: Optional[str] = Query(None, description="comma-separated MemoryEntry fields; id and timestamp always included"),
+):
+    """
+    List memories newest first (FULL only), one page at a time.
+    Keyset pagination on (timestamp, id): pass the `X-Next-Cursor` response header back as
+    `cursor` for the next page; the header is absent on the last page.
+    """
     if PROFILE != "full":
         raise HTTPException(status_code=503, detail={"error": "Memories API is available only in FULL profile."})
 
+    canon = None
+    if emotion is not None:
+        canon = canonical_emotion(emotion)
+        if canon is None:
+            raise HTTPException(status_code=400, detail={"error": f"Unknown emotion '{emotion}'."})
+    try:
+        after = decode_cursor(cursor) if cursor else None
+        field_list = parse_fields(fields)
+        proj = projection(field_list)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail={"error": str(e)})
+
+    query = memory_filter(emotion=canon, since=since, until=until, is_private=is_private, after=after)
+    try:
+        collection = get_memory_collection()
+        docs = await storage_breaker().call(
+            lambda: collection.find(query, proj).sort(LIST_SORT).limit(limit + 1).to_list(length=limit + 1)
+        )
+    except CircuitOpen as e:
+        raise HTTPException(
+            status_code=503,
+            detail={"error": "Storage unavailable, retry shortly."},
+            headers={"Retry-After": str(max(1, int(e.retry_after_s + 0.999)))},
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"DB read failed: {e}")
+
+    headers = {}
+    if len(docs) > limit:
+        docs = docs[:limit]
+        last = docs[-1]
+        headers["X-Next-Cursor"] = encode_cursor(last["timestamp"], last["id"])
+
+    # Plain dicts: no per-document model validation on the read path
+    out = [shape_doc(d, full=field_list is None) for d in docs]
+    return JSONResponse(jsonable_encoder(out), headers=headers)
+
+
+@router.get("/memories/export", name="export_memories")
+async def export_memories(
+    gzip: bool = Query(False, description="gzip the stream (memories.ndjson.gz)"),
+    after_timestamp: Optional[datetime] = Query(None, description="resume checkpoint: timestamp of the last row received"),
+    after_id: str = Query("", description="resume checkpoint: id of the last row received"),
+    batch_size: int = Query(EXPORT_BATCH_SIZE, ge=1, le=10000),
+):
+    """
+    Stream the whole collection as NDJSON, oldest first (FULL only).
+    Rows are the stored documents; resume an interrupted export with the last row's
+    `timestamp` / `id` as `after_timestamp` / `after_id`.
+    """
+    if PROFILE != "full":
+        raise HTTPException(status_code=503, detail={"error": "Memories API is available only in FULL profile."})
     try:
         collection = get_memory_collection()
-        cursor = collection.find({})
-        docs = await cursor.to_list(length=1000)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"DB read failed: {e}")
 
-    out: List[MemoryEntry] = []
-    for d in docs:
-        d.pop("_id", None)
-        out.append(MemoryEntry(**d))
-    return out
+    after = (after_timestamp, after_id) if after_timestamp is not None else None
+    body = iter_export(collection, after=after, batch_size=batch_size)
+    if gzip:
+        return StreamingResponse(
+            gzip_chunks(body),
+            media_type="application/gzip",
+            headers={"Content-Disposition": 'attachment; filename="memories.ndjson.gz"'},
+        )
+    return StreamingResponse(body, media_type="application/x-ndjson")
 
 
 @router.patch("/memories/{memory_id}", response_model=MemoryEntry, name="update_memory")
@@ -160,6 +334,7 @@ async def update_memory(memory_id: str, update: MemoryUpdateRequest) -> MemoryEn
 
     if not doc:
         raise HTTPException(status_code=404, detail="Memory not found.")
+    get_planet_window().update(doc)
 
     if update.manual_override:
         try:
@@ -167,7 +342,7 @@ async def update_memory(memory_id: str, update: MemoryUpdateRequest) -> MemoryEn
                 text=f"[override] {memory_id}",
                 label=update.manual_override,
                 score=0.0,
-                path=BASE_DIR,
+                path=AUDIT_LOG_PATH,
                 element="(manual override)",
             )
         except Exception:
@@ -185,6 +360,8 @@ async def delete_memory(memory_id: str) -> dict:
     try:
         collection = get_memory_collection()
         res = await collection.delete_one({"id": memory_id})
-        return {"ok": True, "deleted": int(res.deleted_count)}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"DB delete failed: {e}")
+    if res.deleted_count:
+        get_planet_window().remove(memory_id)
+    return {"ok": True, "deleted": int(res.deleted_count)}
@@ -1,18 +1,33 @@
 from __future__ import annotations
 
 import os
+import json
+import asyncio
+import time
+import hashlib
+from dataclasses import dataclass
 from datetime import datetime, timezone, timedelta
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Tuple
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Header, HTTPException, Request, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
 
-from cloudtail_backend.database.mongodb import get_memory_collection
-from cloudtail_backend.models.memory import MemoryEntry
+from cloudtail_backend.database.memory_queries import planet_status_pipeline
+from cloudtail_backend.database.mongodb import get_memory_collection, storage_breaker
+from cloudtail_backend.engine.planet_hub import HEARTBEAT_FRAME, HEARTBEAT_S, HubFull, format_event, get_planet_hub
+from cloudtail_backend.engine.planet_window import get_planet_window
 from cloudtail_backend.models.planet import PlanetState  # expects fields below
+from cloudtail_backend.utils.emotion import get_final_emotion
 
 router = APIRouter(tags=["planet"])
 PROFILE = os.getenv("CLOUDTAIL_PROFILE", "presentation").lower()
 
+# Cache-Control max-age for status/preview; the presentation preview never changes
+STATUS_MAX_AGE_S = int(os.getenv("CLOUDTAIL_PLANET_MAX_AGE_S", "2" if PROFILE == "full" else "60"))
+# Window not seeded yet: reuse an aggregated status this long unless a write lands first
+COLD_STATUS_TTL_S = float(os.getenv("CLOUDTAIL_PLANET_COLD_TTL_S", "5"))
+
 # emotion -> planet & theming
 EMOTION_TO_PLANET = {
     "gratitude": "ambered",
@@ -41,77 +56,225 @@ def _default_status() -> PlanetState:
     )
 
 
-async def _recent_memories(hours: int = 24) -> List[MemoryEntry]:
-    """Fetch recent memories (FULL only)."""
+async def _aggregate_status(hours: int = 24, since: Optional[datetime] = None) -> Tuple[Dict[str, int], List[str]]:
+    """
+    (counts per final emotion, newest-first history) of public memories since `since`
+    (FULL only), computed by Mongo: only emotion fields cross the wire.
+    """
     coll = get_memory_collection()
-    since = datetime.utcnow() - timedelta(hours=hours)
-    cursor = coll.find({"timestamp": {"$gte": since}}).sort("timestamp", -1)
-    docs: List[Dict[str, Any]] = await cursor.to_list(length=200)
-    out: List[MemoryEntry] = []
-    for d in docs:
-        d.pop("_id", None)
-        try:
-            out.append(MemoryEntry(**d))
-        except Exception:
-            continue
-    return out
+    since = since or datetime.utcnow() - timedelta(hours=hours)
+    rows = await coll.aggregate(planet_status_pipeline(since)).to_list(length=1)
+    facets = rows[0] if rows else {"counts": [], "history": []}
+    counts: Dict[str, int] = {}
+    for row in facets["counts"]:
+        emo = get_final_emotion({"detected_emotion": row["_id"].get("detected"), "manual_override": row["_id"].get("override")})
+        counts[emo] = counts.get(emo, 0) + row["n"]
+    return counts, [get_final_emotion(d) for d in facets["history"]]
 
 
-def _dominant(emotions: List[str]) -> str:
-    if not emotions:
+def _dominant(counts: Dict[str, int]) -> str:
+    if not counts:
         return "gratitude"
-    counts: Dict[str, int] = {}
-    for e in emotions:
-        counts[e] = counts.get(e, 0) + 1
     # pick max with PLANET order tie-breaker
     ordered = sorted(counts.items(), key=lambda kv: (-kv[1], ["gratitude","guilt","anger","nostalgia"].index(kv[0]) if kv[0] in ["gratitude","guilt","anger","nostalgia"] else 99))
     return ordered[0][0]
 
 
+def _planet_state(dom: str, emo_hist: List[str]) -> PlanetState:
+    planet = EMOTION_TO_PLANET.get(dom, "ambered")
+    theme = PLANET_THEME[planet]
+
+    return PlanetState(
+        state_tag=dom,
+        dominant_emotion=dom,
+        emotion_history=emo_hist[:12],  # short history
+        color_palette=theme["palette"],
+        visual_theme=theme["visual_theme"],
+        last_updated=datetime.now(timezone.utc).isoformat(),
+    )
+
+
+# ---------- Status cache (ETag / conditional GET) ----------
+
+@dataclass
+class _CachedStatus:
+    key: Any          # what the state was built from (window version); None = never changes
+    etag: str
+    body: bytes       # serialized PlanetState, last_updated = when the content last changed
+    built: float      # time.monotonic()
+
+
+_status_cache: Dict[str, _CachedStatus] = {}
+
+
+def _state_etag(state: PlanetState) -> str:
+    """Weak validator over the state content (not last_updated): equal across workers for equal states."""
+    payload = json.dumps(state.dict(exclude={"last_updated"}), sort_keys=True, separators=(",", ":"))
+    return 'W/"' + hashlib.sha1(payload.encode("utf-8")).hexdigest()[:16] + '"'
+
+
+def _remember(name: str, key: Any, state: PlanetState) -> _CachedStatus:
+    etag = _state_etag(state)
+    prev = _status_cache.get(name)
+    if prev is not None and prev.etag == etag:
+        # content unchanged: keep the body, so last_updated and the bytes stay stable
+        prev.key, prev.built = key, time.monotonic()
+        return prev
+    body = json.dumps(jsonable_encoder(state), separators=(",", ":")).encode("utf-8")
+    entry = _status_cache[name] = _CachedStatus(key, etag, body, time.monotonic())
+    return entry
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    bare = etag[2:] if etag.startswith("W/") else etag
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        if (tag[2:] if tag.startswith("W/") else tag) == bare:
+            return True
+    return False
+
+
+def _respond(entry: _CachedStatus, request: Request) -> Response:
+    headers = {"ETag": entry.etag, "Cache-Control": f"max-age={STATUS_MAX_AGE_S}"}
+    if _etag_matches(request.headers.get("if-none-match"), entry.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(entry.body, media_type="application/json", headers=headers)
+
+
+async def _current_status() -> Optional[_CachedStatus]:
+    """
+    Cached FULL-profile status, rebuilt only when the window version moved (memory writes,
+    expiry, resync) or, before the window is seeded, when the cold TTL ran out.
+    If Mongo cannot be read, the last built status (may be stale), or None.
+    """
+    window = get_planet_window()
+    cached = _status_cache.get("status")
+    if window.ready:
+        # Seeded rolling window (engine/planet_window.py): no DB round-trip
+        snap = window.snapshot()
+        key = ("window", snap.version)
+        if cached is not None and cached.key == key:
+            return cached
+        state = _planet_state(_dominant(snap.counts), snap.history) if snap.total else _default_status()
+        return _remember("status", key, state)
+
+    key = ("cold", window.version)
+    if cached is not None and cached.key == key and time.monotonic() - cached.built < COLD_STATUS_TTL_S:
+        return cached
+    try:
+        # Breaker open (Mongo failing): no 3 s server-selection wait per request
+        counts, emo_hist = await storage_breaker().call(lambda: _aggregate_status(hours=24))
+    except Exception:
+        return cached  # last good status if any, else None → default preview
+    state = _planet_state(_dominant(counts), emo_hist) if counts else _default_status()
+    return _remember("status", key, state)
+
+
 @router.get("/", name="get_planet_preview")
-async def get_planet_preview():
+async def get_planet_preview(request: Request):
     """
     Presentation-friendly preview.
     In FULL profile you can still call this to get a stable non-DB example.
     """
-    st = _default_status()
-    return st
+    entry = _status_cache.get("preview") or _remember("preview", None, _default_status())
+    return _respond(entry, request)
 
 
 @router.get("/status", name="get_planet_status")
-async def get_planet_status():
+async def get_planet_status(request: Request):
     """
     Planet live status.
-    - FULL: derive from recent Mongo memories.
+    - FULL: rolling 24h window kept in process (seeded from Mongo at startup);
+      a Mongo aggregation until it is seeded. Private memories are left out and
+      manual_override wins over detected_emotion.
     - Presentation: fall back to deterministic preview (unless you keep temp demo on).
+    Sends an ETag; `If-None-Match` with the current one gets an empty 304.
     """
     if PROFILE != "full":
-        return _default_status()
+        return await get_planet_preview(request)
 
-    try:
-        recents = await _recent_memories(hours=24)
-    except Exception as e:
-        # DB issue → safe preview
+    entry = await _current_status()
+    if entry is None:
+        # DB issue → safe preview (uncached)
         return _default_status()
+    return _respond(entry, request)
 
-    if not recents:
-        return _default_status()
 
-    emo_hist = [m.detected_emotion for m in recents if m.detected_emotion]
-    dom = _dominant(emo_hist)
-    planet = EMOTION_TO_PLANET.get(dom, "ambered")
-    theme = PLANET_THEME[planet]
+async def _stream_source() -> Optional[Tuple[str, Dict[str, Any]]]:
+    if PROFILE != "full":
+        entry = _status_cache.get("preview") or _remember("preview", None, _default_status())
+    else:
+        entry = await _current_status()
+    return (entry.etag, json.loads(entry.body)) if entry is not None else None
 
-    return PlanetState(
-        state_tag=dom,
-        dominant_emotion=dom,
-        emotion_history=emo_hist[:12],  # short history
-        color_palette=theme["palette"],
-        visual_theme=theme["visual_theme"],
-        last_updated=datetime.now(timezone.utc).isoformat(),
+
+@router.get("/stream", name="stream_planet_status")
+async def stream_planet_status(request: Request, last_event_id: Optional[str] = Header(None)):
+    """
+    Server-Sent Events: `state` (full PlanetState) on connect, then `delta` events
+    (changed fields only) whenever the dominant emotion or history changes, and a
+    `: ping` comment every HEARTBEAT_S while idle. Reconnects with `Last-Event-ID`
+    replay the deltas missed (or get one `state` if they are no longer buffered).
+    """
+    hub = get_planet_hub(_stream_source)
+    hub.start()
+    if hub.state is None:
+        await hub.refresh()
+    try:
+        sub = hub.subscribe()
+    except HubFull as e:
+        raise HTTPException(status_code=503, detail={"error": str(e)})
+    backlog = hub.catch_up(last_event_id or request.query_params.get("last_event_id"))
+
+    async def events():
+        try:
+            for event in backlog:
+                yield format_event(event)
+            while True:
+                try:
+                    event = await asyncio.wait_for(sub.queue.get(), timeout=HEARTBEAT_S)
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        break
+                    yield HEARTBEAT_FRAME
+                    continue
+                yield format_event(event)
+        finally:
+            hub.unsubscribe(sub)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
     )
 
 
+async def window_consistency() -> Dict[str, Any]:
+    """
+    Compare the rolling window with the Mongo aggregation over the same span.
+    """
+    window = get_planet_window()
+    since = window.since()
+    snap = window.snapshot()
+    counts, emo_hist = await _aggregate_status(since=since)
+    checks = {
+        "history": snap.history == emo_hist,
+        "dominant": _dominant(snap.counts) == _dominant(counts),
+        "counts": snap.counts == counts,
+    }
+    return {
+        "consistent": all(checks.values()),
+        "checks": checks,
+        "since": since.isoformat(),
+        "window": {"counts": snap.counts, "history": snap.history, "total": snap.total, "version": snap.version},
+        "recompute": {"counts": counts, "history": emo_hist, "total": sum(counts.values())},
+    }
+
+
 @router.post("/debug/seed_memories", name="seed_test_memories")
 async def seed_test_memories():
     """
@@ -133,6 +296,7 @@ async def seed_test_memories():
     for d in docs:
         try:
             await coll.insert_one(d)
+            get_planet_window().add(d)
             inserted += 1
         except Exception:
             pass
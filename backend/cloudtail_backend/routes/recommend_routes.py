@@ -1,17 +1,28 @@
 from __future__ import annotations
 
 import os
-from typing import Optional
+import json
+import asyncio
+from typing import Any, AsyncIterator, Dict, List, Optional, Set
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, WebSocket, WebSocketDisconnect
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 
 # shape hint only
 from cloudtail_backend.models.memory import EmotionEssence
+from cloudtail_backend.engine.batching import get_batcher
+from cloudtail_backend.engine.emotion_model import DEFAULT_BATCH_SIZE
+from cloudtail_backend.engine.executor import InferenceBusy, run_inference
+from cloudtail_backend.engine.registry import get_engine_entry
 
 router = APIRouter(tags=["recommend"])
 PROFILE = os.getenv("CLOUDTAIL_PROFILE", "presentation").lower()
 ALLOW_FALLBACK = os.getenv("ALLOW_FALLBACK", "0") == "1"
+BATCH_MAX_ITEMS = int(os.getenv("CLOUDTAIL_RECOMMEND_BATCH_MAX", "1000"))
+# /recommend/ws: requests one session may have in flight before new ones are refused
+WS_MAX_IN_FLIGHT = int(os.getenv("CLOUDTAIL_RECOMMEND_WS_MAX_IN_FLIGHT", "64"))
 
 # ---------- Planet mapping (keep in sync with frontend) ----------
 PLANET_ORDER = ["ambered", "rippled", "spiral", "woven"]
@@ -32,80 +43,53 @@ EMOTION_TO_PLANET = {
 }
 
 # ---------- Lazy engine ----------
-_engine = None
-_engine_error: Optional[Exception] = None
-
 def _get_engine():
-    """Import and construct EmotionAlchemyEngine on first use."""
-    global _engine, _engine_error
-    if _engine is not None or _engine_error is not None:
-        return _engine
-    try:
-        from cloudtail_backend.engine.emotion_engine import EmotionAlchemyEngine
-        _engine = EmotionAlchemyEngine()
-    except Exception as e:
-        _engine_error = e
-        _engine = None
-    return _engine
+    """Shared EmotionAlchemyEngine from the process-wide registry (built on first use)."""
+    return get_engine_entry().engine
 
 
-# ---------- Schemas ----------
-class RecommendRequest(BaseModel):
-    content: str
+def _engine_error() -> Optional[Exception]:
+    return get_engine_entry().error
 
 
-# ---------- Endpoint ----------
-@router.post("/recommend", name="recommend")
-def recommend(req: RecommendRequest):
-    """
-    Recommend a planet based on the text's emotion.
+def _require_engine():
+    engine = _get_engine()
+    if engine is None:
+        raise HTTPException(
+            status_code=503,
+            detail={
+                "error": "Emotion engine unavailable",
+                "hint": "Install torch/transformers and resolve DLL/runtime issues",
+                "engine_init_error": str(_engine_error()) if _engine_error() else None,
+            },
+        )
+    return engine
 
-    FULL: must use EmotionAlchemyEngine (no fallback).
-    PRESENTATION: if ALLOW_FALLBACK=1, use a deterministic mapping.
-    """
-    text = (req.content or "").strip()
-    if not text:
-        raise HTTPException(status_code=400, detail="content is required")
 
-    # FULL profile: real engine path
-    if PROFILE == "full":
-        engine = _get_engine()
-        if engine is None:
-            raise HTTPException(
-                status_code=503,
-                detail={
-                    "error": "Emotion engine unavailable",
-                    "hint": "Install torch/transformers and resolve DLL/runtime issues",
-                    "engine_init_error": str(_engine_error) if _engine_error else None,
-                },
-            )
-
-        # use extract_emotion (NOT infer)
-        ess: EmotionEssence = engine.extract_emotion(text)
-        emotion = ess.type
-        key = EMOTION_TO_PLANET.get(emotion, "ambered")
-        idx = PLANET_ORDER.index(key)
-
-        return {
-            "planet_index": idx,
-            "planet_key": key,
-            "display_name": DISPLAY_NAMES[key],
-            "emotion": emotion,
-            "confidence": round(float(ess.value), 3),
-            "reason": f"Engine -> {key}",
-            "essence": {
-                "internal": emotion,
-                "element": getattr(ess, "element", None),
-                "tags": list(getattr(ess, "tags", []) or []),
-                "raw_value": float(getattr(ess, "value", 0.0)),
-            },
+# ---------- Response shapes ----------
+def _engine_payload(ess: EmotionEssence) -> dict:
+    emotion = ess.type
+    key = EMOTION_TO_PLANET.get(emotion, "ambered")
+    idx = PLANET_ORDER.index(key)
 
-        }
+    return {
+        "planet_index": idx,
+        "planet_key": key,
+        "display_name": DISPLAY_NAMES[key],
+        "emotion": emotion,
+        "confidence": round(float(ess.value), 3),
+        "reason": f"Engine -> {key}",
+        "essence": {
+            "internal": emotion,
+            "element": getattr(ess, "element", None),
+            "tags": list(getattr(ess, "tags", []) or []),
+            "raw_value": float(getattr(ess, "value", 0.0)),
+        },
+
+    }
 
-    # Presentation (demo) path
-    if not ALLOW_FALLBACK:
-        raise HTTPException(status_code=503, detail="Presentation mode without fallback is disabled")
 
+def _fallback_payload(text: str) -> dict:
     # toy heuristic: contains 'sunset' -> nostalgia, else gratitude
     emo = "nostalgia" if "sunset" in text.lower() else "gratitude"
     key = EMOTION_TO_PLANET[emo]
@@ -125,3 +109,175 @@ def recommend(req: RecommendRequest):
             "raw_value": 1.0,
         },
     }
+
+
+# ---------- Schemas ----------
+class RecommendRequest(BaseModel):
+    content: str
+
+
+class RecommendBatchRequest(BaseModel):
+    contents: List[str]
+    stream: bool = False                  # NDJSON, one line per text, flushed per inference batch
+    batch_size: Optional[int] = None      # texts per forward pass (default: engine batch size)
+
+
+# ---------- Endpoint ----------
+@router.post("/recommend", name="recommend")
+def recommend(req: RecommendRequest):
+    """
+    Recommend a planet based on the text's emotion.
+
+    FULL: must use EmotionAlchemyEngine (no fallback).
+    PRESENTATION: if ALLOW_FALLBACK=1, use a deterministic mapping.
+    """
+    text = (req.content or "").strip()
+    if not text:
+        raise HTTPException(status_code=400, detail="content is required")
+
+    # FULL profile: real engine path
+    if PROFILE == "full":
+        engine = _require_engine()
+        # concurrent callers share one forward pass via the micro-batcher
+        ess: EmotionEssence = get_batcher(engine).extract_emotion(text)
+        return _engine_payload(ess)
+
+    # Presentation (demo) path
+    if not ALLOW_FALLBACK:
+        raise HTTPException(status_code=503, detail="Presentation mode without fallback is disabled")
+    return _fallback_payload(text)
+
+
+@router.post("/recommend/batch", name="recommend_batch")
+async def recommend_batch(req: RecommendBatchRequest):
+    """
+    Recommend planets for many texts in one request (batched inference).
+
+    Each result has the same shape as POST /recommend plus its input `index`;
+    blank texts yield {"index", "error"}. With `stream=true` the response is
+    NDJSON in input order, flushed as each inference batch finishes.
+    """
+    if not req.contents:
+        raise HTTPException(status_code=400, detail="contents must be a non-empty list")
+    if len(req.contents) > BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=413, detail=f"at most {BATCH_MAX_ITEMS} contents per request")
+
+    if PROFILE == "full":
+        engine = await run_in_threadpool(_require_engine)  # first call may build the model
+    elif ALLOW_FALLBACK:
+        engine = None
+    else:
+        raise HTTPException(status_code=503, detail="Presentation mode without fallback is disabled")
+
+    texts = [(c or "").strip() for c in req.contents]
+    batch_size = max(1, req.batch_size or DEFAULT_BATCH_SIZE)
+
+    async def _chunk_results(start: int, size: int) -> List[dict]:
+        chunk = texts[start:start + size]
+        valid = [i for i, t in enumerate(chunk) if t]
+        payloads: List[dict] = [{"index": start + i, "error": "content is required"} for i in range(len(chunk))]
+        if not valid:
+            return payloads
+        if engine is None:
+            for i in valid:
+                payloads[i] = {"index": start + i, **_fallback_payload(chunk[i])}
+            return payloads
+        essences = await run_inference(engine.extract_batch, [chunk[i] for i in valid], batch_size)
+        for i, ess in zip(valid, essences):
+            payloads[i] = {"index": start + i, **_engine_payload(ess)}
+        return payloads
+
+    if not req.stream:
+        # one engine call: texts are length-sorted across the whole request before padding
+        try:
+            results = await _chunk_results(0, len(texts))
+        except InferenceBusy:
+            raise HTTPException(status_code=503, detail={"error": "Inference queue is full, retry shortly."})
+        return {"count": len(results), "results": results}
+
+    async def _ndjson() -> AsyncIterator[bytes]:
+        for start in range(0, len(texts), batch_size):
+            try:
+                rows = await _chunk_results(start, batch_size)
+            except InferenceBusy:
+                end = min(start + batch_size, len(texts))
+                rows = [{"index": i, "error": "inference_queue_full"} for i in range(start, end)]
+            yield "".join(json.dumps(r, ensure_ascii=False) + "\n" for r in rows).encode("utf-8")
+
+    return StreamingResponse(_ndjson(), media_type="application/x-ndjson")
+
+
+@router.websocket("/recommend/ws")
+async def recommend_ws(websocket: WebSocket):
+    """
+    One session, many recommend calls. Send {"id": <any>, "content": "..."}; each reply is
+    {"id", "result": <POST /recommend body>} or {"id", "status", "error"}, sent as soon as
+    its inference finishes (possibly out of order). Engine calls go through the shared
+    micro-batcher, so texts from all sessions and HTTP callers share forward passes.
+    """
+    await websocket.accept()
+    if PROFILE == "full":
+        await run_in_threadpool(_get_engine)  # the first call may load the model
+
+    send_lock = asyncio.Lock()
+    in_flight: Set["asyncio.Task[None]"] = set()
+
+    async def _send(message: Dict[str, Any]) -> None:
+        async with send_lock:
+            await websocket.send_text(json.dumps(message, ensure_ascii=False))
+
+    async def _reply(corr: Any, text: str) -> Dict[str, Any]:
+        if PROFILE != "full":
+            if not ALLOW_FALLBACK:
+                return {"id": corr, "status": 503, "error": "Presentation mode without fallback is disabled"}
+            return {"id": corr, "result": _fallback_payload(text)}
+        # the config mtime poll / hot reload does file I/O: keep it off the event loop
+        entry = await run_in_threadpool(get_engine_entry)
+        if entry.engine is None:
+            return {
+                "id": corr, "status": 503, "error": "Emotion engine unavailable",
+                "engine_init_error": str(entry.error) if entry.error else None,
+            }
+        try:
+            fut = get_batcher(entry.engine).submit(text)
+        except RuntimeError as e:  # batcher closed (shutdown / engine swap)
+            return {"id": corr, "status": 503, "error": f"inference unavailable: {e}"}
+        ess: EmotionEssence = await asyncio.wrap_future(fut)
+        return {"id": corr, "result": _engine_payload(ess)}
+
+    async def _answer(corr: Any, text: str) -> None:
+        try:
+            reply = await _reply(corr, text)
+        except Exception as e:
+            reply = {"id": corr, "status": 500, "error": f"inference failed: {e}"}
+        try:
+            await _send(reply)
+        except (WebSocketDisconnect, RuntimeError):
+            pass  # session closed while this request was in flight
+
+    try:
+        while True:
+            raw = await websocket.receive_text()
+            try:
+                msg = json.loads(raw)
+                if not isinstance(msg, dict):
+                    raise ValueError("expected a JSON object")
+            except ValueError as e:
+                await _send({"id": None, "status": 400, "error": f"invalid message: {e}"})
+                continue
+            corr = msg.get("id")
+            text = (msg.get("content") or "").strip() if isinstance(msg.get("content"), str) else ""
+            if not text:
+                await _send({"id": corr, "status": 400, "error": "content is required"})
+                continue
+            if len(in_flight) >= WS_MAX_IN_FLIGHT:
+                await _send({"id": corr, "status": 429, "error": f"at most {WS_MAX_IN_FLIGHT} requests in flight per session"})
+                continue
+            task = asyncio.create_task(_answer(corr, text))
+            in_flight.add(task)
+            task.add_done_callback(in_flight.discard)
+    except WebSocketDisconnect:
+        pass
+    finally:
+        for task in in_flight:
+            task.cancel()
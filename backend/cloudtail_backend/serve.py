@@ -0,0 +1,264 @@
+"""
+Production entry point: `python -m cloudtail_backend serve`.
+
+Plans the process/thread layout from the core count, optionally loads the
+emotion model once in the parent and forks workers that share the weight pages
+copy-on-write, then runs one uvicorn server per worker on a shared socket.
+`--reload` style development keeps using run_full.bat / run_presentation.bat.
+"""
+from __future__ import annotations
+
+import argparse
+import gc
+import os
+import signal
+import socket
+import sys
+import time
+import traceback
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+CAN_FORK = hasattr(os, "fork")
+
+# Worker restarts: a worker that dies within MIN_UPTIME_S counts as a failed start and is
+# re-forked after an exponential backoff; MAX_FAILED_STARTS in a row stop the server.
+MIN_UPTIME_S = float(os.getenv("CLOUDTAIL_WORKER_MIN_UPTIME_S", "10"))
+RESTART_BACKOFF_S = float(os.getenv("CLOUDTAIL_WORKER_BACKOFF_S", "1"))
+RESTART_BACKOFF_MAX_S = float(os.getenv("CLOUDTAIL_WORKER_BACKOFF_MAX_S", "30"))
+MAX_FAILED_STARTS = int(os.getenv("CLOUDTAIL_WORKER_MAX_FAILED_STARTS", "5"))
+
+
+@dataclass
+class Layout:
+    profile: str
+    cores: int
+    workers: int
+    intra_threads: int      # torch.set_num_threads per worker
+    interop_threads: int    # torch.set_num_interop_threads per worker
+    preload: bool           # model loaded in the parent before fork
+    fork: bool
+
+    def describe(self) -> str:
+        return (
+            f"profile={self.profile} cores={self.cores} workers={self.workers} "
+            f"torch_intra={self.intra_threads} torch_interop={self.interop_threads} "
+            f"preload={'yes' if self.preload else 'no'} fork={'yes' if self.fork else 'no'}"
+        )
+
+
+def plan_layout(
+    profile: str,
+    workers: Optional[int] = None,
+    threads: Optional[int] = None,
+    interop_threads: int = 1,
+    preload: Optional[bool] = None,
+    cores: Optional[int] = None,
+) -> Layout:
+    """
+    Default: one worker per 4 cores (at least 1) and the cores split evenly between
+    workers for torch intra-op threads, so workers × threads never exceeds the core count.
+    """
+    cores = max(1, cores or os.cpu_count() or 1)
+    if workers is None:
+        workers = max(1, cores // 4)
+    workers = max(1, workers)
+    if threads is None:
+        threads = max(1, cores // workers)
+    fork = CAN_FORK and workers > 1
+    if preload is None:
+        preload = profile == "full"
+    return Layout(profile, cores, workers, max(1, threads), max(1, interop_threads), bool(preload), fork)
+
+
+def _pin_thread_env(threads: int) -> None:
+    # Must happen before torch is imported anywhere in this process.
+    for var in ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS"):
+        os.environ[var] = str(threads)
+
+
+def _apply_torch_threads(intra: int, interop: Optional[int]) -> None:
+    try:
+        import torch
+    except ImportError:
+        return
+    torch.set_num_threads(intra)
+    if interop is not None:
+        try:
+            torch.set_num_interop_threads(interop)
+        except RuntimeError:
+            pass  # already fixed for this process (inter-op pool started)
+
+
+def _preload_engine() -> Dict[str, object]:
+    from cloudtail_backend.engine.registry import get_engine_entry
+
+    entry = get_engine_entry()
+    return entry.describe()
+
+
+def _release_parent_pools() -> None:
+    """
+    Threads do not survive fork: a batcher or inference executor created in the parent
+    (e.g. by a parity check during preload) would be a dead copy in every worker.
+    Drop them so each worker starts its own on first use.
+    """
+    from cloudtail_backend.engine.batching import shutdown_batcher
+    from cloudtail_backend.engine.executor import shutdown_inference_executor
+
+    shutdown_batcher()
+    shutdown_inference_executor()
+
+
+def _bind(host: str, port: int) -> socket.socket:
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    return sock
+
+
+def _serve_in_process(app, sock: socket.socket, log_level: str) -> None:
+    import uvicorn
+
+    config = uvicorn.Config(app, log_level=log_level, timeout_keep_alive=5)
+    uvicorn.Server(config).run(sockets=[sock])
+
+
+def _spawn(app, sock: socket.socket, layout: Layout, log_level: str) -> int:
+    pid = os.fork()
+    if pid == 0:
+        code = 1  # anything escaping the server (startup crash) is a failure for the parent
+        try:
+            _apply_torch_threads(layout.intra_threads, None)
+            _serve_in_process(app, sock, log_level)
+            code = 0
+        except BaseException:
+            traceback.print_exc()
+        finally:
+            os._exit(code)
+    return pid
+
+
+def run(args: argparse.Namespace) -> None:
+    profile = os.getenv("CLOUDTAIL_PROFILE", "presentation").lower()
+    layout = plan_layout(
+        profile,
+        workers=args.workers if args.workers is not None else _env_int("CLOUDTAIL_WORKERS"),
+        threads=args.threads if args.threads is not None else _env_int("CLOUDTAIL_TORCH_THREADS"),
+        interop_threads=args.interop_threads,
+        preload=args.preload,
+    )
+    host = args.host or os.getenv("HOST", "127.0.0.1")
+    port = args.port or int(os.getenv("PORT", "8010" if profile == "full" else "8020"))
+
+    _pin_thread_env(layout.intra_threads)
+    # Parent keeps torch single-threaded so no OpenMP pool exists at fork time.
+    _apply_torch_threads(1 if layout.fork else layout.intra_threads, layout.interop_threads)
+
+    print(f"[Cloudtail] serve {host}:{port}  {layout.describe()}")
+    if layout.workers > 1 and not CAN_FORK:
+        print("[warn] os.fork unavailable on this platform: serving with a single worker")
+        layout.workers = 1
+
+    from cloudtail_backend.main import app
+
+    if layout.preload:
+        t0 = time.perf_counter()
+        info = _preload_engine()
+        print(f"[ok] model preloaded in {time.perf_counter() - t0:.2f}s: "
+              f"{info.get('model_name')}@{info.get('backend')} bytes={info.get('model_bytes')}"
+              + (f" error={info['error']}" if info.get("error") else ""))
+
+    sock = _bind(host, port)
+    if layout.workers == 1:
+        _serve_in_process(app, sock, args.log_level)
+        return
+
+    _release_parent_pools()
+
+    # Freeze everything allocated so far (app, model) out of the GC's reach:
+    # collections in the workers then don't write to, and un-share, those pages.
+    gc.collect()
+    if hasattr(gc, "freeze"):
+        gc.freeze()
+
+    started: Dict[int, float] = {}
+
+    def _start_worker() -> None:
+        pid = _spawn(app, sock, layout, args.log_level)
+        started[pid] = time.monotonic()
+
+    for _ in range(layout.workers):
+        _start_worker()
+    print(f"[ok] workers started: {list(started)}")
+
+    stopping = False
+    failed_starts = 0
+
+    def _stop(signum, _frame):
+        nonlocal stopping
+        stopping = True
+        for pid in list(started):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, _stop)
+    signal.signal(signal.SIGINT, _stop)
+
+    while started:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        except InterruptedError:
+            continue
+        if pid not in started:
+            continue
+        uptime = time.monotonic() - started.pop(pid)
+        if stopping:
+            continue
+        failed_starts = failed_starts + 1 if uptime < MIN_UPTIME_S else 0
+        if failed_starts > MAX_FAILED_STARTS:
+            print(f"[error] workers keep dying at startup ({failed_starts} in a row, last status {status}); stopping")
+            _stop(signal.SIGTERM, None)
+            continue
+        delay = min(RESTART_BACKOFF_MAX_S, RESTART_BACKOFF_S * 2 ** (failed_starts - 1)) if failed_starts else 0.0
+        print(f"[warn] worker {pid} exited after {uptime:.1f}s (status {status}); restarting"
+              + (f" in {delay:.1f}s" if delay else ""))
+        deadline = time.monotonic() + delay
+        while not stopping and time.monotonic() < deadline:
+            time.sleep(min(0.2, deadline - time.monotonic()))
+        if not stopping:
+            _start_worker()
+    sock.close()
+    if failed_starts > MAX_FAILED_STARTS:
+        sys.exit(1)
+
+
+def _env_int(name: str) -> Optional[int]:
+    v = os.getenv(name)
+    return int(v) if v and v.strip() else None
+
+
+def add_arguments(ap: argparse.ArgumentParser) -> None:
+    ap.add_argument("--host", default=None, help="bind address (default: $HOST or 127.0.0.1)")
+    ap.add_argument("--port", type=int, default=None, help="port (default: $PORT, else 8010 full / 8020 presentation)")
+    ap.add_argument("--workers", type=int, default=None, help="worker processes (default: $CLOUDTAIL_WORKERS or cores // 4)")
+    ap.add_argument("--threads", type=int, default=None, help="torch intra-op threads per worker (default: cores // workers)")
+    ap.add_argument("--interop-threads", type=int, default=1, help="torch inter-op threads per worker")
+    preload = ap.add_mutually_exclusive_group()
+    preload.add_argument("--preload", dest="preload", action="store_true", default=None,
+                         help="load the model in the parent before forking (default in full profile)")
+    preload.add_argument("--no-preload", dest="preload", action="store_false")
+    ap.add_argument("--log-level", default="info")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(prog="cloudtail_backend.serve", description=__doc__)
+    add_arguments(parser)
+    run(parser.parse_args(sys.argv[1:]))
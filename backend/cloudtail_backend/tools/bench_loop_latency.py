@@ -0,0 +1,123 @@
+"""
+Event-loop latency benchmark (full profile).
+
+Measures GET /__diag/ping latency on an idle server, then again while concurrent
+POST /api/memories/ uploads are running. If inference blocks the event loop,
+the loaded p99 jumps to roughly one forward pass per queued upload. The probe is an
+`async def` route with no I/O, so it runs on the event loop itself (a plain `def`
+route such as /version would add anyio threadpool wait).
+
+Usage (server must be running with CLOUDTAIL_PROFILE=full):
+    python -m cloudtail_backend.tools.bench_loop_latency --base-url http://127.0.0.1:8010
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import statistics
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
+
+# async route without I/O, answered on the event loop: its latency is loop delay
+PROBE_PATH = "/__diag/ping"
+
+PROBE_TEXTS = [
+    "I miss you every night", "missyou!!!", "Thank you for the evenings",
+    "It still hurts sometimes", "Crying again when I saw the photo", "I still remember the sunset",
+]
+
+
+def _get(url: str, timeout: float) -> float:
+    t0 = time.perf_counter()
+    with urllib.request.urlopen(url, timeout=timeout) as r:
+        r.read()
+    return (time.perf_counter() - t0) * 1000.0
+
+
+def _post_json(url: str, body: dict, timeout: float) -> None:
+    data = json.dumps(body).encode("utf-8")
+    req = urllib.request.Request(url, data=data, headers={"Content-Type": "application/json; charset=utf-8"})
+    with urllib.request.urlopen(req, timeout=timeout) as r:
+        r.read()
+
+
+def _percentiles(samples: List[float]) -> Dict[str, float]:
+    if not samples:
+        return {"n": 0}
+    s = sorted(samples)
+    pick = lambda q: s[min(len(s) - 1, int(q * len(s)))]
+    return {
+        "n": len(s),
+        "p50_ms": round(pick(0.50), 2),
+        "p95_ms": round(pick(0.95), 2),
+        "p99_ms": round(pick(0.99), 2),
+        "max_ms": round(s[-1], 2),
+        "mean_ms": round(statistics.fmean(s), 2),
+    }
+
+
+def _probe(base: str, stop: threading.Event, interval: float, timeout: float) -> List[float]:
+    out: List[float] = []
+    while not stop.is_set():
+        try:
+            out.append(_get(f"{base}{PROBE_PATH}", timeout))
+        except Exception:
+            out.append(timeout * 1000.0)
+        time.sleep(interval)
+    return out
+
+
+def run(base: str, uploads: int, concurrency: int, interval: float, idle_seconds: float, timeout: float) -> dict:
+    # 1) idle baseline
+    stop = threading.Event()
+    timer = threading.Timer(idle_seconds, stop.set)
+    timer.start()
+    idle = _probe(base, stop, interval, timeout)
+
+    # 2) same probe while uploads run
+    stop = threading.Event()
+    samples: List[float] = []
+    prober = threading.Thread(target=lambda: samples.extend(_probe(base, stop, interval, timeout)))
+    prober.start()
+    t0 = time.perf_counter()
+    errors = 0
+    with ThreadPoolExecutor(max_workers=concurrency) as ex:
+        futs = [
+            ex.submit(_post_json, f"{base}/api/memories/", {"content": PROBE_TEXTS[i % len(PROBE_TEXTS)]}, timeout)
+            for i in range(uploads)
+        ]
+        for f in futs:
+            try:
+                f.result()
+            except Exception:
+                errors += 1
+    elapsed = time.perf_counter() - t0
+    stop.set()
+    prober.join()
+
+    return {
+        "probe": PROBE_PATH,
+        "idle": _percentiles(idle),
+        "under_upload": _percentiles(samples),
+        "uploads": {"n": uploads, "errors": errors, "concurrency": concurrency, "seconds": round(elapsed, 2)},
+    }
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--base-url", default="http://127.0.0.1:8010")
+    ap.add_argument("--uploads", type=int, default=64)
+    ap.add_argument("--concurrency", type=int, default=8)
+    ap.add_argument("--interval", type=float, default=0.01, help=f"seconds between {PROBE_PATH} probes")
+    ap.add_argument("--idle-seconds", type=float, default=3.0)
+    ap.add_argument("--timeout", type=float, default=30.0)
+    args = ap.parse_args()
+    report = run(args.base_url.rstrip("/"), args.uploads, args.concurrency, args.interval, args.idle_seconds, args.timeout)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
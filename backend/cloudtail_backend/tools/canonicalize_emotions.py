@@ -0,0 +1,78 @@
+"""
+One-off migration: rewrite stored `detected_emotion` / `manual_override` labels to the
+canonical four, exactly as utils.emotion.get_final_emotion reads them (case-insensitive,
+aliases folded, unknown labels → gratitude). Afterwards `GET /api/memories?emotion=...`
+matches every memory the planet status counts. Idempotent; an empty override is kept.
+
+Usage:
+    python -m cloudtail_backend canonicalize --dry-run   # count what would change
+    python -m cloudtail_backend canonicalize
+Needs CLOUDTAIL_MONGO_URI / CLOUDTAIL_MONGO_DB (or CLOUDTAIL_STORAGE=sqlite) like the API.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+from typing import Any, Dict, Optional
+
+CANONICAL = ["gratitude", "guilt", "nostalgia", "sadness"]
+
+# Documents with at least one non-canonical label (a missing detected_emotion reads as gratitude)
+LEGACY_FILTER = {"$or": [
+    {"detected_emotion": {"$nin": CANONICAL}},
+    {"manual_override": {"$nin": CANONICAL + [None, ""]}},
+]}
+
+
+def canonical_fields(doc: Dict[str, Any]) -> Dict[str, Any]:
+    """The $set that makes `doc`'s labels canonical (empty when they already are)."""
+    from cloudtail_backend.utils.emotion import get_final_emotion
+
+    out: Dict[str, Any] = {}
+    detected: Optional[str] = doc.get("detected_emotion")
+    if detected not in CANONICAL:
+        out["detected_emotion"] = get_final_emotion({"detected_emotion": detected})
+    override = doc.get("manual_override")
+    if override and override not in CANONICAL:
+        out["manual_override"] = get_final_emotion({"detected_emotion": override})
+    return out
+
+
+async def _migrate(dry_run: bool) -> dict:
+    from cloudtail_backend.database.mongodb import get_memory_collection
+
+    collection = get_memory_collection()
+    projection = {"_id": 0, "id": 1, "detected_emotion": 1, "manual_override": 1}
+    docs = [d async for d in collection.find(LEGACY_FILTER, projection)]
+    changes: Dict[str, int] = {}
+    updated = 0
+    for doc in docs:
+        fields = canonical_fields(doc)
+        if not fields or doc.get("id") is None:
+            continue
+        for name, value in fields.items():
+            key = f"{name}: {doc.get(name)!r} -> {value}"
+            changes[key] = changes.get(key, 0) + 1
+        if not dry_run:
+            await collection.find_one_and_update({"id": doc["id"]}, {"$set": fields})
+        updated += 1
+    return {"dry_run": dry_run, "matched": len(docs), "updated": updated, "changes": changes}
+
+
+def run(args: argparse.Namespace) -> None:
+    print(json.dumps(asyncio.run(_migrate(args.dry_run)), indent=2))
+
+
+def add_arguments(ap: argparse.ArgumentParser) -> None:
+    ap.add_argument("--dry-run", action="store_true", help="report the changes without writing")
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    add_arguments(ap)
+    run(ap.parse_args())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,38 @@
+"""
+Backend parity check: compare int8 / onnx top labels and scores against fp32.
+
+Usage:
+    python -m cloudtail_backend.tools.check_backend_parity --backend int8
+    python -m cloudtail_backend.tools.check_backend_parity --backend onnx --rows
+Exit code is 1 when the backend disagrees with fp32 beyond the tolerance.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+
+from cloudtail_backend.engine.emotion_model import BACKENDS, DEFAULT_MODEL, EmotionModelWrapper
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--model", default=DEFAULT_MODEL)
+    ap.add_argument("--backend", choices=BACKENDS, default="int8")
+    ap.add_argument("--tolerance", type=float, default=0.05, help="max allowed |score - fp32 score|")
+    ap.add_argument("--rows", action="store_true", help="include per-probe rows")
+    args = ap.parse_args()
+
+    wrapper = EmotionModelWrapper(args.model, backend=args.backend)
+    if not wrapper.available:
+        print(json.dumps({"ok": False, "error": f"backend '{args.backend}' failed to load"}))
+        sys.exit(2)
+    report = wrapper.parity_report(score_tolerance=args.tolerance)
+    if not args.rows:
+        report.pop("rows")
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+    sys.exit(0 if report["ok"] else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+"""
+Create the `memories` indexes (idempotent) and/or explain every route query shape.
+
+Usage:
+    python -m cloudtail_backend indexes              # ensure indexes, then explain
+    python -m cloudtail_backend indexes --no-create  # explain only
+Exit code is 1 when a query shape is answered by a collection scan or in-memory sort.
+Needs CLOUDTAIL_MONGO_URI / CLOUDTAIL_MONGO_DB like the API.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import sys
+
+
+async def _check(create: bool, execution_stats: bool) -> dict:
+    from cloudtail_backend.database.indexes import ensure_indexes, explain_route_queries
+    from cloudtail_backend.database.mongodb import get_memory_collection
+
+    collection = get_memory_collection()
+    out = {}
+    if create:
+        out["ensure"] = await ensure_indexes(collection)
+    out["explain"] = await explain_route_queries(collection, "executionStats" if execution_stats else "queryPlanner")
+    return out
+
+
+def run(args: argparse.Namespace) -> None:
+    report = asyncio.run(_check(not args.no_create, args.execution_stats))
+    print(json.dumps(report, indent=2, default=str))
+    sys.exit(0 if report["explain"]["ok"] else 1)
+
+
+def add_arguments(ap: argparse.ArgumentParser) -> None:
+    ap.add_argument("--no-create", action="store_true", help="only explain, do not create indexes")
+    ap.add_argument("--execution-stats", action="store_true", help="run the queries and report docs/keys examined")
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    add_arguments(ap)
+    run(ap.parse_args())
+
+
+if __name__ == "__main__":
+    main()
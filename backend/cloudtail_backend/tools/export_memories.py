@@ -0,0 +1,78 @@
+"""
+Export the `memories` collection to NDJSON (oldest first), streaming from the Motor cursor.
+
+Usage:
+    python -m cloudtail_backend export --out memories.ndjson
+    python -m cloudtail_backend export --out memories.ndjson.gz            # gzip by suffix
+    python -m cloudtail_backend export --out memories.ndjson --resume      # continue after the last row
+Needs CLOUDTAIL_MONGO_URI / CLOUDTAIL_MONGO_DB like the API.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import gzip
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+from cloudtail_backend.database.memory_export import (
+    EXPORT_BATCH_SIZE, iter_export, last_checkpoint, truncate_partial_row,
+)
+
+
+async def _export(out: Path, after, batch_size: int, append: bool) -> int:
+    from cloudtail_backend.database.mongodb import get_memory_collection
+
+    mode = "ab" if append else "wb"
+    # appending to a .gz adds a new gzip member; readers treat concatenated members as one stream
+    f = gzip.open(out, mode) if out.suffix == ".gz" else open(out, mode)
+    rows = 0
+    with f:
+        async for chunk in iter_export(get_memory_collection(), after=after, batch_size=batch_size):
+            f.write(chunk)
+            rows += chunk.count(b"\n")
+    return rows
+
+
+def run(args: argparse.Namespace) -> None:
+    out = Path(args.out)
+    after = None
+    if args.after_timestamp:
+        after = (datetime.fromisoformat(args.after_timestamp), args.after_id)
+    elif args.resume and out.exists():
+        try:
+            if out.suffix != ".gz":
+                truncate_partial_row(out)
+            after = last_checkpoint(out)
+        except ValueError as e:
+            print(f"[error] {e}", file=sys.stderr)
+            sys.exit(2)
+    append = bool(args.resume and out.exists())
+
+    t0 = time.perf_counter()
+    rows = asyncio.run(_export(out, after, args.batch_size, append))
+    checkpoint = last_checkpoint(out)
+    print(f"[ok] {rows} rows → {out} in {time.perf_counter() - t0:.1f}s"
+          + (f" (resumed after {after[0].isoformat()} / {after[1]})" if after else ""))
+    if checkpoint:
+        print(f"     checkpoint: --after-timestamp {checkpoint[0].isoformat()} --after-id {checkpoint[1]}")
+
+
+def add_arguments(ap: argparse.ArgumentParser) -> None:
+    ap.add_argument("--out", required=True, help="output file; a .gz suffix gzips it")
+    ap.add_argument("--resume", action="store_true", help="append after the last complete row of --out")
+    ap.add_argument("--after-timestamp", default=None, help="explicit checkpoint (ISO timestamp of the last exported row)")
+    ap.add_argument("--after-id", default="", help="explicit checkpoint (id of the last exported row)")
+    ap.add_argument("--batch-size", type=int, default=EXPORT_BATCH_SIZE, help="documents per cursor round-trip")
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    add_arguments(ap)
+    run(ap.parse_args())
+
+
+if __name__ == "__main__":
+    main()
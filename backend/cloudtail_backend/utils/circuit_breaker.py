@@ -0,0 +1,152 @@
+from __future__ import annotations
+
+import os
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional, TypeVar
+
+T = TypeVar("T")
+
+# Consecutive failures that open the circuit
+FAILURE_THRESHOLD = int(os.getenv("CLOUDTAIL_BREAKER_FAILURES", "3"))
+# How long an open circuit fails fast before letting one probe through (half-open)
+RESET_TIMEOUT_S = float(os.getenv("CLOUDTAIL_BREAKER_RESET_S", "10"))
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+
+class CircuitOpen(RuntimeError):
+    """Raised instead of calling the backend while the circuit is open."""
+
+    def __init__(self, name: str, retry_after_s: float) -> None:
+        super().__init__(f"{name} circuit open, retry in {retry_after_s:.1f}s")
+        self.name = name
+        self.retry_after_s = retry_after_s
+
+
+class CircuitBreaker:
+    """
+    Fail-fast guard around calls to a backend that can go away (Mongo).
+
+    closed → counts consecutive failures; FAILURE_THRESHOLD of them open the circuit.
+    open → every call raises CircuitOpen at once (callers serve their fallback) until
+    RESET_TIMEOUT_S has passed.
+    half_open → a single probe call goes through: success closes the circuit, failure
+    re-opens it for another RESET_TIMEOUT_S. Other calls keep failing fast meanwhile.
+    """
+
+    def __init__(self, name: str, failure_threshold: int = FAILURE_THRESHOLD, reset_timeout_s: float = RESET_TIMEOUT_S) -> None:
+        self.name = name
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_timeout_s = reset_timeout_s
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self.trips = 0
+        self.rejected = 0
+        self.successes = 0
+        self.total_failures = 0
+        self.last_error: Optional[str] = None
+        self.last_trip_at: Optional[float] = None
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._current_state(time.monotonic())
+
+    async def call(self, fn: Callable[[], Awaitable[T]]) -> T:
+        """Await `fn()` unless the circuit is open (CircuitOpen); its outcome is recorded."""
+        self.before_call()
+        try:
+            result = await fn()
+        except BaseException as e:
+            # A cancelled request says nothing about the backend
+            if isinstance(e, Exception):
+                self.record_failure(e)
+            else:
+                self.release()
+            raise
+        self.record_success()
+        return result
+
+    # ---------- Manual protocol (for callers that cannot wrap a coroutine) ----------
+    def before_call(self) -> None:
+        now = time.monotonic()
+        with self._lock:
+            state = self._current_state(now)
+            if state == CLOSED:
+                return
+            if state == HALF_OPEN and not self._probing:
+                self._probing = True
+                return
+            self.rejected += 1
+            retry = max(0.0, self._opened_at + self.reset_timeout_s - now)
+        raise CircuitOpen(self.name, retry)
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.successes += 1
+            self._failures = 0
+            self._probing = False
+            self._state = CLOSED
+
+    def record_failure(self, error: BaseException) -> None:
+        with self._lock:
+            self.total_failures += 1
+            self._failures += 1
+            self.last_error = str(error) or type(error).__name__
+            if self._probing or self._failures >= self.failure_threshold:
+                if self._state != OPEN:
+                    self.trips += 1
+                    self.last_trip_at = time.time()
+                self._state = OPEN
+                self._opened_at = time.monotonic()
+            self._probing = False
+
+    def release(self) -> None:
+        """The call ended without an outcome (cancelled): free the probe slot."""
+        with self._lock:
+            self._probing = False
+
+    def stats(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        with self._lock:
+            state = self._current_state(now)
+            return {
+                "state": state,
+                "consecutive_failures": self._failures,
+                "failure_threshold": self.failure_threshold,
+                "reset_timeout_s": self.reset_timeout_s,
+                "retry_in_s": round(max(0.0, self._opened_at + self.reset_timeout_s - now), 2) if state == OPEN else None,
+                "trips": self.trips,
+                "last_trip_at": self.last_trip_at,
+                "rejected": self.rejected,
+                "successes": self.successes,
+                "failures": self.total_failures,
+                "last_error": self.last_error,
+            }
+
+    # ---------- Internals (lock held) ----------
+    def _current_state(self, now: float) -> str:
+        if self._state == OPEN and now - self._opened_at >= self.reset_timeout_s:
+            self._state = HALF_OPEN
+        return self._state
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(name: str) -> CircuitBreaker:
+    breaker = _breakers.get(name)
+    if breaker is None:
+        with _breakers_lock:
+            breaker = _breakers.setdefault(name, CircuitBreaker(name))
+    return breaker
+
+
+def breaker_stats() -> Dict[str, Dict[str, Any]]:
+    """Every breaker created so far (diagnostics; never creates one)."""
+    return {name: b.stats() for name, b in list(_breakers.items())}
@@ -0,0 +1,297 @@
+from __future__ import annotations
+
+import atexit
+import logging
+import os
+import queue
+import threading
+import time
+from datetime import date
+from pathlib import Path
+from typing import IO, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Off (0): every log_* call writes synchronously, as before
+ASYNC_LOGS = os.getenv("CLOUDTAIL_LOG_ASYNC", "1") != "0"
+QUEUE_MAX = int(os.getenv("CLOUDTAIL_LOG_QUEUE_MAX", "10000"))
+# "drop": a full queue drops the record and counts it; "block": wait up to BLOCK_TIMEOUT_S, then drop
+POLICY = os.getenv("CLOUDTAIL_LOG_POLICY", "drop").lower()
+BLOCK_TIMEOUT_S = float(os.getenv("CLOUDTAIL_LOG_BLOCK_TIMEOUT_S", "1"))
+FLUSH_INTERVAL_S = float(os.getenv("CLOUDTAIL_LOG_FLUSH_MS", "200")) / 1000.0
+FSYNC_INTERVAL_S = float(os.getenv("CLOUDTAIL_LOG_FSYNC_S", "5"))
+# "size": roll at MAX_BYTES into .1 … .BACKUPS | "daily": roll into .YYYY-MM-DD | "none"
+ROTATE = os.getenv("CLOUDTAIL_LOG_ROTATE", "size").lower()
+MAX_BYTES = int(os.getenv("CLOUDTAIL_LOG_MAX_BYTES", str(10 * 1024 * 1024)))
+BACKUPS = int(os.getenv("CLOUDTAIL_LOG_BACKUPS", "5"))
+
+_STOP = object()
+
+
+class _OpenFile:
+    __slots__ = ("handle", "size", "day", "dirty")
+
+    def __init__(self, handle: IO[str], size: int, day: date) -> None:
+        self.handle = handle
+        self.size = size
+        self.day = day
+        self.dirty = False
+
+
+class LogWriter:
+    """
+    Background appender for the text audit logs.
+
+    Callers enqueue (path, line) and return immediately; one daemon thread drains the
+    bounded queue in batches, keeps each file open, flushes every batch, fsyncs every
+    `fsync_interval_s` and rotates by size or by day.
+    """
+
+    def __init__(
+        self,
+        max_queue: int = QUEUE_MAX,
+        policy: str = POLICY,
+        flush_interval_s: float = FLUSH_INTERVAL_S,
+        fsync_interval_s: float = FSYNC_INTERVAL_S,
+        rotate: str = ROTATE,
+        max_bytes: int = MAX_BYTES,
+        backups: int = BACKUPS,
+    ) -> None:
+        if policy not in ("drop", "block"):
+            raise ValueError(f"unknown log policy '{policy}', expected 'drop' or 'block'")
+        self.policy = policy
+        self.flush_interval_s = flush_interval_s
+        self.fsync_interval_s = fsync_interval_s
+        self.rotate = rotate
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.pid = os.getpid()
+
+        self._queue: "queue.Queue" = queue.Queue(maxsize=max(1, max_queue))
+        self._files: Dict[Path, _OpenFile] = {}
+        self._last_fsync = time.monotonic()
+        self._closed = False
+        self._stats_lock = threading.Lock()
+
+        self.enqueued = 0
+        self.dropped = 0
+        self.written = 0
+        self.batches = 0
+        self.rotations = 0
+        self.errors = 0
+
+        self._thread = threading.Thread(target=self._run, name="cloudtail-log-writer", daemon=True)
+        self._thread.start()
+
+    # ---------- Producer side ----------
+    def submit(self, path: Path, line: str) -> bool:
+        """Queue one line, or several joined (newlines included). Returns False if it was dropped."""
+        if self._closed:
+            return False
+        item = (Path(path), line)
+        try:
+            if self.policy == "block":
+                self._queue.put(item, timeout=BLOCK_TIMEOUT_S)
+            else:
+                self._queue.put_nowait(item)
+        except queue.Full:
+            with self._stats_lock:
+                self.dropped += 1
+            return False
+        with self._stats_lock:
+            self.enqueued += 1
+        return True
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        """Block until everything queued so far is written and flushed (True) or timeout."""
+        done = threading.Event()
+        try:
+            self._queue.put(done, timeout=timeout)
+        except queue.Full:
+            return False
+        return done.wait(timeout)
+
+    def close(self, timeout: float = 5.0) -> None:
+        """Write what is queued, fsync and close the files, stop the thread."""
+        if self._closed:
+            return
+        self._closed = True
+        try:
+            self._queue.put(_STOP, timeout=timeout)
+        except queue.Full:
+            pass
+        self._thread.join(timeout)
+
+    # ---------- Writer thread ----------
+    def _run(self) -> None:
+        stop = False
+        while not stop:
+            try:
+                first = self._queue.get(timeout=self.flush_interval_s)
+            except queue.Empty:
+                self._maybe_fsync(force=False)
+                continue
+            batch: List[object] = [first]
+            while len(batch) < 4096:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            lines: Dict[Path, List[str]] = {}
+            waiters: List[threading.Event] = []
+            for item in batch:
+                if item is _STOP:
+                    stop = True
+                elif isinstance(item, threading.Event):
+                    waiters.append(item)
+                else:
+                    path, line = item  # type: ignore[misc]
+                    lines.setdefault(path, []).append(line)
+            for path, chunk in lines.items():
+                self._write(path, chunk)
+            self.batches += 1
+            self._maybe_fsync(force=stop)
+            for w in waiters:
+                w.set()
+        for f in self._files.values():
+            try:
+                f.handle.close()
+            except Exception:
+                pass
+        self._files.clear()
+
+    def _write(self, path: Path, chunk: List[str]) -> None:
+        try:
+            data = "".join(chunk)
+            f = self._open(path)
+            size = len(data.encode("utf-8"))
+            if self._should_rotate(f, size):
+                self._rotate(path)
+                f = self._open(path)
+            f.handle.write(data)
+            f.handle.flush()
+            f.size += size
+            f.dirty = True
+            self.written += data.count("\n")
+        except Exception as e:
+            self.errors += 1
+            logger.warning("Audit log write failed (%s): %s", path, e)
+            broken = self._files.pop(path, None)
+            if broken is not None:
+                try:
+                    broken.handle.close()
+                except Exception:
+                    pass
+
+    def _open(self, path: Path) -> _OpenFile:
+        f = self._files.get(path)
+        if f is None:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            handle = path.open("a", encoding="utf-8")
+            size = handle.tell()
+            mtime_day = date.fromtimestamp(path.stat().st_mtime) if size else date.today()
+            f = self._files[path] = _OpenFile(handle, size, mtime_day)
+        return f
+
+    def _should_rotate(self, f: _OpenFile, incoming: int) -> bool:
+        if self.rotate == "size":
+            return f.size > 0 and f.size + incoming > self.max_bytes
+        if self.rotate == "daily":
+            return f.size > 0 and f.day != date.today()
+        return False
+
+    def _rotate(self, path: Path) -> None:
+        f = self._files.pop(path)
+        f.handle.flush()
+        os.fsync(f.handle.fileno())
+        f.handle.close()
+        if self.rotate == "daily":
+            target = path.with_name(f"{path.name}.{f.day.isoformat()}")
+            n = 1
+            while target.exists():
+                target = path.with_name(f"{path.name}.{f.day.isoformat()}.{n}")
+                n += 1
+            os.replace(path, target)
+        else:
+            for i in range(self.backups - 1, 0, -1):
+                src = path.with_name(f"{path.name}.{i}")
+                if src.exists():
+                    os.replace(src, path.with_name(f"{path.name}.{i + 1}"))
+            if self.backups > 0:
+                os.replace(path, path.with_name(f"{path.name}.1"))
+            else:
+                path.unlink()
+        self.rotations += 1
+
+    def _maybe_fsync(self, force: bool) -> None:
+        now = time.monotonic()
+        if not force and now - self._last_fsync < self.fsync_interval_s:
+            return
+        self._last_fsync = now
+        for path, f in list(self._files.items()):
+            if f.dirty:
+                try:
+                    os.fsync(f.handle.fileno())
+                    f.dirty = False
+                except OSError as e:
+                    self.errors += 1
+                    logger.warning("fsync failed (%s): %s", path, e)
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "policy": self.policy,
+            "rotate": self.rotate,
+            "queue_depth": self._queue.qsize(),
+            "queue_max": self._queue.maxsize,
+            "enqueued": self.enqueued,
+            "written": self.written,
+            "dropped": self.dropped,
+            "batches": self.batches,
+            "rotations": self.rotations,
+            "errors": self.errors,
+            "open_files": [str(p) for p in self._files],
+        }
+
+
+_writer: Optional[LogWriter] = None
+_writer_lock = threading.Lock()
+
+
+def get_log_writer() -> LogWriter:
+    """Process-wide writer, started on first use (again in a forked worker: threads don't survive fork)."""
+    global _writer
+    w = _writer
+    if w is None or w.pid != os.getpid():
+        with _writer_lock:
+            if _writer is None or _writer.pid != os.getpid():
+                _writer = LogWriter()
+                logger.info("Audit log writer started: policy=%s, queue=%d, rotate=%s",
+                            _writer.policy, _writer._queue.maxsize, _writer.rotate)
+            w = _writer
+    return w
+
+
+def current_log_writer() -> Optional[LogWriter]:
+    """The writer if started in this process (diagnostics; never starts one)."""
+    w = _writer
+    return w if w is not None and w.pid == os.getpid() else None
+
+
+def shutdown_log_writer() -> None:
+    w = current_log_writer()
+    if w is not None:
+        w.close()
+
+
+def append_line(path: Path, line: str) -> None:
+    """Append one log line: queued to the background writer, or written in place when CLOUDTAIL_LOG_ASYNC=0."""
+    if ASYNC_LOGS:
+        get_log_writer().submit(path, line)
+        return
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with path.open("a", encoding="utf-8") as f:
+        f.write(line)
+
+
+atexit.register(shutdown_log_writer)
@@ -2,7 +2,9 @@ from __future__ import annotations
 
 from pathlib import Path
 from datetime import datetime
-from typing import Iterable, Optional
+from typing import Iterable, Optional, Tuple
+
+from .log_writer import append_line
 
 # Canonical four emotions used across the demo build
 CANONICAL = {"sadness", "guilt", "nostalgia", "gratitude"}
@@ -13,11 +15,6 @@ def _ts() -> str:
     return datetime.utcnow().strftime("%Y-%m-%dT%H:%M:%SZ")
 
 
-def ensure_dir(path: Path) -> None:
-    """Create parent directory if it does not exist."""
-    path.parent.mkdir(parents=True, exist_ok=True)
-
-
 def log_emotion_to_file(
     text: str,
     label: str,
@@ -39,16 +36,36 @@ def log_emotion_to_file(
         - Non-canonical labels are normalized to 'gratitude' to keep the log contract simple.
         - Newlines in text are collapsed into spaces to keep one record per line.
     """
+    append_line(Path(path), _emotion_line(_ts(), text, label, score, element))
+
+
+def log_emotions_to_file(
+    records: Iterable[Tuple[str, str, float, Optional[str]]],
+    path: Path | str,
+) -> int:
+    """
+    Append many emotion records at once: one queued write for the whole batch.
+
+    Args:
+        records: (text, label, score, element) tuples, same meaning as log_emotion_to_file.
+        path: Target log file path.
+
+    Returns:
+        Number of lines written.
+    """
+    ts = _ts()
+    lines = [_emotion_line(ts, text, label, score, element) for text, label, score, element in records]
+    if lines:
+        append_line(Path(path), "".join(lines))
+    return len(lines)
+
+
+def _emotion_line(ts: str, text: str, label: str, score: float, element: Optional[str]) -> str:
     lbl = label if label in CANONICAL else "gratitude"
     msg = text.replace("\n", " ").strip()
     if len(msg) > 200:
         msg = msg[:200] + "…"
-
-    p = Path(path)
-    ensure_dir(p)
-    line = f"{_ts()}\t{lbl}\t{score:.3f}\t{element or '-'}\t{msg}\n"
-    with p.open("a", encoding="utf-8") as f:
-        f.write(line)
+    return f"{ts}\t{lbl}\t{score:.3f}\t{element or '-'}\t{msg}\n"
 
 
 def log_planet_status(
@@ -69,11 +86,7 @@ def log_planet_status(
         path: Target log file path.
     """
     mood = mood if mood in CANONICAL else "gratitude"
-    p = Path(path)
-    ensure_dir(p)
-    line = f"{_ts()}\t{planet_key}\t{mood}\t{color_hex}\t{weather}\n"
-    with p.open("a", encoding="utf-8") as f:
-        f.write(line)
+    append_line(Path(path), f"{_ts()}\t{planet_key}\t{mood}\t{color_hex}\t{weather}\n")
 
 
 def log_ritual_action(
@@ -101,8 +114,5 @@ def log_ritual_action(
     """
     # Normalize emotion path to canonical labels
     normalized = [e if e in CANONICAL else "gratitude" for e in emotion_path]
-    p = Path(path) / filename
-    ensure_dir(p)
     line = f"{_ts()}\t{ritual_id}\t{','.join(normalized)}\t{planet_state}\toverride={user_override}\n"
-    with p.open("a", encoding="utf-8") as f:
-        f.write(line)
\ No newline at end of file
+    append_line(Path(path) / filename, line)
\ No newline at end of file